@@ -0,0 +1,97 @@
+"""
+Measures how many notes per second the processor can apply, with the LLM
+replaced by a stub. Compares committing every statement, as the models do
+on their own, against applying each note in one session.
+
+    python -m benchmarks.apply_notes --notes 200 --profile rollback
+"""
+
+import argparse
+import logging
+import os
+import tempfile
+import time
+
+
+def annotate(request):
+    return [
+        (
+            "create_action",
+            {
+                "action_text": "walked the dog",
+                "action_timestamp": "2025-04-05 10:00:00",
+                "todo_id": None,
+                "mark_complete": False,
+            },
+        ),
+        (
+            "create_todo",
+            {
+                "todo_text": "buy dog food",
+                "target_start_time": None,
+                "target_end_time": None,
+                "parent_id": None,
+            },
+        ),
+        ("create_curiosity", {"curiosity_text": "how old do dogs get?"}),
+    ]
+
+
+def run(mode: str, notes: int) -> float:
+    from src import db
+    from src.llm.stub import StubClient
+    from src.processor import NoteProcessor
+
+    client = StubClient(annotate)
+    prepared = []
+    for i in range(notes):
+        note = db.Note.create(
+            f"walked the dog, need dog food ({mode} {i})"
+        )
+        processor = NoteProcessor(note, client)
+        response = processor.request_annotation()
+        prepared.append(
+            (processor, processor.prepare_tool_calls(response))
+        )
+    start = time.perf_counter()
+    for processor, pending in prepared:
+        if mode == "session":
+            processor.apply_tool_calls(pending)
+        else:
+            processor._apply_tool_calls(pending)
+            processor.note.processed = True
+            processor.note.save()
+    return notes / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("-n", "--notes", type=int, default=200)
+    parser.add_argument(
+        "-p", "--profile", default="wal", help="sqlite pragma profile"
+    )
+    args = parser.parse_args()
+    os.environ["PLANNER_SQLITE_PRAGMA_PROFILE"] = args.profile
+    # the processor logs every tool call, which would swamp the timings
+    logging.disable(logging.INFO)
+    with tempfile.TemporaryDirectory() as tmp:
+        from src import db, init_settings_db
+        from src.db.connection import connection_manager
+
+        # the notebook and settings live under ./data
+        os.makedirs(os.path.join(tmp, "data", "notebooks"))
+        cwd = os.getcwd()
+        os.chdir(tmp)
+        try:
+            init_settings_db()
+            db.init_db()
+            print(f"{'mode':<12}{'notes/s':>12}")
+            for mode in ["statement", "session"]:
+                print(f"{mode:<12}{run(mode, args.notes):>12.0f}")
+        finally:
+            connection_manager.close()
+            os.chdir(cwd)
+
+
+if __name__ == "__main__":
+    main()
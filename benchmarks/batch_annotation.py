@@ -0,0 +1,127 @@
+"""
+Compares annotating one note per LLM request against batching several
+notes into each request, on the notes in sample/a_days_notes.py, with the
+LLM replaced by a stub. The stub reports tokens estimated from the size of
+each request, and takes longer the more it answers, so both throughput and
+cost per note can be compared.
+
+    python -m benchmarks.batch_annotation --batch-sizes 1 5 10
+"""
+
+import argparse
+import json
+import logging
+import os
+import tempfile
+
+
+def annotate(request):
+    # a single note comes as an object, a batch as a list of them
+    notes = json.loads(request["input"][-1]["content"])
+    batched = isinstance(notes, list)
+    return [
+        (
+            "create_action",
+            {
+                "action_text": note["note_text"],
+                "action_timestamp": note["timestamp"].replace("T", " "),
+                "todo_id": None,
+                "mark_complete": False,
+                **({"source_note_id": note["id"]} if batched else {}),
+            },
+        )
+        for note in (notes if batched else [notes])
+    ]
+
+
+def run(notes_per_request: int, args):
+    from sample.a_days_notes import notes
+    from src import db
+    from src.engine import Engine
+    from src.llm.stub import StubClient
+
+    db.teardown()
+    db.init_db()
+    for timestamp, note_text in notes:
+        db.Note.create(note_text, timestamp=timestamp)
+    client = StubClient(
+        annotate,
+        latency=args.llm_latency,
+        output_latency=args.output_latency,
+        usage=True,
+    )
+    with Engine(
+        workers=args.workers,
+        client=client,
+        notes_per_request=notes_per_request,
+    ) as engine:
+        return engine.drain()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "-k", "--batch-sizes", type=int, nargs="+", default=[1, 5, 10]
+    )
+    parser.add_argument("-w", "--workers", type=int, default=4)
+    parser.add_argument(
+        "-l",
+        "--llm-latency",
+        type=float,
+        default=0.3,
+        help="seconds every request takes",
+    )
+    parser.add_argument(
+        "-o",
+        "--output-latency",
+        type=float,
+        default=0.005,
+        help="seconds per output token",
+    )
+    # dollars per million tokens
+    parser.add_argument("--input-price", type=float, default=2.0)
+    parser.add_argument("--cached-price", type=float, default=0.5)
+    parser.add_argument("--output-price", type=float, default=8.0)
+    args = parser.parse_args()
+    # the processor logs every tool call, which would swamp the timings
+    logging.disable(logging.INFO)
+    with tempfile.TemporaryDirectory() as tmp:
+        # imported before leaving the repo, as the loggers open their
+        # files under ./data/log
+        from src import db, engine, init_settings_db
+        from src.db.connection import connection_manager
+
+        # the notebook and settings live under ./data
+        os.makedirs(os.path.join(tmp, "data", "notebooks"))
+        cwd = os.getcwd()
+        os.chdir(tmp)
+        try:
+            init_settings_db()
+            print(
+                f"{'k':>4}{'requests':>10}{'notes/s':>10}{'input/note':>12}"
+                f"{'cached':>8}{'output/note':>13}{'$/1k notes':>12}"
+            )
+            for notes_per_request in args.batch_sizes:
+                stats = run(notes_per_request, args)
+                notes = stats.processed + stats.failed
+                cost = (
+                    (stats.input_tokens - stats.cached_tokens)
+                    * args.input_price
+                    + stats.cached_tokens * args.cached_price
+                    + stats.output_tokens * args.output_price
+                ) / 1e6
+                print(
+                    f"{notes_per_request:>4}{stats.requests:>10}"
+                    f"{stats.notes_per_second:>10.2f}"
+                    f"{stats.input_tokens / notes:>12.0f}"
+                    f"{stats.cached_tokens / stats.input_tokens:>8.0%}"
+                    f"{stats.output_tokens / notes:>13.0f}"
+                    f"{cost / notes * 1000:>12.3f}"
+                )
+        finally:
+            connection_manager.close()
+            os.chdir(cwd)
+
+
+if __name__ == "__main__":
+    main()
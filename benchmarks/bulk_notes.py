@@ -0,0 +1,101 @@
+"""
+Measures how fast notes are imported from a CSV, through Note.import_csv
+and bulk_create, against creating them one at a time with Note.create as
+bulk uploads used to.
+
+    python -m benchmarks.bulk_notes --rows 1000000
+"""
+
+import argparse
+import csv
+import logging
+import os
+import random
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+WORDS = """
+    walked dog park called mom bank bought groceries milk eggs bread
+    finished report started taxes dentist appointment fixed fence washed
+    car paid rent renewed passport read book cooked dinner cleaned garage
+    """.split()
+
+
+def get_rows(count: int):
+    start = datetime(2020, 1, 1)
+    for i in range(count):
+        yield (
+            (start + timedelta(minutes=i)).strftime("%Y-%m-%d %H:%M:%S"),
+            " ".join(random.choices(WORDS, k=random.randint(5, 20))),
+        )
+
+
+def write_csv(path: str, rows: int):
+    with open(path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["timestamp", "note_text"])
+        writer.writerows(get_rows(rows))
+
+
+def time_import(path: str) -> float:
+    from src.db import Note
+
+    start = time.perf_counter()
+    Note.import_csv(path)
+    return time.perf_counter() - start
+
+
+def time_create(rows: int) -> float:
+    from src.db import Note
+
+    start = time.perf_counter()
+    for timestamp, note_text in get_rows(rows):
+        Note.create(note_text, timestamp=timestamp)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("-r", "--rows", type=int, default=1000000)
+    parser.add_argument(
+        "-c",
+        "--create-rows",
+        type=int,
+        default=5000,
+        help="notes to time Note.create with",
+    )
+    args = parser.parse_args()
+    logging.disable(logging.INFO)
+    with tempfile.TemporaryDirectory() as tmp:
+        # imported before leaving the repo, as the loggers open their
+        # files under ./data/log
+        from src import db, init_settings_db
+        from src.db.connection import connection_manager
+
+        # the notebook and settings live under ./data
+        os.makedirs(os.path.join(tmp, "data", "notebooks"))
+        cwd = os.getcwd()
+        os.chdir(tmp)
+        try:
+            init_settings_db()
+            db.init_db()
+            path = os.path.join(tmp, "notes.csv")
+            write_csv(path, args.rows)
+            seconds = time_import(path)
+            print(
+                f"import_csv: {args.rows} notes in {seconds:.1f} s, "
+                f"{args.rows / seconds:,.0f} notes/s"
+            )
+            seconds = time_create(args.create_rows)
+            print(
+                f"Note.create: {args.create_rows} notes in {seconds:.1f} s, "
+                f"{args.create_rows / seconds:,.0f} notes/s"
+            )
+        finally:
+            connection_manager.close()
+            os.chdir(cwd)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""
+Measures how long it takes to set up a NoteProcessor, which loads and
+renders the context of the note, when every note loads its context from
+scratch and when consecutive notes share a ContextWindow. Like the engine,
+each note's context is checked again just before the note is marked
+processed, in a session, which the shared window should serve as a hit.
+
+    python -m benchmarks.context_window --notes 500
+"""
+
+import argparse
+import logging
+import os
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+
+def fill(notes: int):
+    from src import db
+
+    start = datetime(2025, 4, 5, 8, 0, 0)
+    for i in range(notes):
+        timestamp = start + timedelta(minutes=i)
+        note = db.Note.create(
+            f"walked the dog {i}",
+            timestamp=timestamp,
+            processed_note_text=f"Walked the dog ({i}).",
+        )
+        db.Action.create(
+            action_text=f"walked the dog {i}",
+            timestamp=timestamp,
+            source_note_id=note.id,
+        )
+        # todos come up less often than actions
+        if i % 10 == 0:
+            db.Todo.create(
+                todo_text=f"buy dog food {i}", source_note_id=note.id
+            )
+
+
+def run(mode: str) -> float:
+    from src import db
+    from src.llm.stub import StubClient
+    from src.processor import NoteProcessor
+    from src.processor.context import ContextWindow
+
+    client = StubClient()
+    notes = sorted(
+        db.Note.get_all(limit=10**9), key=lambda note: note.timestamp
+    )
+    shared = ContextWindow()
+    start = time.perf_counter()
+    for note in notes:
+        window = shared if mode == "window" else ContextWindow()
+        note_processor = NoteProcessor(note, client, window)
+        with db.session_scope():
+            assert note_processor.context_is_current()
+            note.processed = True
+            note.save()
+        if window is not shared:
+            window.close()
+    elapsed = time.perf_counter() - start
+    if mode == "window":
+        print(f"  {shared.stats}")
+        # one load from scratch, then each note moves the window forward,
+        # and its second look is served as is
+        assert shared.stats.misses == 1, shared.stats
+        assert shared.stats.hits == len(notes), shared.stats
+    shared.close()
+    return elapsed / len(notes) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("-n", "--notes", type=int, default=500)
+    args = parser.parse_args()
+    # the processor logs every note, which would swamp the timings
+    logging.disable(logging.INFO)
+    with tempfile.TemporaryDirectory() as tmp:
+        # imported before leaving the repo, as the loggers open their
+        # files under ./data/log
+        from src import db, init_settings_db, processor
+        from src.db.connection import connection_manager
+
+        # the notebook and settings live under ./data
+        os.makedirs(os.path.join(tmp, "data", "notebooks"))
+        cwd = os.getcwd()
+        os.chdir(tmp)
+        try:
+            init_settings_db()
+            db.init_db()
+            fill(args.notes)
+            print(f"{'mode':<10}{'ms/note':>10}")
+            for mode in ["scratch", "window"]:
+                print(f"{mode:<10}{run(mode):>10.3f}")
+        finally:
+            connection_manager.close()
+            os.chdir(cwd)
+
+
+if __name__ == "__main__":
+    main()
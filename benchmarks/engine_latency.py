@@ -0,0 +1,78 @@
+"""
+Measures how long a note takes from being written to being processed by
+a running engine, with the LLM replaced by a stub. Compares waking the
+engine on every note against leaving it to poll.
+
+    python -m benchmarks.engine_latency --notes 5 --llm-latency 0.2
+"""
+
+import argparse
+import logging
+import os
+import random
+import tempfile
+import threading
+import time
+
+
+def run(mode: str, notes: int, llm_latency: float) -> list:
+    from src import db
+    from src.engine import Engine
+    from src.llm.stub import StubClient
+    from src.notify import notify_note_created
+
+    engine = Engine(workers=2, client=StubClient(latency=llm_latency))
+    thread = threading.Thread(target=engine.run)
+    thread.start()
+    latencies = []
+    try:
+        for i in range(notes):
+            # don't line the writes up with the engine's polls
+            time.sleep(random.uniform(0.5, 1.5))
+            start = time.monotonic()
+            note = db.Note.create(f"{mode} note {i}")
+            if mode == "notify":
+                notify_note_created([note.id])
+            while not db.Note.get_by_id(note.id).processed:
+                time.sleep(0.005)
+            latencies.append(time.monotonic() - start)
+    finally:
+        engine.stop()
+        thread.join()
+        engine.close()
+    return latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("-n", "--notes", type=int, default=5)
+    parser.add_argument("-l", "--llm-latency", type=float, default=0.2)
+    args = parser.parse_args()
+    # the processor logs every tool call, which would swamp the timings
+    logging.disable(logging.INFO)
+    with tempfile.TemporaryDirectory() as tmp:
+        # imported before leaving the repo, as the loggers open their
+        # files under ./data/log
+        from src import db, engine, init_settings_db
+        from src.db.connection import connection_manager
+
+        # the notebook and settings live under ./data
+        os.makedirs(os.path.join(tmp, "data", "notebooks"))
+        cwd = os.getcwd()
+        os.chdir(tmp)
+        try:
+            init_settings_db()
+            db.init_db()
+            print(f"{'mode':<8}{'mean (s)':>10}{'max (s)':>10}")
+            for mode in ["poll", "notify"]:
+                latencies = run(mode, args.notes, args.llm_latency)
+                print(
+                    f"{mode:<8}{sum(latencies) / len(latencies):>10.3f}{max(latencies):>10.3f}"
+                )
+        finally:
+            connection_manager.close()
+            os.chdir(cwd)
+
+
+if __name__ == "__main__":
+    main()
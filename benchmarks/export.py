@@ -0,0 +1,116 @@
+"""
+Measures the time and peak Python memory of exporting the notes table,
+streamed in chunks by export_table, against reading the whole table with
+fetchall and re-formatting every timestamp, as Note.export_csv used to.
+
+    python -m benchmarks.export --rows 200000
+"""
+
+import argparse
+import csv
+import logging
+import os
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+
+def get_rows(count: int):
+    start = datetime(2020, 1, 1)
+    for i in range(count):
+        yield (
+            (start + timedelta(minutes=i)).strftime(TIMESTAMP_FORMAT),
+            f"walked the dog and bought milk, eggs and bread {i}",
+        )
+
+
+def export_fetchall(path: str):
+    from src.db.connection import get_connection
+
+    with get_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT * FROM notes")
+        rows = cursor.fetchall()
+        with open(path, "w", newline="") as csvfile:
+            writer = csv.writer(csvfile)
+            writer.writerow(["timestamp", "note_text"])
+            for row in rows:
+                writer.writerow(
+                    [
+                        datetime.strptime(
+                            row[1], TIMESTAMP_FORMAT
+                        ).strftime(TIMESTAMP_FORMAT),
+                        row[2],
+                    ]
+                )
+
+
+def export_streamed(path: str, format: str, compress: bool):
+    from src.db import export_table
+
+    export_table(
+        "notes",
+        path,
+        format=format,
+        columns=["timestamp", "note_text"],
+        compress=compress,
+    )
+
+
+def measure(name: str, export, rows: int):
+    start = time.perf_counter()
+    export()
+    seconds = time.perf_counter() - start
+    tracemalloc.start()
+    export()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(
+        f"{name:<16} {seconds:6.2f} s {rows / seconds:>10,.0f} rows/s "
+        f"{peak / 2**20:8.1f} MiB peak"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("-r", "--rows", type=int, default=200000)
+    args = parser.parse_args()
+    logging.disable(logging.INFO)
+    with tempfile.TemporaryDirectory() as tmp:
+        # imported before leaving the repo, as the loggers open their
+        # files under ./data/log
+        from src import db, init_settings_db
+        from src.db.connection import connection_manager
+
+        # the notebook and settings live under ./data
+        os.makedirs(os.path.join(tmp, "data", "notebooks"))
+        cwd = os.getcwd()
+        os.chdir(tmp)
+        try:
+            init_settings_db()
+            db.init_db()
+            db.Note.bulk_create(get_rows(args.rows))
+            path = os.path.join(tmp, "export")
+            measure(
+                "fetchall csv", lambda: export_fetchall(path), args.rows
+            )
+            for format, compress in [
+                ("csv", False),
+                ("csv", True),
+                ("jsonl", False),
+            ]:
+                measure(
+                    f"{format}" + (" gzip" if compress else ""),
+                    lambda: export_streamed(path, format, compress),
+                    args.rows,
+                )
+        finally:
+            connection_manager.close()
+            os.chdir(cwd)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+"""
+Measures how many rows a second each model's from_sqlite_row turns into
+objects, building them with src.db.rows.construct as it does now, against
+validating them as it used to and against pydantic's model_construct.
+Also times Note.get_all(limit=1000) with and without validation.
+
+    python -m benchmarks.from_sqlite_row --rows 100000
+"""
+
+import argparse
+import logging
+import os
+import tempfile
+import time
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from unittest import mock
+
+TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+
+def create_rows(count: int):
+    from src import db
+    from src.db.connection import get_connection
+
+    start = datetime(2020, 1, 1)
+    db.Note.bulk_create(
+        (
+            (start + timedelta(minutes=i)).strftime(TIMESTAMP_FORMAT),
+            f"walked the dog {i}",
+        )
+        for i in range(count)
+    )
+    with get_connection() as conn:
+        for query in [
+            """
+            INSERT INTO todos (todo_text, source_note_id, target_end_time)
+            SELECT 'walk the dog', id, timestamp FROM notes
+            """,
+            """
+            INSERT INTO actions (timestamp, action_text, source_note_id)
+            SELECT timestamp, 'walked the dog', id FROM notes
+            """,
+            """
+            INSERT INTO tool_calls
+                (source_note_id, target_table, target_id, tool_call)
+            SELECT id, 'actions', id, '{}' FROM notes
+            """,
+            """
+            INSERT INTO curiosities (curiosity_text, source_note_id)
+            SELECT 'why dogs?', id FROM notes
+            """,
+        ]:
+            conn.execute(query)
+        conn.commit()
+
+
+@contextmanager
+def built_with(model, build):
+    """
+    Makes from_sqlite_row build the model's rows with build, rather than
+    src.db.rows.construct.
+    """
+    with mock.patch(f"{model.__module__}.construct", build):
+        yield
+
+
+# how from_sqlite_row used to build rows, validating every field
+def validated(cls, **fields):
+    return cls(**fields)
+
+
+def model_construct(cls, **fields):
+    return cls.model_construct(**fields)
+
+
+def time_rows(model, rows) -> float:
+    start = time.perf_counter()
+    for row in rows:
+        model.from_sqlite_row(row)
+    return time.perf_counter() - start
+
+
+def time_get_all(model, repeat: int = 20) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        model.get_all(limit=1000)
+    return (time.perf_counter() - start) / repeat
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("-r", "--rows", type=int, default=100000)
+    args = parser.parse_args()
+    logging.disable(logging.INFO)
+    with tempfile.TemporaryDirectory() as tmp:
+        # imported before leaving the repo, as the loggers open their
+        # files under ./data/log
+        from src import db, init_settings_db
+        from src.db.connection import connection_manager, get_connection
+
+        # the notebook and settings live under ./data
+        os.makedirs(os.path.join(tmp, "data", "notebooks"))
+        cwd = os.getcwd()
+        os.chdir(tmp)
+        try:
+            init_settings_db()
+            db.init_db()
+            create_rows(args.rows)
+            for model in [
+                db.Note,
+                db.Todo,
+                db.Action,
+                db.ToolCall,
+                db.Curiosity,
+            ]:
+                with get_connection() as conn:
+                    rows = conn.execute(
+                        f"SELECT * FROM {model.table_name}"
+                    ).fetchall()
+                times = {}
+                for name, build in [
+                    ("validated", validated),
+                    ("model_construct", model_construct),
+                ]:
+                    with built_with(model, build):
+                        times[name] = time_rows(model, rows)
+                times["construct"] = time_rows(model, rows)
+                print(
+                    f"{model.__name__:<10} "
+                    + "  ".join(
+                        f"{name} {len(rows) / seconds:>9,.0f} rows/s"
+                        for name, seconds in times.items()
+                    )
+                )
+            with built_with(db.Note, validated):
+                before = time_get_all(db.Note)
+            after = time_get_all(db.Note)
+            print(
+                f"Note.get_all(limit=1000) validated {before * 1000:.1f} ms  "
+                f"construct {after * 1000:.1f} ms"
+            )
+        finally:
+            connection_manager.close()
+            os.chdir(cwd)
+
+
+if __name__ == "__main__":
+    main()
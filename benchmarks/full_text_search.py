@@ -0,0 +1,116 @@
+"""
+Compares searching the notes with FTS5, as Note.get_all does, against the
+LIKE scan it replaced.
+
+    python -m benchmarks.full_text_search --notes 100000
+"""
+
+import argparse
+import logging
+import os
+import random
+import tempfile
+import time
+
+WORDS = """
+    walked dog park called mom bank bought groceries milk eggs bread
+    finished report started taxes dentist appointment fixed fence washed
+    car paid rent renewed passport read book cooked dinner cleaned garage
+    emailed vendor booked flight plumber came gym ran miles slept late
+    """.split() + [f"word{i}" for i in range(5000)]
+# word frequencies in text fall off roughly as 1 / rank
+WEIGHTS = [1 / rank for rank in range(1, len(WORDS) + 1)]
+# from a word in a third of the notes down to one in a few of them
+SEARCHES = [
+    "walked",
+    "groceries",
+    "dentist appointment",
+    "word3000",
+    "wor*",
+]
+
+
+def fill(notes: int):
+    from src.db.connection import get_connection
+
+    rows = [
+        (
+            f"2025-01-01 00:00:{i % 60:02d}",
+            " ".join(
+                random.choices(WORDS, WEIGHTS, k=random.randint(8, 40))
+            ),
+        )
+        for i in range(notes)
+    ]
+    with get_connection() as conn:
+        # the triggers index every note as it goes in
+        conn.executemany(
+            "INSERT INTO notes (timestamp, note_text) VALUES (?, ?)", rows
+        )
+        conn.commit()
+
+
+def search_like(search: str, limit: int = 25):
+    from src.db import Note
+    from src.db.connection import get_connection
+
+    with get_connection() as conn:
+        rows = conn.execute(
+            "SELECT * FROM notes WHERE note_text LIKE ? ORDER BY id desc LIMIT ?",
+            (f"%{search.rstrip('*')}%", limit),
+        ).fetchall()
+    return [Note.from_sqlite_row(row) for row in rows]
+
+
+def search_fts(search: str, limit: int = 25):
+    from src.db import Note
+
+    return Note.get_all(search=search, limit=limit)
+
+
+def time_search(search, text: str, repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        search(text)
+    return (time.perf_counter() - start) / repeat
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("-n", "--notes", type=int, default=100000)
+    parser.add_argument("-r", "--repeat", type=int, default=10)
+    args = parser.parse_args()
+    logging.disable(logging.INFO)
+    with tempfile.TemporaryDirectory() as tmp:
+        # imported before leaving the repo, as the loggers open their
+        # files under ./data/log
+        from src import db, init_settings_db
+        from src.db.connection import connection_manager
+
+        # the notebook and settings live under ./data
+        os.makedirs(os.path.join(tmp, "data", "notebooks"))
+        cwd = os.getcwd()
+        os.chdir(tmp)
+        try:
+            init_settings_db()
+            db.init_db()
+            start = time.perf_counter()
+            fill(args.notes)
+            print(
+                f"inserted and indexed {args.notes} notes in "
+                f"{time.perf_counter() - start:.1f} s"
+            )
+            for text in SEARCHES:
+                like = time_search(search_like, text, args.repeat)
+                fts = time_search(search_fts, text, args.repeat)
+                print(
+                    f"{text!r}: LIKE {like * 1000:.2f} ms, "
+                    f"FTS5 {fts * 1000:.2f} ms per search"
+                )
+        finally:
+            connection_manager.close()
+            os.chdir(cwd)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""
+Compares concurrent read/write throughput of the sqlite pragma profiles.
+
+One writer thread inserts notes, committing each one like Note.create
+does, while reader threads page through them like the notes endpoint.
+
+    python -m benchmarks.journal_modes --readers 4 --seconds 5
+"""
+
+import argparse
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+
+from src.db.connection import (
+    PRAGMA_PROFILES,
+    ConnectionManager,
+    get_pragma_profile,
+)
+
+CREATE_NOTES = """
+    CREATE TABLE notes (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        timestamp DATETIME DEFAULT (strftime('%Y-%m-%d %H:%M:%S', 'now', 'localtime')),
+        note_text TEXT NOT NULL,
+        processed_note_text TEXT DEFAULT "",
+        processing_error TEXT DEFAULT "",
+        processed INTEGER DEFAULT 0
+    )
+"""
+
+
+def run_profile(profile: str, readers: int, seconds: float) -> dict:
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bench.db")
+        manager = ConnectionManager(get_pragma_profile(profile))
+        with manager.connect(path) as conn:
+            conn.execute(CREATE_NOTES)
+            conn.executemany(
+                "INSERT INTO notes (note_text) VALUES (?)",
+                [(f"seed note {i}",) for i in range(1000)],
+            )
+        counts = {"writes": 0, "reads": 0, "locked": 0}
+        lock = threading.Lock()
+        stop = threading.Event()
+
+        def count(key):
+            with lock:
+                counts[key] += 1
+
+        def writer():
+            conn = manager.connect(path)
+            i = 0
+            while not stop.is_set():
+                try:
+                    conn.execute(
+                        "INSERT INTO notes (note_text) VALUES (?)",
+                        (f"note {i}",),
+                    )
+                    conn.commit()
+                    count("writes")
+                except sqlite3.OperationalError:
+                    conn.rollback()
+                    count("locked")
+                i += 1
+            manager.close()
+
+        def reader():
+            conn = manager.connect(path)
+            while not stop.is_set():
+                try:
+                    conn.execute(
+                        "SELECT * FROM notes ORDER BY id DESC LIMIT 25"
+                    ).fetchall()
+                    count("reads")
+                except sqlite3.OperationalError:
+                    count("locked")
+            manager.close()
+
+        threads = [threading.Thread(target=writer)] + [
+            threading.Thread(target=reader) for _ in range(readers)
+        ]
+        for thread in threads:
+            thread.start()
+        time.sleep(seconds)
+        stop.set()
+        for thread in threads:
+            thread.join()
+        manager.close()
+    return {key: value / seconds for key, value in counts.items()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("-r", "--readers", type=int, default=4)
+    parser.add_argument("-s", "--seconds", type=float, default=5)
+    args = parser.parse_args()
+    print(
+        f"{'profile':<10}{'writes/s':>12}{'reads/s':>12}{'locked/s':>12}"
+    )
+    for profile in PRAGMA_PROFILES:
+        result = run_profile(profile, args.readers, args.seconds)
+        print(
+            f"{profile:<10}{result['writes']:>12.0f}{result['reads']:>12.0f}{result['locked']:>12.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""
+Measures the time and peak Python memory of pulling every action through
+GET /api/actions in one request, streamed a chunk at a time, against
+building the whole list and handing it to jsonify as the route used to.
+
+    python -m benchmarks.list_routes --rows 100000
+"""
+
+import argparse
+import logging
+import os
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+
+def create_actions(count: int):
+    from src import db
+    from src.db.connection import get_connection
+
+    start = datetime(2020, 1, 1)
+    db.Note.bulk_create(
+        (
+            (start + timedelta(minutes=i)).strftime(TIMESTAMP_FORMAT),
+            f"walked the dog {i}",
+        )
+        for i in range(count)
+    )
+    with get_connection() as conn:
+        conn.execute("""
+            INSERT INTO actions (timestamp, action_text, source_note_id)
+            SELECT timestamp, 'walked the dog', id FROM notes
+            """)
+        conn.commit()
+
+
+def get_jsonified(client, rows: int) -> int:
+    from flask import jsonify
+
+    from src.db import Action
+    from src.web import rest_server
+
+    with rest_server.test_request_context():
+        actions = Action.get_all(limit=rows, include_todo=True)
+        actions_json = [action.model_dump() for action in actions]
+        for action, action_dict in zip(actions, actions_json):
+            todo = action.todo
+            if todo:
+                action_dict["todo"] = todo.model_dump()
+        response = jsonify(
+            {"actions": actions_json, "next_cursor": actions.next_cursor}
+        )
+        return len(response.get_data())
+
+
+def get_streamed(client, rows: int) -> int:
+    response = client.get(f"/api/actions/?limit={rows}", buffered=False)
+    size = sum(len(chunk) for chunk in response.response)
+    response.close()
+    return size
+
+
+def measure(name: str, get, client, rows: int):
+    start = time.perf_counter()
+    size = get(client, rows)
+    seconds = time.perf_counter() - start
+    tracemalloc.start()
+    get(client, rows)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(
+        f"{name:<10} {seconds:6.2f} s {rows / seconds:>9,.0f} actions/s "
+        f"{size / 2**20:6.1f} MiB sent {peak / 2**20:8.1f} MiB peak"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("-r", "--rows", type=int, default=100000)
+    args = parser.parse_args()
+    logging.disable(logging.INFO)
+    with tempfile.TemporaryDirectory() as tmp:
+        # imported before leaving the repo, as the loggers open their
+        # files under ./data/log
+        from src import db, init_settings_db
+        from src.db.connection import connection_manager
+        from src.web import rest_server
+
+        # the notebook and settings live under ./data
+        os.makedirs(os.path.join(tmp, "data", "notebooks"))
+        cwd = os.getcwd()
+        os.chdir(tmp)
+        try:
+            init_settings_db()
+            db.init_db()
+            create_actions(args.rows)
+            client = rest_server.test_client()
+            measure("jsonify", get_jsonified, client, args.rows)
+            measure("streamed", get_streamed, client, args.rows)
+        finally:
+            connection_manager.close()
+            os.chdir(cwd)
+
+
+if __name__ == "__main__":
+    main()
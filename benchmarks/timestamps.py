@@ -0,0 +1,113 @@
+"""
+Measures parse_time and format_time, which read and write TIMESTAMP_FORMAT
+text with fromisoformat and isoformat, against strptime and strftime as
+they used to, and what that does to Note.get_all and Action.get_all with
+limit=1000.
+
+    python -m benchmarks.timestamps --rows 100000
+"""
+
+import argparse
+import logging
+import os
+import tempfile
+import time
+from datetime import datetime, timedelta
+from unittest import mock
+
+
+def get_times(count: int):
+    start = datetime(2020, 1, 1)
+    return [start + timedelta(minutes=i) for i in range(count)]
+
+
+def create_rows(times):
+    from src import db
+    from src.db.connection import get_connection
+    from src.util import format_time
+
+    db.Note.bulk_create(
+        (format_time(time), f"walked the dog {i}")
+        for i, time in enumerate(times)
+    )
+    with get_connection() as conn:
+        conn.execute("""
+            INSERT INTO actions (timestamp, action_text, source_note_id)
+            SELECT timestamp, 'walked the dog', id FROM notes
+            """)
+        conn.commit()
+
+
+def strptime():
+    # parse_time and format_time as they used to be
+    return mock.patch("src.util.FAST_TIMESTAMPS", False)
+
+
+def time_per_call(function, items) -> float:
+    start = time.perf_counter()
+    for item in items:
+        function(item)
+    return (time.perf_counter() - start) / len(items)
+
+
+def time_get_all(get_all, repeat: int = 20) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        get_all(limit=1000)
+    return (time.perf_counter() - start) / repeat
+
+
+def report(name: str, before: float, after: float, unit: str):
+    scale = {"us": 1e6, "ms": 1e3}[unit]
+    print(
+        f"{name:<26} strptime {before * scale:7.2f} {unit}  "
+        f"fromisoformat {after * scale:7.2f} {unit}  "
+        f"{before / after:5.1f}x"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("-r", "--rows", type=int, default=100000)
+    args = parser.parse_args()
+    logging.disable(logging.INFO)
+    with tempfile.TemporaryDirectory() as tmp:
+        # imported before leaving the repo, as the loggers open their
+        # files under ./data/log
+        from src import db, init_settings_db
+        from src.db.connection import connection_manager
+        from src.util import format_time, parse_time
+
+        # the notebook and settings live under ./data
+        os.makedirs(os.path.join(tmp, "data", "notebooks"))
+        cwd = os.getcwd()
+        os.chdir(tmp)
+        try:
+            init_settings_db()
+            db.init_db()
+            times = get_times(args.rows)
+            texts = [format_time(time) for time in times]
+            create_rows(times)
+            for name, function, items in [
+                ("parse_time", parse_time, texts),
+                ("format_time", format_time, times),
+            ]:
+                with strptime():
+                    before = time_per_call(function, items)
+                after = time_per_call(function, items)
+                report(name, before, after, "us")
+            for name, get_all in [
+                ("Note.get_all(limit=1000)", db.Note.get_all),
+                ("Action.get_all(limit=1000)", db.Action.get_all),
+            ]:
+                with strptime():
+                    before = time_get_all(get_all)
+                after = time_get_all(get_all)
+                report(name, before, after, "ms")
+        finally:
+            connection_manager.close()
+            os.chdir(cwd)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""
+Measures how long the todo index takes to find the candidates for an
+action, which is what find_todo does before deciding whether to ask the
+LLM.
+
+    python -m benchmarks.todo_index --todos 5000
+"""
+
+import argparse
+import logging
+import os
+import random
+import tempfile
+import time
+
+VERBS = "buy call clean fix book email pay renew return wash write".split()
+THINGS = """
+    bank car dentist dog fence garage gutters insurance laundry mom oil
+    passport plumber rent report taxes truck vendor windows
+    """.split()
+
+
+def run(todos: int, searches: int) -> float:
+    from src import db
+    from src.db import todo_index
+    from src.db.connection import get_connection
+
+    note = db.Note.create("todos for the index benchmark")
+    with db.Session():
+        for i in range(todos):
+            db.Todo.create(
+                todo_text=f"{random.choice(VERBS)} the {random.choice(THINGS)} {i}",
+                source_note_id=note.id,
+            )
+    start = time.perf_counter()
+    with get_connection() as conn:
+        cursor = conn.cursor()
+        for _ in range(searches):
+            todo_index.search(
+                cursor,
+                f"{random.choice(VERBS)}ed the {random.choice(THINGS)} today",
+            )
+    return (time.perf_counter() - start) / searches
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("-t", "--todos", type=int, default=5000)
+    parser.add_argument("-s", "--searches", type=int, default=200)
+    args = parser.parse_args()
+    logging.disable(logging.INFO)
+    with tempfile.TemporaryDirectory() as tmp:
+        # imported before leaving the repo, as the loggers open their
+        # files under ./data/log
+        from src import db, init_settings_db
+        from src.db.connection import connection_manager
+
+        # the notebook and settings live under ./data
+        os.makedirs(os.path.join(tmp, "data", "notebooks"))
+        cwd = os.getcwd()
+        os.chdir(tmp)
+        try:
+            init_settings_db()
+            db.init_db()
+            seconds = run(args.todos, args.searches)
+            print(
+                f"{args.todos} todos: {seconds * 1000:.2f} ms per search"
+            )
+        finally:
+            connection_manager.close()
+            os.chdir(cwd)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,10 @@
 import argparse
-import time
+import sys
 
 from src import db, rendering, engine, get_summary, utils, init_settings_db
+from src.config import ENGINE_NOTES_PER_REQUEST, ENGINE_WORKERS
+from src.notify import notify_note_created
+from src.processor.backfill import Backfill
 
 
 def add_date_filters(parser):
@@ -50,6 +53,18 @@ def main():
         help="cycles all notes and reprocess annotations until all are processed",
     )
     cycle_parser.add_argument("-i", "--iterations", type=int)
+    cycle_parser.add_argument(
+        "-w",
+        "--workers",
+        type=int,
+        help="processes every unprocessed note, this many at a time",
+    )
+    cycle_parser.add_argument(
+        "-k",
+        "--notes-per-request",
+        type=int,
+        help="annotates this many notes in each LLM request, with --workers",
+    )
 
     # Read subparser with type-specific subcommands
     read_parser = subparsers.add_parser(
@@ -165,24 +180,110 @@ def main():
         "query_words", nargs="*", help="Prompt for the summary"
     )
 
+    # journal subparser
+    journal_parser = subparsers.add_parser(
+        "journal", help="report or change a notebook's journal mode"
+    )
+    journal_parser.add_argument(
+        "-n",
+        "--notebook",
+        help="Notebook to work on (default: the active notebook)",
+    )
+    journal_parser.add_argument(
+        "-m",
+        "--mode",
+        choices=db.JOURNAL_MODES,
+        help="Switch the notebook to this journal mode",
+    )
+    journal_parser.add_argument(
+        "-k",
+        "--checkpoint",
+        choices=db.CHECKPOINT_MODES,
+        help="Run a WAL checkpoint of this kind",
+    )
+
+    # reprocess subparser
+    reprocess_parser = subparsers.add_parser(
+        "reprocess", help="processes every unprocessed note"
+    )
+    reprocess_parser.add_argument(
+        "--batch",
+        action="store_true",
+        help="sends the notes through the provider's batch API",
+    )
+    reprocess_parser.add_argument(
+        "-r",
+        "--resume",
+        metavar="BATCH_ID",
+        help="waits for and applies a batch submitted earlier",
+    )
+    reprocess_parser.add_argument(
+        "-w",
+        "--workers",
+        type=int,
+        default=ENGINE_WORKERS,
+        help="without --batch, notes to send to the LLM at the same time",
+    )
+
+    # export subparser
+    export_parser = subparsers.add_parser(
+        "export", help="export a table of the notebook"
+    )
+    export_parser.add_argument(
+        "table", choices=db.EXPORT_TABLES, help="Table to export"
+    )
+    export_parser.add_argument(
+        "-f",
+        "--format",
+        choices=list(db.EXPORT_FORMATS),
+        default="csv",
+        help="Format of the export (default: csv)",
+    )
+    export_parser.add_argument(
+        "-o",
+        "--output",
+        help="File to write the export to (default: standard output)",
+    )
+    export_parser.add_argument(
+        "-z",
+        "--gzip",
+        action="store_true",
+        help="gzips the export",
+    )
+
     args = parser.parse_args()
 
     if args.command == "write":
         note = " ".join(args.note_words)
-        db.Note.create(
+        created = db.Note.create(
             note
         )  # Note: You might want to update this for other types
+        notify_note_created([created.id])
         print("noted")
 
-    if args.command == "cycle":
+    if args.command == "cycle" and args.continuous:
+        # wakes up when notes are written, see src/notify.py
+        note_engine = engine.Engine(
+            workers=args.workers or ENGINE_WORKERS,
+            notes_per_request=args.notes_per_request
+            or ENGINE_NOTES_PER_REQUEST,
+        )
+        try:
+            note_engine.run()
+        except KeyboardInterrupt:
+            print("Stopping the engine.")
+        finally:
+            print(note_engine.stats)
+            note_engine.close()
+    elif args.command == "cycle" and args.workers:
+        with engine.Engine(
+            workers=args.workers,
+            notes_per_request=args.notes_per_request
+            or ENGINE_NOTES_PER_REQUEST,
+        ) as note_engine:
+            print(note_engine.drain())
+    elif args.command == "cycle":
         # Call the cycle function from the engine module
-        if args.continuous:
-            try:
-                while True:
-                    engine.cycle()
-                    time.sleep(5)
-            except KeyboardInterrupt:
-                print("Stopping the engine.")
         if args.all:
             return_value = True
             while return_value:
@@ -228,6 +329,7 @@ def main():
                 after=args.after,
                 search=args.search,
                 limit=args.limit,
+                include_todo=True,
             )
             actions.reverse()
             pretty_actions = rendering.strf_actions(actions)
@@ -256,6 +358,46 @@ def main():
                 notes, show_processed_text=True
             )
             print(pretty_notes)
+    elif args.command == "journal":
+        if args.mode:
+            new_mode = db.set_journal_mode(args.mode, args.notebook)
+            print(f"journal mode is now {new_mode}")
+        if args.checkpoint:
+            result = db.checkpoint(args.checkpoint, args.notebook)
+            print(
+                f"checkpointed {result.checkpointed_frames}/{result.log_frames} frames"
+                + (" (busy)" if result.busy else "")
+            )
+        status = db.get_journal_status(args.notebook)
+        print(f"notebook:      {status.notebook}")
+        print(f"journal mode:  {status.journal_mode}")
+        print(
+            f"configured:    {status.configured_mode or 'profile default'}"
+        )
+        print(f"synchronous:   {status.synchronous}")
+        print(f"wal size:      {status.wal_size} bytes")
+    elif args.command == "reprocess":
+        if args.batch or args.resume:
+            backfill = Backfill()
+            batch_id = args.resume or backfill.start()
+            if batch_id is None:
+                print("No unprocessed notes.")
+                return
+            print(f"Waiting on batch {batch_id}, --resume {batch_id} to")
+            print("pick it up again if interrupted.")
+            print(backfill.run(batch_id))
+        else:
+            with engine.Engine(workers=args.workers) as note_engine:
+                print(note_engine.drain())
+    elif args.command == "export":
+        # the export goes straight to the buffer under sys.stdout
+        sys.stdout.flush()
+        db.export_table(
+            args.table,
+            args.output or sys.stdout.buffer,
+            format=args.format,
+            compress=args.gzip,
+        )
     elif args.command == "query":
         query = " ".join(args.query_words)
         title, summary = get_summary(query)
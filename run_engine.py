@@ -1,12 +1,36 @@
-from src import engine
+import argparse
 
-import time
+from src import engine, db
+from src.config import ENGINE_NOTES_PER_REQUEST, ENGINE_WORKERS
 
-# cycle the engine once per second
+# process notes as they come in, several at a time
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Runs the note engine")
+    parser.add_argument(
+        "-w",
+        "--workers",
+        type=int,
+        default=ENGINE_WORKERS,
+        help="notes to send to the LLM at the same time",
+    )
+    parser.add_argument(
+        "-k",
+        "--notes-per-request",
+        type=int,
+        default=ENGINE_NOTES_PER_REQUEST,
+        help="notes to annotate in each LLM request",
+    )
+    args = parser.parse_args()
+    note_engine = engine.Engine(
+        workers=args.workers, notes_per_request=args.notes_per_request
+    )
     try:
-        while True:
-            engine.cycle()
-            time.sleep(1)
+        note_engine.run(idle_interval=1)
     except KeyboardInterrupt:
         print("Stopping the engine.")
+    finally:
+        print(note_engine.stats)
+        # however the engine stopped, hand its claims back
+        note_engine.close()
+        # fold the WAL back into the notebook so it doesn't linger
+        db.checkpoint("truncate")
@@ -1,15 +1,15 @@
 from typing import List
 from src import db
+from src.notify import notify_note_created
 
-def bulk_upload_notes_list(notes: List[tuple]) -> List[db.Note]:
+def bulk_upload_notes_list(notes: List[tuple]) -> List[int]:
     """
-    Bulk upload notes to the database.
+    Bulk upload notes to the database. notes are (timestamp, note_text)
+    tuples, inserted with db.Note.bulk_create. Returns the ids of the new
+    notes, in order, without reading them back; db.Note.get_by_ids loads
+    them.
     """
-    created_notes = []
-    for timestamp, note_text in notes:
-        note = db.Note.create(
-            note_text,
-            timestamp=timestamp,
-        )
-        created_notes.append(note)
-    return created_notes
+    ids = db.Note.bulk_create(notes)
+    if ids:
+        notify_note_created()
+    return ids
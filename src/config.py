@@ -8,3 +8,72 @@ SERVER_PORT = int(os.environ.get("PLANNER_REST_SERVER_PORT", 9000))
 TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S"
 CHAT_SERVICE = os.environ.get("PLANNER_CHAT_SERVICE", "openai")
 CHAT_MODEL = os.environ.get("PLANNER_CHAT_MODEL", "gpt-4.1-2025-04-14")
+# sqlite tuning, see PRAGMA_PROFILES in src/db/connection.py
+SQLITE_PRAGMA_PROFILE = os.environ.get("PLANNER_SQLITE_PRAGMA_PROFILE", "wal")
+SQLITE_BUSY_TIMEOUT_MS = int(
+    os.environ.get("PLANNER_SQLITE_BUSY_TIMEOUT_MS", 5000)
+)
+SQLITE_CACHE_SIZE_KB = int(os.environ.get("PLANNER_SQLITE_CACHE_SIZE_KB", 8000))
+SQLITE_MMAP_SIZE = int(
+    os.environ.get("PLANNER_SQLITE_MMAP_SIZE", 64 * 1024 * 1024)
+)
+# notes inserted per transaction by Note.bulk_create
+NOTES_BULK_CHUNK = int(os.environ.get("PLANNER_NOTES_BULK_CHUNK", 10000))
+# rows read and encoded at a time by the exports in src/db/export.py
+EXPORT_CHUNK = int(os.environ.get("PLANNER_EXPORT_CHUNK", 5000))
+# rows read at a time by the list routes, see src/web/streaming.py
+LIST_STREAM_CHUNK = int(os.environ.get("PLANNER_LIST_STREAM_CHUNK", 500))
+# notes the engine sends to the LLM at the same time
+ENGINE_WORKERS = int(os.environ.get("PLANNER_ENGINE_WORKERS", 4))
+# how long an engine may hold a note before others can claim it, and how
+# many times a note is tried before it is left alone
+ENGINE_LEASE_SECONDS = int(
+    os.environ.get("PLANNER_ENGINE_LEASE_SECONDS", 300)
+)
+ENGINE_MAX_ATTEMPTS = int(os.environ.get("PLANNER_ENGINE_MAX_ATTEMPTS", 3))
+# notes annotated together in one LLM request, see src/processor/batch.py
+ENGINE_NOTES_PER_REQUEST = int(
+    os.environ.get("PLANNER_ENGINE_NOTES_PER_REQUEST", 1)
+)
+# local UDP port the engine listens on for new notes, see src/notify.py
+NOTIFY_PORT = int(os.environ.get("PLANNER_NOTIFY_PORT", 9001))
+# longest the engine sleeps between polls when nothing wakes it
+ENGINE_MAX_IDLE_SECONDS = float(
+    os.environ.get("PLANNER_ENGINE_MAX_IDLE_SECONDS", 30)
+)
+# LLM requests the process sends at the same time, and the tokens it may
+# use a minute (0 for no limit), see src/llm/client.py
+LLM_MAX_IN_FLIGHT = int(os.environ.get("PLANNER_LLM_MAX_IN_FLIGHT", 8))
+LLM_TOKENS_PER_MINUTE = int(
+    os.environ.get("PLANNER_LLM_TOKENS_PER_MINUTE", 0)
+)
+# notes, actions and todos given to the LLM as context for each note
+CONTEXT_WINDOW_SIZE = int(os.environ.get("PLANNER_CONTEXT_WINDOW_SIZE", 25))
+# find_todo takes the todo index's best match without asking the LLM when
+# the text has this much of the todo's terms (weighted by rarity), and it
+# scores this many times higher than the runner up
+TODO_MATCH_MIN_COVERAGE = float(
+    os.environ.get("PLANNER_TODO_MATCH_MIN_COVERAGE", 0.8)
+)
+TODO_MATCH_MIN_MARGIN = float(
+    os.environ.get("PLANNER_TODO_MATCH_MIN_MARGIN", 1.5)
+)
+# batch API backfills, see src/processor/backfill.py. Request and result
+# files are kept under BATCH_DIR
+BATCH_DIR = os.environ.get("PLANNER_BATCH_DIR", os.path.join("data", "batches"))
+BATCH_MAX_REQUESTS = int(os.environ.get("PLANNER_BATCH_MAX_REQUESTS", 50000))
+BATCH_POLL_SECONDS = float(os.environ.get("PLANNER_BATCH_POLL_SECONDS", 60))
+# notes applied in each transaction
+BATCH_APPLY_CHUNK = int(os.environ.get("PLANNER_BATCH_APPLY_CHUNK", 100))
+# LLM response cache, see src/llm/cache.py. "off", "on" to serve and
+# store responses, or "replay" to only serve them, never calling the LLM
+LLM_CACHE_MODE = os.environ.get("PLANNER_LLM_CACHE", "off")
+LLM_CACHE_PATH = os.environ.get(
+    "PLANNER_LLM_CACHE_PATH", os.path.join("data", "llm_cache.db")
+)
+LLM_CACHE_TTL_SECONDS = int(
+    os.environ.get("PLANNER_LLM_CACHE_TTL_SECONDS", 30 * 24 * 60 * 60)
+)
+LLM_CACHE_MAX_ENTRIES = int(
+    os.environ.get("PLANNER_LLM_CACHE_MAX_ENTRIES", 100_000)
+)
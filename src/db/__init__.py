@@ -7,15 +7,30 @@ from ..config import NOTES_DATABASE_FILEPATH
 from ..util import get_git_version
 
 from .version import Version
-from .note import Note
+from .note import Note, NoteRow
 from .action import Action
 from .todo import Todo
 from .tool_call import ToolCall
 from .curiosity import Curiosity
+from .session import Session, get_current_session, session_scope
+from .changes import changed_all
+from .export import (
+    EXPORT_FORMATS,
+    EXPORT_TABLES,
+    export_table,
+    iter_export,
+)
+from .journal import (
+    JOURNAL_MODES,
+    CHECKPOINT_MODES,
+    checkpoint,
+    get_journal_status,
+    set_journal_mode,
+)
 
 logger = logging.getLogger(__name__)
 
-DB_VERSION = "0.1.0"
+DB_VERSION = "0.6.0"
 
 
 def init_db():
@@ -32,6 +47,7 @@ def init_db():
     Todo.ensure_table()
     ToolCall.ensure_table()
     Curiosity.ensure_table()
+    changed_all()
     logger.info("tables ensured.")
 
 
@@ -41,10 +57,17 @@ def teardown():
         # Drop all tables
         cursor.execute("DROP TABLE IF EXISTS actions")
         cursor.execute("DROP TABLE IF EXISTS todos")
+        cursor.execute("DROP TABLE IF EXISTS todo_terms")
+        cursor.execute("DROP TABLE IF EXISTS todo_term_stats")
         cursor.execute("DROP TABLE IF EXISTS tool_calls")
         cursor.execute("DROP TABLE IF EXISTS curiosities")
         cursor.execute("DROP TABLE IF EXISTS notes")
+        cursor.execute("DROP TABLE IF EXISTS actions_fts")
+        cursor.execute("DROP TABLE IF EXISTS todos_fts")
+        cursor.execute("DROP TABLE IF EXISTS curiosities_fts")
+        cursor.execute("DROP TABLE IF EXISTS notes_fts")
         conn.commit()
+    changed_all()
 
 
 def strip_db():
@@ -57,12 +80,18 @@ def strip_db():
         # Drop all tables except for notes
         cursor.execute("DROP TABLE IF EXISTS actions")
         cursor.execute("DROP TABLE IF EXISTS todos")
+        cursor.execute("DROP TABLE IF EXISTS todo_terms")
+        cursor.execute("DROP TABLE IF EXISTS todo_term_stats")
         cursor.execute("DROP TABLE IF EXISTS tool_calls")
         cursor.execute("DROP TABLE IF EXISTS curiosities")
+        cursor.execute("DROP TABLE IF EXISTS actions_fts")
+        cursor.execute("DROP TABLE IF EXISTS todos_fts")
+        cursor.execute("DROP TABLE IF EXISTS curiosities_fts")
         cursor.execute(
             "update notes set processed_note_text = '', processing_error = '', processed = 0"
         )
         conn.commit()
+    changed_all()
     logger.info("database stripped.")
 
 
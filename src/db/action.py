@@ -1,12 +1,23 @@
 from datetime import datetime
-from typing import TYPE_CHECKING, List, Optional
+from typing import TYPE_CHECKING, ClassVar, List, Optional
 from pydantic import BaseModel, Field, PrivateAttr, ValidationError
 
-from ..config import TIMESTAMP_FORMAT
 from ..logging import get_logger
-from ..util import parse_time
+from ..util import chunked, format_time, parse_time
 from .note import Note
+from .changes import changed
 from .connection import get_connection
+from .fts import (
+    FULL_TEXT_INDEXES,
+    ensure_full_text_index,
+    format_snippet,
+    get_match_query,
+    get_matches,
+)
+from .indexes import ensure_indexes
+from .pagination import Page, get_cursor, get_next_cursor
+from .rows import construct
+from .session import forget, lookup, remember
 
 if TYPE_CHECKING:
     from .todo import Todo
@@ -14,12 +25,17 @@ if TYPE_CHECKING:
 
 logger = get_logger(__name__)
 
+# number of columns in the actions table
+ACTION_COLUMNS = 6
+
 
 class Action(BaseModel):
     """
     Represents an action that the user took
     """
 
+    table_name: ClassVar[str] = "actions"
+
     id: int = Field(..., description="Unique identifier for the action")
     timestamp: datetime = Field(
         ..., description="Start time of the action"
@@ -34,6 +50,17 @@ class Action(BaseModel):
     )
 
     _source_note: Optional[Note] = PrivateAttr(default=None)
+    _todo: Optional["Todo"] = PrivateAttr(default=None)
+    # filled in by get_all when searching
+    _snippet: Optional[str] = PrivateAttr(default=None)
+
+    @property
+    def snippet(self) -> Optional[str]:
+        """
+        The text around the search matches, as HTML, if the action was
+        found by searching.
+        """
+        return self._snippet
 
     @property
     def source_note(self) -> Note:
@@ -61,11 +88,20 @@ class Action(BaseModel):
         """
         Returns the todo associated with the action.
         """
-        if self.todo_id:
+        if not self.todo_id:
+            return None
+        # the cached todo goes stale if todo_id is reassigned
+        if self._todo is None or self._todo.id != self.todo_id:
             from .todo import Todo
 
-            return Todo.get_by_id(self.todo_id)
-        return None
+            self._todo = Todo.get_by_id(self.todo_id)
+        return self._todo
+
+    @todo.setter
+    def todo(self, todo: "Todo"):
+        if not todo.id == self.todo_id:
+            raise ValueError("todo ID does not match todo_id")
+        self._todo = todo
 
     @property
     def tool_calls(self) -> List["ToolCall"]:
@@ -96,20 +132,25 @@ class Action(BaseModel):
         with get_connection() as conn:
             cursor = conn.cursor()
             cursor.execute(query)
+            ensure_indexes(cursor, "actions")
+            ensure_full_text_index(cursor, "actions")
             conn.commit()
 
     @classmethod
     def from_sqlite_row(cls, row):
         """
-        Converts a SQLite row to a DbAction instance.
-        """
-        return cls(
-            id=row[0],
-            timestamp=parse_time(row[1]),
-            action_text=row[2],
-            source_note_id=row[3],
-            todo_id=row[4],
-            mark_complete=bool(row[5]),
+        Converts a trusted SQLite row to a DbAction instance.
+        """
+        return remember(
+            construct(
+                cls,
+                id=row[0],
+                timestamp=parse_time(row[1]),
+                action_text=row[2],
+                source_note_id=row[3],
+                todo_id=row[4],
+                mark_complete=bool(row[5]),
+            )
         )
 
     @classmethod
@@ -117,6 +158,9 @@ class Action(BaseModel):
         """
         Retrieves an action by its ID.
         """
+        action = lookup(cls, action_id)
+        if action is not None:
+            return action
         query = "SELECT * FROM actions WHERE id = ?"
         with get_connection() as conn:
             cursor = conn.cursor()
@@ -143,6 +187,25 @@ class Action(BaseModel):
                 [cls.from_sqlite_row(row) for row in rows] if rows else []
             )
 
+    @classmethod
+    def get_by_source_note_ids(cls, note_ids: List[int]) -> List["Action"]:
+        """
+        Retrieves the actions of several notes at once.
+        """
+        actions = []
+        with get_connection() as conn:
+            cursor = conn.cursor()
+            for chunk in chunked(note_ids):
+                placeholders = ", ".join("?" for _ in chunk)
+                cursor.execute(
+                    f"SELECT * FROM actions WHERE source_note_id IN ({placeholders})",
+                    chunk,
+                )
+                actions.extend(
+                    cls.from_sqlite_row(row) for row in cursor.fetchall()
+                )
+        return actions
+
     @classmethod
     def count(
         cls,
@@ -167,12 +230,12 @@ class Action(BaseModel):
         if before:
             query += " AND timestamp < ?"
             if isinstance(before, datetime):
-                before = datetime.strftime(before, TIMESTAMP_FORMAT)
+                before = format_time(before)
             params.append(before)
         if after:
             query += " AND timestamp > ?"
             if isinstance(after, datetime):
-                after = datetime.strftime(after, TIMESTAMP_FORMAT)
+                after = format_time(after)
             params.append(after)
         with get_connection() as conn:
             cursor = conn.cursor()
@@ -238,7 +301,7 @@ class Action(BaseModel):
             cursor.execute(
                 query,
                 (
-                    datetime.strftime(self.timestamp, TIMESTAMP_FORMAT),
+                    format_time(self.timestamp),
                     self.action_text,
                     self.todo_id,
                     int(self.mark_complete),
@@ -246,6 +309,7 @@ class Action(BaseModel):
                 ),
             )
             conn.commit()
+        changed("actions", self)
 
     @classmethod
     def create(
@@ -262,6 +326,7 @@ class Action(BaseModel):
         query = """
             INSERT INTO actions (timestamp, action_text, source_note_id, todo_id, mark_complete)
             VALUES (?, ?, ?, ?, ?)
+            RETURNING *
         """
         with get_connection() as conn:
             cursor = conn.cursor()
@@ -271,7 +336,7 @@ class Action(BaseModel):
                     (
                         timestamp
                         if isinstance(timestamp, str)
-                        else datetime.strftime(timestamp, TIMESTAMP_FORMAT)
+                        else format_time(timestamp)
                     ),
                     action_text,
                     source_note_id,
@@ -279,22 +344,16 @@ class Action(BaseModel):
                     mark_complete,
                 ),
             )
+            row = cursor.fetchone()
             conn.commit()
-            action_id = cursor.lastrowid
-        if action_id is None:
+        if row is None:
             raise ValueError("Failed to create action in the database.")
         try:
-            action = cls.get_by_id(action_id)
+            action = cls.from_sqlite_row(row)
         except ValidationError as e:
             logger.error(f"Failed to create action: {e}")
             raise
-        if action is None:
-            logger.error(
-                f"Failed to retrieve created action with ID {action_id}."
-            )
-            raise ValueError(
-                f"Failed to retrieve created action with ID {action_id}."
-            )
+        changed("actions", action)
         return action
 
     def delete(self):
@@ -310,6 +369,13 @@ class Action(BaseModel):
                 cursor = conn.cursor()
                 cursor.execute(todo_query, (self.todo_id,))
                 conn.commit()
+            # keep a todo loaded in the current session in step
+            from .todo import Todo
+
+            todo = lookup(Todo, self.todo_id)
+            if todo is not None:
+                todo.complete = False
+            changed("todos", todo)
         query = """
             DELETE FROM actions WHERE id = ?
         """
@@ -317,6 +383,8 @@ class Action(BaseModel):
             cursor = conn.cursor()
             cursor.execute(query, (self.id,))
             conn.commit()
+        forget(self)
+        changed("actions", self, deleted=True)
 
     @classmethod
     def get_all(
@@ -327,45 +395,105 @@ class Action(BaseModel):
         offset: Optional[int] = 0,
         limit: Optional[int] = 25,
         applied_to_todo: Optional[bool] = None,
-    ):
-        """
-        Reads actions from the database.
-        """
-        query = """
-            SELECT * FROM actions
-            WHERE 1=1
-        """
+        include_todo: bool = False,
+        cursor: Optional[str] = None,
+    ) -> Page["Action"]:
+        """
+        Reads actions from the database. include_todo joins in the todo of
+        each action, so that reading action.todo needs no further queries.
+        A search returns the best matches first, each with its snippet.
+        Pass the next_cursor of a page as cursor for the page after it.
+        """
+        page = get_cursor(cursor)
+        match = get_match_query(search) if search else None
+        fts = FULL_TEXT_INDEXES["actions"]
+        columns = "actions.*, todos.*" if include_todo else "actions.*"
+        if match:
+            columns += f", {fts.snippet}"
+        from_where = "FROM actions"
+        if include_todo:
+            from_where += " LEFT JOIN todos ON actions.todo_id = todos.id"
+        if match:
+            from_where += (
+                f" JOIN {fts.name} ON {fts.name}.rowid = actions.id"
+            )
+        from_where += " WHERE 1=1"
         params = []
+        if match:
+            from_where += f" AND {fts.name} MATCH ?"
+            params.append(match)
         # build the query dynamically
         if before:
-            query += " AND timestamp < ?"
+            from_where += " AND actions.timestamp < ?"
             if isinstance(before, datetime):
-                before = datetime.strftime(before, TIMESTAMP_FORMAT)
+                before = format_time(before)
             params.append(before)
         if after:
-            query += " AND timestamp > ?"
+            from_where += " AND actions.timestamp > ?"
             if isinstance(after, datetime):
-                after = datetime.strftime(after, TIMESTAMP_FORMAT)
+                after = format_time(after)
             params.append(after)
-        if search:
-            query += " AND action_text LIKE ?"
-            params.append(f"%{search}%")
         if applied_to_todo is not None:
             # if true, only show actions where the todoid is not null
             if applied_to_todo:
-                query += " AND todo_id IS NOT NULL"
+                from_where += " AND actions.todo_id IS NOT NULL"
             else:
-                query += " AND todo_id IS NULL"
-        # apply offset,  limit an order
-        query += " ORDER BY timestamp DESC LIMIT ? OFFSET ?"
-        params.append(limit)
-        params.append(offset)
+                from_where += " AND actions.todo_id IS NULL"
+        if page.id is not None and not match:
+            from_where += " AND (actions.timestamp, actions.id) < (?, ?)"
+            params.extend([page.timestamp, page.id])
         # run query and return results
+        older_match = False
         with get_connection() as conn:
-            cursor = conn.cursor()
-            cursor.execute(query, params)
-            rows = cursor.fetchall()
-            return [cls.from_sqlite_row(row) for row in rows]
+            db_cursor = conn.cursor()
+            # apply offset,  limit an order
+            if match:
+                rows, older_match = get_matches(
+                    db_cursor,
+                    fts,
+                    f"SELECT {columns}",
+                    from_where,
+                    params,
+                    "rank, actions.timestamp DESC, actions.id DESC",
+                    limit,
+                    offset + page.offset,
+                    page.match_id,
+                )
+            else:
+                db_cursor.execute(
+                    f"SELECT {columns} {from_where} ORDER BY actions.timestamp DESC, actions.id DESC LIMIT ? OFFSET ?",
+                    (*params, limit, offset + page.offset),
+                )
+                rows = db_cursor.fetchall()
+        next_cursor = get_next_cursor(
+            page,
+            rows,
+            limit,
+            1,
+            ranked=bool(match),
+            older_match=older_match,
+        )
+        snippets = [None] * len(rows)
+        if match:
+            snippets = [format_snippet(row[-1]) for row in rows]
+            rows = [row[:-1] for row in rows]
+        if not include_todo:
+            actions = [cls.from_sqlite_row(row) for row in rows]
+        else:
+            from .todo import Todo
+
+            actions = []
+            for row in rows:
+                action = cls.from_sqlite_row(row[:ACTION_COLUMNS])
+                # the todo columns are all null when there is no todo
+                if row[ACTION_COLUMNS] is not None:
+                    action.todo = Todo.from_sqlite_row(
+                        row[ACTION_COLUMNS:]
+                    )
+                actions.append(action)
+        for action, snippet in zip(actions, snippets):
+            action._snippet = snippet
+        return Page(actions, next_cursor)
 
     @classmethod
     def find_by_annotation_id(
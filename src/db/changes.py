@@ -0,0 +1,66 @@
+"""
+Lets caches hear about writes made through the models.
+
+The note, action and todo models call changed() after every insert,
+update and delete, with the object that changed. Listeners are called
+with the table name, the object (None when any row of the table may have
+changed) and whether it was deleted. A rolled back session calls changed() for every table, as the
+objects it announced may never have been written.
+
+Only writes made through the models in this process are announced. Caches
+that must also see other processes' writes can check PRAGMA data_version.
+"""
+
+import threading
+from typing import Callable, List, Optional
+
+from pydantic import BaseModel
+
+from ..logging import get_logger
+
+logger = get_logger(__name__)
+
+Listener = Callable[[str, Optional[BaseModel], bool], None]
+
+TABLES = ("notes", "actions", "todos")
+
+_listeners: List[Listener] = []
+_lock = threading.Lock()
+
+
+def add_listener(listener: Listener):
+    with _lock:
+        _listeners.append(listener)
+
+
+def remove_listener(listener: Listener):
+    with _lock:
+        if listener in _listeners:
+            _listeners.remove(listener)
+
+
+def changed(
+    table_name: str,
+    obj: Optional[BaseModel] = None,
+    deleted: bool = False,
+):
+    """
+    Announces a write to table_name. Leave out obj when more than one row
+    may have changed.
+    """
+    with _lock:
+        listeners = list(_listeners)
+    for listener in listeners:
+        try:
+            listener(table_name, obj, deleted)
+        except Exception as e:
+            # a broken cache must not fail the write
+            logger.error(f"change listener {listener} failed: {e}")
+
+
+def changed_all():
+    """
+    Announces that any row of any table may have changed.
+    """
+    for table_name in TABLES:
+        changed(table_name)
@@ -1,14 +1,263 @@
 import sqlite3
 import os
+import threading
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Callable, Dict, Iterator, List, Optional
+
+from ..config import (
+    SQLITE_BUSY_TIMEOUT_MS,
+    SQLITE_CACHE_SIZE_KB,
+    SQLITE_MMAP_SIZE,
+    SQLITE_PRAGMA_PROFILE,
+)
+from ..logging import get_logger
 from ..settings import get_setting
+from .session import get_current_session
+
+logger = get_logger(__name__)
+
+Pragmas = Dict[str, str | int]
+
+# applied in order, once, when a connection is first opened. busy_timeout
+# comes first so that switching the journal mode can wait on other
+# connections.
+PRAGMA_PROFILES: Dict[str, Pragmas] = {
+    # readers and the writer don't block each other, and commits only
+    # fsync at checkpoints
+    "wal": {
+        "busy_timeout": SQLITE_BUSY_TIMEOUT_MS,
+        "journal_mode": "wal",
+        "synchronous": "normal",
+        "wal_autocheckpoint": 1000,  # pages
+        "journal_size_limit": 64 * 1024 * 1024,
+        "cache_size": -SQLITE_CACHE_SIZE_KB,  # negative means KiB
+        "mmap_size": SQLITE_MMAP_SIZE,
+        "temp_store": "memory",
+    },
+    # sqlite's defaults, for comparison and for filesystems without shared
+    # memory support (network drives)
+    "rollback": {
+        "busy_timeout": SQLITE_BUSY_TIMEOUT_MS,
+        "journal_mode": "delete",
+        "synchronous": "full",
+        "cache_size": -SQLITE_CACHE_SIZE_KB,
+    },
+}
+
+
+def get_pragma_profile(name: str) -> Pragmas:
+    """
+    Returns a copy of the named pragma profile.
+    """
+    if name not in PRAGMA_PROFILES:
+        raise ValueError(
+            f"Unknown pragma profile {name}, expected one of {list(PRAGMA_PROFILES)}"
+        )
+    return dict(PRAGMA_PROFILES[name])
+
+
+def get_journal_mode_setting_key(notebook: str) -> str:
+    """
+    Returns the settings key holding a notebook's journal mode override.
+    """
+    return f"journal_mode:{notebook}"
+
+
+def get_notebook_path(notebook: str) -> str:
+    """
+    Returns the path of the database file for the given notebook.
+    """
+    return os.path.join("data", "notebooks", f"{notebook}.db")
+
+
+@dataclass
+class ConnectionStats:
+    """
+    Connection and statement counts for the current thread, since the last
+    reset. The web server resets these at the start of every request.
+    """
+
+    connections_opened: int = 0
+    connections_reused: int = 0
+    queries: int = 0
+
+
+class ConnectionManager:
+    """
+    Hands out one SQLite connection per thread per notebook, instead of
+    opening a new connection for every query.
+
+    sqlite3 connections may not be shared between threads, so each thread
+    gets its own set. When the active notebook changes, `invalidate` bumps
+    a generation counter, and each thread closes its stale connections the
+    next time it asks for one.
+    """
+
+    def __init__(self, pragmas: Optional[Pragmas] = None):
+        self.pragmas = (
+            get_pragma_profile(SQLITE_PRAGMA_PROFILE)
+            if pragmas is None
+            else pragmas
+        )
+        self._local = threading.local()
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    def _thread_state(self) -> threading.local:
+        local = self._local
+        if not hasattr(local, "connections"):
+            local.connections = {}
+            local.generation = self._generation
+            local.stats = ConnectionStats()
+            local.statements = None
+        return local
+
+    def _configure(
+        self, connection: sqlite3.Connection, overrides: Pragmas
+    ):
+        """
+        Applies the pragmas and hooks up statement counting and capture.
+        """
+        cursor = connection.cursor()
+        for pragma, value in {**self.pragmas, **overrides}.items():
+            cursor.execute(f"PRAGMA {pragma} = {value}")
+            if pragma == "journal_mode":
+                # sqlite reports the mode it ended up in, which differs when
+                # the switch was impossible (in-memory dbs, held locks)
+                mode = cursor.fetchone()[0]
+                if mode != value:
+                    logger.debug(
+                        f"requested journal_mode {value}, got {mode}"
+                    )
+        connection.set_trace_callback(self._count_statement)
+
+    def _count_statement(self, statement: str):
+        # connections never leave their thread, so this is the owner's stats
+        local = self._local
+        local.stats.queries += 1
+        if local.statements is not None:
+            local.statements.append(statement)
+
+    def connect(
+        self,
+        path: str,
+        get_overrides: Optional[Callable[[], Pragmas]] = None,
+    ) -> sqlite3.Connection:
+        """
+        Returns this thread's connection to the given database, opening it
+        if needed. `get_overrides` is only called when a connection is
+        opened, and its pragmas take precedence over the manager's.
+        """
+        local = self._thread_state()
+        if local.generation != self._generation:
+            self._close_thread_connections(local)
+            local.generation = self._generation
+        connection = local.connections.get(path)
+        if connection is not None:
+            local.stats.connections_reused += 1
+            return connection
+        connection = sqlite3.connect(path)
+        self._configure(
+            connection, get_overrides() if get_overrides else {}
+        )
+        local.connections[path] = connection
+        local.stats.connections_opened += 1
+        return connection
+
+    def invalidate(self):
+        """
+        Marks every open connection as stale. Called when the active
+        notebook changes.
+        """
+        with self._lock:
+            self._generation += 1
+
+    @property
+    def generation(self) -> int:
+        """
+        Goes up every time the connections are invalidated.
+        """
+        return self._generation
+
+    def close(self):
+        """
+        Closes all connections held by the calling thread.
+        """
+        self._close_thread_connections(self._thread_state())
+
+    @staticmethod
+    def _close_thread_connections(local: threading.local):
+        for connection in local.connections.values():
+            connection.close()
+        local.connections = {}
+
+    @property
+    def stats(self) -> ConnectionStats:
+        """
+        Returns the connection stats for the calling thread.
+        """
+        return self._thread_state().stats
+
+    @contextmanager
+    def capture_statements(self) -> Iterator[List[str]]:
+        """
+        Collects the SQL of every statement the calling thread runs in the
+        block, with its parameters filled in.
+        """
+        local = self._thread_state()
+        previous = local.statements
+        local.statements = statements = []
+        try:
+            yield statements
+        finally:
+            local.statements = previous
+
+    def reset_stats(self) -> ConnectionStats:
+        """
+        Resets the calling thread's stats, returning the old ones.
+        """
+        local = self._thread_state()
+        previous = local.stats
+        local.stats = ConnectionStats()
+        return previous
+
+
+connection_manager = ConnectionManager()
+
+
+def get_notebook_overrides(notebook: str) -> Pragmas:
+    """
+    Returns the pragmas configured for one notebook through the CLI, which
+    take precedence over the profile.
+    """
+    journal_mode = get_setting(get_journal_mode_setting_key(notebook))
+    return {"journal_mode": journal_mode} if journal_mode else {}
+
+
+def get_notebook() -> str:
+    """
+    Returns the name of the notebook get_connection() connects to by
+    default: the session's inside a session, otherwise the active one.
+    """
+    session = get_current_session()
+    if session is not None and session.notebook is not None:
+        return session.notebook
+    return get_setting("notebook") or "default"
 
 
 def get_connection(notebook: str | None = None) -> sqlite3.Connection:
     """
-    Establishes a connection to the SQLite database.
+    Returns a connection to the notebook's SQLite database, reusing the
+    calling thread's connection when one is already open. Inside a
+    session, this is the session's connection.
     """
+    session = get_current_session()
+    if session is not None and notebook in (None, session.notebook):
+        return session.connection  # type: ignore[return-value]
     if notebook is None:
-        notebook = get_setting("notebook") or "default"
-    connection_path = os.path.join("data", "notebooks", f"{notebook}.db")
-    connection = sqlite3.connect(connection_path)
-    return connection
+        notebook = get_notebook()
+    return connection_manager.connect(
+        get_notebook_path(notebook),
+        lambda: get_notebook_overrides(notebook),
+    )
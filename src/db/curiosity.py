@@ -1,12 +1,23 @@
 from datetime import datetime
-from typing import TYPE_CHECKING, List, Optional
+from typing import TYPE_CHECKING, ClassVar, List, Optional
 from pydantic import BaseModel, Field, PrivateAttr
 
 
 from ..logging import get_logger
-from ..util import format_time
+from ..util import chunked, format_time
 from .note import Note
 from .connection import get_connection
+from .fts import (
+    FULL_TEXT_INDEXES,
+    ensure_full_text_index,
+    format_snippet,
+    get_match_query,
+    get_matches,
+)
+from .indexes import ensure_indexes
+from .pagination import Page, get_cursor, get_next_cursor
+from .rows import construct
+from .session import forget, lookup, remember
 
 
 if TYPE_CHECKING:
@@ -20,11 +31,23 @@ class Curiosity(BaseModel):
     Represents a curiosity that the user took
     """
 
+    table_name: ClassVar[str] = "curiosities"
+
     id: int = Field(..., description="Unique identifier for the curiosity")
     curiosity_text: str = Field(..., description="Text of the curiosity")
     source_note_id: int = Field(..., description="ID of the source note")
 
     _source_note: Optional[Note] = PrivateAttr(default=None)
+    # filled in by get_all when searching
+    _snippet: Optional[str] = PrivateAttr(default=None)
+
+    @property
+    def snippet(self) -> Optional[str]:
+        """
+        The text around the search matches, as HTML, if the curiosity was
+        found by searching.
+        """
+        return self._snippet
 
     @property
     def source_note(self) -> Note:
@@ -72,20 +95,32 @@ class Curiosity(BaseModel):
         with get_connection() as conn:
             cursor = conn.cursor()
             cursor.execute(query)
+            ensure_indexes(cursor, "curiosities")
+            ensure_full_text_index(cursor, "curiosities")
             conn.commit()
 
     @classmethod
     def from_sqlite_row(cls, row):
         """
-        Creates a Curiosity object from a SQLite row.
+        Creates a Curiosity object from a trusted SQLite row.
         """
-        return cls(id=row[0], curiosity_text=row[1], source_note_id=row[2])
+        return remember(
+            construct(
+                cls,
+                id=row[0],
+                curiosity_text=row[1],
+                source_note_id=row[2],
+            )
+        )
 
     @classmethod
     def get_by_id(cls, id: int) -> Optional["Curiosity"]:
         """
         Returns a Curiosity object by its ID.
         """
+        curiosity = lookup(cls, id)
+        if curiosity is not None:
+            return curiosity
         with get_connection() as conn:
             cursor = conn.cursor()
             cursor.execute("SELECT * FROM curiosities WHERE id = ?", (id,))
@@ -112,6 +147,27 @@ class Curiosity(BaseModel):
                 [cls.from_sqlite_row(row) for row in rows] if rows else []
             )
 
+    @classmethod
+    def get_by_source_note_ids(
+        cls, note_ids: List[int]
+    ) -> List["Curiosity"]:
+        """
+        Retrieves the curiosities of several notes at once.
+        """
+        curiosities = []
+        with get_connection() as conn:
+            cursor = conn.cursor()
+            for chunk in chunked(note_ids):
+                placeholders = ", ".join("?" for _ in chunk)
+                cursor.execute(
+                    f"SELECT * FROM curiosities WHERE source_note_id IN ({placeholders})",
+                    chunk,
+                )
+                curiosities.extend(
+                    cls.from_sqlite_row(row) for row in cursor.fetchall()
+                )
+        return curiosities
+
     def refresh(self):
         copy = self.get_by_id(self.id)
         if copy:
@@ -170,7 +226,7 @@ class Curiosity(BaseModel):
             source_note_id=source_note_id,
         )
         curiosity.save()
-        return curiosity
+        return remember(curiosity)
 
     def delete(self):
         """
@@ -185,6 +241,7 @@ class Curiosity(BaseModel):
             cursor = conn.cursor()
             cursor.execute(query, (self.id,))
             conn.commit()
+        forget(self)
 
     @classmethod
     def get_all(
@@ -194,39 +251,82 @@ class Curiosity(BaseModel):
         search: Optional[str] = None,
         offset: Optional[int] = 0,
         limit: Optional[int] = 15,
-    ) -> List["Curiosity"]:
+        cursor: Optional[str] = None,
+    ) -> Page["Curiosity"]:
         """
-        Returns a list of all Curiosity objects in the database.
+        Returns a list of all Curiosity objects in the database, newest
+        note first. A search returns the best matches first, each with its
+        snippet. Pass the next_cursor of a page as cursor for the page
+        after it.
         """
-        query = """
-            SELECT
+        page = get_cursor(cursor)
+        match = get_match_query(search) if search else None
+        fts = FULL_TEXT_INDEXES["curiosities"]
+        snippet = f",\n {fts.snippet}" if match else ""
+        columns = f"""
                 curiosities.id,
                 curiosities.curiosity_text,
-                curiosities.source_note_id
+                curiosities.source_note_id,
+                notes.timestamp{snippet}
+        """
+        from_where = """
             FROM curiosities
             JOIN notes ON curiosities.source_note_id = notes.id
         """
         args = []
-        query += " WHERE 1=1"
+        if match:
+            from_where += (
+                f" JOIN {fts.name} ON {fts.name}.rowid = curiosities.id"
+            )
+        from_where += " WHERE 1=1"
         if before:
             if isinstance(before, datetime):
                 before = format_time(before)
-            query += " AND notes.timestamp < ?"
+            from_where += " AND notes.timestamp < ?"
             args.append(before)
         if after:
             if isinstance(after, datetime):
                 after = format_time(after)
-            query += " AND notes.timestamp > ?"
+            from_where += " AND notes.timestamp > ?"
             args.append(after)
-        if search:
-            query += " AND curiosities.curiosity_text LIKE ?"
-            args.append(f"%{search}%")
-        query += " ORDER BY notes.timestamp DESC"
-        query += " LIMIT ? OFFSET ?"
-        args.append(limit)
-        args.append(offset)
+        if page.id is not None and not match:
+            from_where += " AND (notes.timestamp, curiosities.id) < (?, ?)"
+            args.extend([page.timestamp, page.id])
+        older_match = False
         with get_connection() as conn:
-            cursor = conn.cursor()
-            cursor.execute(query, args)
-            rows = cursor.fetchall()
-            return [cls.from_sqlite_row(row) for row in rows]
+            db_cursor = conn.cursor()
+            if match:
+                from_where += f" AND {fts.name} MATCH ?"
+                args.append(match)
+                rows, older_match = get_matches(
+                    db_cursor,
+                    fts,
+                    f"SELECT {columns}",
+                    from_where,
+                    args,
+                    "rank, notes.timestamp DESC, curiosities.id DESC",
+                    limit,
+                    offset + page.offset,
+                    page.match_id,
+                )
+            else:
+                db_cursor.execute(
+                    f"SELECT {columns} {from_where} ORDER BY notes.timestamp DESC, curiosities.id DESC LIMIT ? OFFSET ?",
+                    (*args, limit, offset + page.offset),
+                )
+                rows = db_cursor.fetchall()
+        curiosities = Page(
+            [cls.from_sqlite_row(row) for row in rows],
+            get_next_cursor(
+                page,
+                rows,
+                limit,
+                3,
+                ranked=bool(match),
+                older_match=older_match,
+            ),
+        )
+        if match:
+            for curiosity, row in zip(curiosities, rows):
+                curiosity._snippet = format_snippet(row[-1])
+        return curiosities
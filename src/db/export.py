@@ -0,0 +1,249 @@
+"""
+Streaming exports of the notebook's tables, as CSV, JSONL or Parquet.
+
+A table is read EXPORT_CHUNK rows at a time, each chunk starting after the
+id of the last row of the one before, and every chunk is encoded and
+handed on before the next one is read. Memory stays the same however big
+the notebook is, and no read statement is held open between chunks, so a
+slow reader on the other end of a download doesn't hold up the engine.
+
+iter_export yields the encoded bytes, optionally gzipped, for the web
+routes to stream. export_table writes them to a file.
+
+Values are exported as stored: timestamps stay in TIMESTAMP_FORMAT. Parquet
+needs pyarrow, which is only imported for Parquet exports; each chunk is
+written as its own row group.
+"""
+
+import csv
+import io
+import json
+import sqlite3
+import zlib
+from typing import BinaryIO, Dict, Iterable, Iterator, List, Optional
+
+from ..config import EXPORT_CHUNK
+from ..errors import ExportError, ExportUnavailableError
+from .connection import get_connection
+
+EXPORT_TABLES = ("notes", "todos", "actions", "curiosities", "tool_calls")
+EXPORT_FORMATS: Dict[str, str] = {
+    "csv": "text/csv",
+    "jsonl": "application/x-ndjson",
+    "parquet": "application/vnd.apache.parquet",
+}
+
+
+def get_columns(cursor: sqlite3.Cursor, table: str) -> Dict[str, str]:
+    """
+    The table's columns, in order, with their declared types.
+    """
+    cursor.execute(f"PRAGMA table_info({table})")
+    return {row[1]: row[2] for row in cursor.fetchall()}
+
+
+def get_export_columns(
+    table: str, columns: Optional[List[str]] = None
+) -> Dict[str, str]:
+    """
+    Checks the table and columns of an export, and returns the columns
+    with their declared types. All of the table's columns by default.
+    """
+    if table not in EXPORT_TABLES:
+        raise ExportError(f"Can't export table {table!r}")
+    with get_connection() as conn:
+        declared = get_columns(conn.cursor(), table)
+    if columns is None:
+        return declared
+    unknown = [column for column in columns if column not in declared]
+    if unknown:
+        raise ExportError(f"{table} has no columns {', '.join(unknown)}")
+    return {column: declared[column] for column in columns}
+
+
+def iter_rows(
+    table: str, columns: List[str], chunk_size: int = EXPORT_CHUNK
+) -> Iterator[List[tuple]]:
+    """
+    Yields the table's rows in id order, chunk_size at a time.
+    """
+    query = f"""
+        SELECT {", ".join(columns)}, id FROM {table}
+        WHERE id > ? ORDER BY id LIMIT ?
+    """
+    last_id = 0
+    while True:
+        with get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(query, (last_id, chunk_size))
+            rows = cursor.fetchall()
+        if not rows:
+            return
+        last_id = rows[-1][-1]
+        yield [row[:-1] for row in rows]
+        if len(rows) < chunk_size:
+            return
+
+
+def iter_csv(
+    columns: Dict[str, str], chunks: Iterable[List[tuple]]
+) -> Iterator[bytes]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    for rows in chunks:
+        writer.writerows(rows)
+        yield buffer.getvalue().encode()
+        buffer.seek(0)
+        buffer.truncate()
+    # the header of a table without rows
+    if buffer.tell():
+        yield buffer.getvalue().encode()
+
+
+def iter_jsonl(
+    columns: Dict[str, str], chunks: Iterable[List[tuple]]
+) -> Iterator[bytes]:
+    names = list(columns)
+    for rows in chunks:
+        yield "".join(
+            json.dumps(dict(zip(names, row)), ensure_ascii=False) + "\n"
+            for row in rows
+        ).encode()
+
+
+class Spool(io.RawIOBase):
+    """
+    A write-only file that keeps what is written until it is drained,
+    while reporting the position in the whole output, which the Parquet
+    footer refers to.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._parts: List[bytes] = []
+        self._position = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        data = bytes(data)
+        self._parts.append(data)
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def drain(self) -> bytes:
+        data = b"".join(self._parts)
+        self._parts = []
+        return data
+
+
+def get_arrow_type(pa, declared_type: str):
+    """
+    The Arrow type of a column, from its declared SQLite type.
+    """
+    declared_type = declared_type.upper()
+    if "INT" in declared_type:
+        return pa.int64()
+    if any(real in declared_type for real in ("REAL", "FLOA", "DOUB")):
+        return pa.float64()
+    return pa.string()
+
+
+def iter_parquet(
+    columns: Dict[str, str], chunks: Iterable[List[tuple]]
+) -> Iterator[bytes]:
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError as e:
+        raise ExportUnavailableError(
+            "Parquet exports need pyarrow installed"
+            " (pip install -r requirements/prod.txt)"
+        ) from e
+    schema = pa.schema(
+        [
+            (name, get_arrow_type(pa, type))
+            for name, type in columns.items()
+        ]
+    )
+
+    def encode() -> Iterator[bytes]:
+        spool = Spool()
+        writer = pq.ParquetWriter(spool, schema)
+        try:
+            for rows in chunks:
+                writer.write_table(
+                    pa.Table.from_arrays(
+                        [
+                            pa.array(column, type=field.type)
+                            for column, field in zip(zip(*rows), schema)
+                        ],
+                        schema=schema,
+                    )
+                )
+                yield spool.drain()
+        finally:
+            writer.close()
+        yield spool.drain()
+
+    return encode()
+
+
+def gzip_chunks(chunks: Iterable[bytes]) -> Iterator[bytes]:
+    """
+    Compresses a stream of bytes into a gzip stream, chunk by chunk.
+    """
+    compressor = zlib.compressobj(wbits=zlib.MAX_WBITS | 16)
+    for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+
+ENCODERS = {"csv": iter_csv, "jsonl": iter_jsonl, "parquet": iter_parquet}
+
+
+def iter_export(
+    table: str,
+    format: str = "csv",
+    columns: Optional[List[str]] = None,
+    compress: bool = False,
+    chunk_size: int = EXPORT_CHUNK,
+) -> Iterator[bytes]:
+    """
+    Returns an iterator over an export of the table, as bytes. The table,
+    columns and format are checked straight away, so that a bad export
+    fails before any of it is sent.
+    """
+    if format not in ENCODERS:
+        raise ExportError(f"Can't export to {format!r}")
+    export_columns = get_export_columns(table, columns)
+    encoded = ENCODERS[format](
+        export_columns, iter_rows(table, list(export_columns), chunk_size)
+    )
+    return gzip_chunks(encoded) if compress else encoded
+
+
+def export_table(
+    table: str,
+    file: str | BinaryIO,
+    format: str = "csv",
+    columns: Optional[List[str]] = None,
+    compress: bool = False,
+    chunk_size: int = EXPORT_CHUNK,
+):
+    """
+    Writes an export of the table to a path or a binary file.
+    """
+    chunks = iter_export(table, format, columns, compress, chunk_size)
+    if isinstance(file, str):
+        with open(file, "wb") as f:
+            f.writelines(chunks)
+    else:
+        file.writelines(chunks)
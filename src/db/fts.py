@@ -0,0 +1,270 @@
+"""
+Full-text search over the text columns of the notebook, with SQLite FTS5.
+
+Each searchable table has an external-content FTS5 table next to it,
+named <table>_fts, whose rowid is the row's id. Triggers keep it in step
+with every insert, update and delete, so the models don't have to. The
+FTS5 tables have to be dropped along with their tables.
+
+The search argument of the models' get_all methods is turned into an FTS5
+query by get_match_query: every word has to appear, "quoted phrases" have
+to appear as written, and a trailing * matches any word starting with what
+comes before it. Matches are ranked by bm25, and come with a snippet of
+the text around them.
+
+Ranking costs a few microseconds per match, which adds up for a word that
+is in tens of thousands of notes. Only the RANK_WINDOW most recent matches
+are ranked, which get_rank_cutoff finds by walking the matches newest
+first, without ranking them. get_matches returns those first, and then the
+older matches, newest first, so that paging through a search still
+reaches every match.
+"""
+
+import html
+import re
+import sqlite3
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+# snippet() marks the matches with these, and format_snippet turns them
+# into <mark> tags once the rest of the snippet has been escaped
+MATCH_START = "\x02"
+MATCH_END = "\x03"
+SNIPPET_TOKENS = 12
+RANK_WINDOW = 1000
+
+# a "quoted phrase", or a word with an optional trailing *
+TERM = re.compile(r'"([^"]*)"|([^\s"]+)')
+WORD = re.compile(r"\w+")
+
+
+@dataclass(frozen=True)
+class FullTextIndex:
+    """
+    The FTS5 table for one text column of a notebook table.
+    """
+
+    table: str
+    column: str
+
+    @property
+    def name(self) -> str:
+        return f"{self.table}_fts"
+
+    @property
+    def create_statements(self) -> List[str]:
+        name, table, column = self.name, self.table, self.column
+        return [
+            f"""
+            CREATE VIRTUAL TABLE IF NOT EXISTS {name} USING fts5(
+                {column},
+                content='{table}',
+                content_rowid='id',
+                tokenize='porter unicode61',
+                prefix='2 3'
+            )
+            """,
+            self.insert_trigger,
+            f"""
+            CREATE TRIGGER IF NOT EXISTS {name}_delete AFTER DELETE ON {table}
+            BEGIN
+                INSERT INTO {name} ({name}, rowid, {column}) VALUES ('delete', old.id, old.{column});
+            END
+            """,
+            f"""
+            CREATE TRIGGER IF NOT EXISTS {name}_update AFTER UPDATE OF {column} ON {table}
+            WHEN old.{column} IS NOT new.{column}
+            BEGIN
+                INSERT INTO {name} ({name}, rowid, {column}) VALUES ('delete', old.id, old.{column});
+                INSERT INTO {name} (rowid, {column}) VALUES (new.id, new.{column});
+            END
+            """,
+        ]
+
+    @property
+    def insert_trigger(self) -> str:
+        name, table, column = self.name, self.table, self.column
+        return f"""
+            CREATE TRIGGER IF NOT EXISTS {name}_insert AFTER INSERT ON {table}
+            BEGIN
+                INSERT INTO {name} (rowid, {column}) VALUES (new.id, new.{column});
+            END
+            """
+
+    @property
+    def snippet(self) -> str:
+        """
+        The SQL for a snippet of the matching row, to select alongside it.
+        """
+        return (
+            f"snippet({self.name}, 0, '{MATCH_START}', '{MATCH_END}', "
+            f"'…', {SNIPPET_TOKENS})"
+        )
+
+
+# keep src/db/migrations in step when adding to this list
+FULL_TEXT_INDEXES: Dict[str, FullTextIndex] = {
+    "notes": FullTextIndex("notes", "note_text"),
+    "todos": FullTextIndex("todos", "todo_text"),
+    "actions": FullTextIndex("actions", "action_text"),
+    "curiosities": FullTextIndex("curiosities", "curiosity_text"),
+}
+
+
+def ensure_full_text_index(cursor: sqlite3.Cursor, table: str):
+    """
+    Creates the FTS5 table and triggers for the given table, if it has
+    them and they are missing. A new FTS5 table is filled from the rows
+    already there.
+    """
+    index = FULL_TEXT_INDEXES.get(table)
+    if index is None:
+        return
+    exists = cursor.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?",
+        (index.name,),
+    ).fetchone()
+    for statement in index.create_statements:
+        cursor.execute(statement)
+    if not exists:
+        cursor.execute(
+            f"INSERT INTO {index.name} ({index.name}) VALUES ('rebuild')"
+        )
+
+
+@contextmanager
+def bulk_insert(cursor: sqlite3.Cursor, table: str) -> Iterator[None]:
+    """
+    Wraps inserting many rows into a table in one transaction. Instead of
+    the insert trigger indexing the rows one at a time, they are indexed
+    together when the block ends, which is several times faster. The
+    trigger is dropped and put back within the transaction, which is
+    rolled back if anything fails, so other connections never see it
+    missing.
+
+    The rows to index are the ones after the largest id when the block
+    starts, so the transaction takes the write lock before reading it:
+    otherwise another connection could insert rows in between, which
+    would be indexed twice.
+    """
+    index = FULL_TEXT_INDEXES[table]
+    connection = cursor.connection
+    if not connection.in_transaction:
+        cursor.execute("BEGIN IMMEDIATE")
+    try:
+        # a write, for a transaction that was already open to take the
+        # lock too
+        cursor.execute(f"DROP TRIGGER IF EXISTS {index.name}_insert")
+        (last_id,) = cursor.execute(
+            f"SELECT COALESCE(MAX(id), 0) FROM {table}"
+        ).fetchone()
+        yield
+        cursor.execute(
+            f"INSERT INTO {index.name} (rowid, {index.column}) "
+            f"SELECT id, {index.column} FROM {table} WHERE id > ?",
+            (last_id,),
+        )
+        cursor.execute(index.insert_trigger)
+    except BaseException:
+        connection.rollback()
+        raise
+
+
+def get_rank_cutoff(
+    cursor: sqlite3.Cursor,
+    index: FullTextIndex,
+    from_where: str,
+    params: Sequence,
+) -> Optional[int]:
+    """
+    The rowid of the RANK_WINDOW-th most recent match of a search, or None
+    if there are fewer matches than that. from_where is the FROM and WHERE
+    of the search, joining in the index.
+    """
+    row = cursor.execute(
+        f"SELECT {index.name}.rowid {from_where} "
+        f"ORDER BY {index.name}.rowid DESC LIMIT 1 OFFSET ?",
+        (*params, RANK_WINDOW - 1),
+    ).fetchone()
+    return row[0] if row else None
+
+
+def get_matches(
+    cursor: sqlite3.Cursor,
+    index: FullTextIndex,
+    select: str,
+    from_where: str,
+    params: Sequence,
+    order: str,
+    limit: int,
+    offset: int = 0,
+    match_id: Optional[int] = None,
+) -> Tuple[List[tuple], bool]:
+    """
+    Runs a search: the RANK_WINDOW most recent matches in the given order,
+    then the older matches, newest first, from the same page on once the
+    ranked ones run out. Those are paged through by rowid: match_id
+    continues after the older match with that rowid. Returns the rows, and
+    whether the last of them is an older match.
+    """
+    rowid = f"{index.name}.rowid"
+    rows = []
+    if match_id is None:
+        cutoff = get_rank_cutoff(cursor, index, from_where, params)
+        if cutoff is None:
+            ranked = (from_where, params)
+        else:
+            ranked = (f"{from_where} AND {rowid} >= ?", (*params, cutoff))
+        rows = cursor.execute(
+            f"{select} {ranked[0]} ORDER BY {order} LIMIT ? OFFSET ?",
+            (*ranked[1], limit, offset),
+        ).fetchall()
+        if cutoff is None or len(rows) == limit:
+            return rows, False
+        # there are exactly RANK_WINDOW ranked matches
+        offset = max(offset - RANK_WINDOW, 0)
+        match_id = cutoff
+    older = cursor.execute(
+        f"{select} {from_where} AND {rowid} < ? "
+        f"ORDER BY {rowid} DESC LIMIT ? OFFSET ?",
+        (*params, match_id, limit - len(rows), offset),
+    ).fetchall()
+    return rows + older, bool(older)
+
+
+def get_match_query(search: str) -> Optional[str]:
+    """
+    Turns what the user typed into an FTS5 query, or None if there is
+    nothing to search for. Everything is quoted, so that FTS5's own
+    operators and punctuation can't make the query invalid.
+    """
+    terms = []
+    for phrase, word in TERM.findall(search):
+        if phrase:
+            words = WORD.findall(phrase)
+            if words:
+                terms.append('"' + " ".join(words) + '"')
+            continue
+        words = WORD.findall(word)
+        if not words:
+            continue
+        # "can't" is two tokens to FTS5, so it is searched as a phrase
+        term = '"' + " ".join(words) + '"'
+        if word.endswith("*"):
+            term += "*"
+        terms.append(term)
+    return " AND ".join(terms) or None
+
+
+def format_snippet(snippet: Optional[str]) -> Optional[str]:
+    """
+    Escapes a snippet for HTML, with its matches in <mark> tags.
+    """
+    if snippet is None:
+        return None
+    return (
+        html.escape(snippet)
+        .replace(MATCH_START, "<mark>")
+        .replace(MATCH_END, "</mark>")
+    )
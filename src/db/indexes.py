@@ -0,0 +1,76 @@
+import sqlite3
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+
+@dataclass(frozen=True)
+class Index:
+    """
+    A secondary index on one of the notebook tables.
+    """
+
+    name: str
+    table: str
+    columns: List[str]
+    # makes this a partial index
+    where: Optional[str] = None
+
+    @property
+    def create_statement(self) -> str:
+        statement = f"CREATE INDEX IF NOT EXISTS {self.name} ON {self.table} ({', '.join(self.columns)})"
+        if self.where:
+            statement += f" WHERE {self.where}"
+        return statement
+
+
+# every lookup by foreign key or time range should be able to use one of
+# these. Keep src/db/migrations in step when adding to this list.
+INDEXES: Dict[str, List[Index]] = {
+    "notes": [
+        Index("idx_notes_timestamp", "notes", ["timestamp"]),
+        # only holds the unprocessed notes, oldest first, so claiming the
+        # next one stays cheap however large the notebook gets
+        Index(
+            "idx_notes_unprocessed",
+            "notes",
+            ["timestamp", "id"],
+            where="processed = 0",
+        ),
+    ],
+    "actions": [
+        Index("idx_actions_source_note_id", "actions", ["source_note_id"]),
+        Index("idx_actions_todo_id", "actions", ["todo_id"]),
+        Index("idx_actions_timestamp", "actions", ["timestamp"]),
+    ],
+    "todos": [
+        Index("idx_todos_source_note_id", "todos", ["source_note_id"]),
+        Index("idx_todos_parent_id", "todos", ["parent_id"]),
+    ],
+    "tool_calls": [
+        Index(
+            "idx_tool_calls_source_note_id",
+            "tool_calls",
+            ["source_note_id"],
+        ),
+        Index(
+            "idx_tool_calls_target",
+            "tool_calls",
+            ["target_table", "target_id"],
+        ),
+    ],
+    "curiosities": [
+        Index(
+            "idx_curiosities_source_note_id",
+            "curiosities",
+            ["source_note_id"],
+        ),
+    ],
+}
+
+
+def ensure_indexes(cursor: sqlite3.Cursor, table: str):
+    """
+    Creates any missing indexes for the given table.
+    """
+    for index in INDEXES.get(table, []):
+        cursor.execute(index.create_statement)
@@ -0,0 +1,132 @@
+import os
+import sqlite3
+from typing import Optional
+
+from pydantic import BaseModel, Field
+
+from ..config import SQLITE_BUSY_TIMEOUT_MS
+from ..logging import get_logger
+from ..settings import get_setting, write_setting
+from .connection import (
+    connection_manager,
+    get_connection,
+    get_journal_mode_setting_key,
+    get_notebook_path,
+)
+
+logger = get_logger(__name__)
+
+JOURNAL_MODES = ["delete", "truncate", "persist", "memory", "wal", "off"]
+CHECKPOINT_MODES = ["passive", "full", "restart", "truncate"]
+
+
+class CheckpointResult(BaseModel):
+    """
+    The outcome of a WAL checkpoint, as reported by PRAGMA wal_checkpoint.
+    """
+
+    busy: bool = Field(
+        ..., description="True if the checkpoint could not complete"
+    )
+    log_frames: int = Field(..., description="Frames in the WAL file")
+    checkpointed_frames: int = Field(
+        ..., description="Frames copied back into the database"
+    )
+
+
+class JournalStatus(BaseModel):
+    """
+    The journaling setup of a notebook.
+    """
+
+    notebook: str = Field(..., description="Name of the notebook")
+    journal_mode: str = Field(..., description="Current journal mode")
+    configured_mode: Optional[str] = Field(
+        None, description="Journal mode set for this notebook, if any"
+    )
+    synchronous: int = Field(
+        ..., description="0 off, 1 normal, 2 full, 3 extra"
+    )
+    wal_size: int = Field(0, description="Size of the WAL file in bytes")
+
+
+def _resolve_notebook(notebook: Optional[str]) -> str:
+    return notebook or get_setting("notebook") or "default"
+
+
+def get_journal_status(notebook: Optional[str] = None) -> JournalStatus:
+    """
+    Reports the journal mode and WAL size of a notebook.
+    """
+    notebook = _resolve_notebook(notebook)
+    conn = get_connection(notebook)
+    cursor = conn.cursor()
+    journal_mode = cursor.execute("PRAGMA journal_mode").fetchone()[0]
+    synchronous = cursor.execute("PRAGMA synchronous").fetchone()[0]
+    wal_path = get_notebook_path(notebook) + "-wal"
+    return JournalStatus(
+        notebook=notebook,
+        journal_mode=journal_mode,
+        configured_mode=get_setting(
+            get_journal_mode_setting_key(notebook)
+        ),
+        synchronous=synchronous,
+        wal_size=os.path.getsize(wal_path) if os.path.exists(wal_path) else 0,
+    )
+
+
+def set_journal_mode(mode: str, notebook: Optional[str] = None) -> str:
+    """
+    Switches a notebook to the given journal mode and remembers the choice,
+    so that new connections keep using it. Returns the resulting mode.
+    """
+    mode = mode.lower()
+    if mode not in JOURNAL_MODES:
+        raise ValueError(
+            f"Unknown journal mode {mode}, expected one of {JOURNAL_MODES}"
+        )
+    notebook = _resolve_notebook(notebook)
+    write_setting(get_journal_mode_setting_key(notebook), mode)
+    # leaving wal mode needs the only connection to the file, so drop ours
+    # and make the switch on a throwaway one
+    connection_manager.invalidate()
+    connection_manager.close()
+    conn = sqlite3.connect(get_notebook_path(notebook))
+    try:
+        conn.execute(f"PRAGMA busy_timeout = {SQLITE_BUSY_TIMEOUT_MS}")
+        new_mode = conn.execute(f"PRAGMA journal_mode = {mode}").fetchone()[
+            0
+        ]
+    finally:
+        conn.close()
+    if new_mode != mode:
+        logger.warning(
+            f"could not switch {notebook} to {mode}, it is still in {new_mode}. Is another process using it?"
+        )
+    return new_mode
+
+
+def checkpoint(
+    mode: str = "passive", notebook: Optional[str] = None
+) -> CheckpointResult:
+    """
+    Copies the WAL back into the notebook's database file. passive never
+    waits on other connections, truncate also empties the WAL file.
+    """
+    mode = mode.lower()
+    if mode not in CHECKPOINT_MODES:
+        raise ValueError(
+            f"Unknown checkpoint mode {mode}, expected one of {CHECKPOINT_MODES}"
+        )
+    conn = get_connection(_resolve_notebook(notebook))
+    cursor = conn.cursor()
+    busy, log_frames, checkpointed_frames = cursor.execute(
+        f"PRAGMA wal_checkpoint({mode.upper()})"
+    ).fetchone()
+    result = CheckpointResult(
+        busy=bool(busy),
+        log_frames=log_frames,
+        checkpointed_frames=checkpointed_frames,
+    )
+    logger.debug(f"{mode} checkpoint: {result}")
+    return result
@@ -0,0 +1,22 @@
+-- Secondary indexes on foreign key and timestamp columns, matching
+-- src/db/indexes.py
+
+CREATE INDEX IF NOT EXISTS idx_notes_timestamp ON notes (timestamp);
+
+CREATE INDEX IF NOT EXISTS idx_notes_unprocessed ON notes (id) WHERE processed = 0;
+
+CREATE INDEX IF NOT EXISTS idx_actions_source_note_id ON actions (source_note_id);
+
+CREATE INDEX IF NOT EXISTS idx_actions_todo_id ON actions (todo_id);
+
+CREATE INDEX IF NOT EXISTS idx_actions_timestamp ON actions (timestamp);
+
+CREATE INDEX IF NOT EXISTS idx_todos_source_note_id ON todos (source_note_id);
+
+CREATE INDEX IF NOT EXISTS idx_todos_parent_id ON todos (parent_id);
+
+CREATE INDEX IF NOT EXISTS idx_tool_calls_source_note_id ON tool_calls (source_note_id);
+
+CREATE INDEX IF NOT EXISTS idx_tool_calls_target ON tool_calls (target_table, target_id);
+
+CREATE INDEX IF NOT EXISTS idx_curiosities_source_note_id ON curiosities (source_note_id);
@@ -0,0 +1,13 @@
+-- Lease columns, so that several engines can share the backlog without
+-- processing the same note twice. See Note.claim.
+
+ALTER TABLE notes ADD COLUMN claimed_by TEXT DEFAULT NULL;
+
+ALTER TABLE notes ADD COLUMN claimed_at DATETIME DEFAULT NULL;
+
+ALTER TABLE notes ADD COLUMN attempts INTEGER NOT NULL DEFAULT 0;
+
+-- claims go oldest first
+DROP INDEX IF EXISTS idx_notes_unprocessed;
+
+CREATE INDEX IF NOT EXISTS idx_notes_unprocessed ON notes (timestamp, id) WHERE processed = 0;
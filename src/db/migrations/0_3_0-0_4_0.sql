@@ -0,0 +1,7 @@
+-- The todo index find_todo searches before asking the LLM. It is filled
+-- from the existing todos the next time the tables are ensured. See
+-- src/db/todo_index.py.
+
+CREATE TABLE IF NOT EXISTS todo_terms (term TEXT NOT NULL, todo_id INTEGER NOT NULL, count INTEGER NOT NULL, PRIMARY KEY (term, todo_id)) WITHOUT ROWID;
+
+CREATE INDEX IF NOT EXISTS idx_todo_terms_todo_id ON todo_terms (todo_id);
@@ -0,0 +1,111 @@
+-- Full-text search over the notes, todos, actions and curiosities. Each
+-- gets an FTS5 table kept in step by triggers, filled from the rows
+-- already there. See src/db/fts.py.
+
+CREATE VIRTUAL TABLE IF NOT EXISTS notes_fts USING fts5(
+    note_text,
+    content='notes',
+    content_rowid='id',
+    tokenize='porter unicode61',
+    prefix='2 3'
+);
+
+CREATE TRIGGER IF NOT EXISTS notes_fts_insert AFTER INSERT ON notes
+BEGIN
+    INSERT INTO notes_fts (rowid, note_text) VALUES (new.id, new.note_text);
+END;
+
+CREATE TRIGGER IF NOT EXISTS notes_fts_delete AFTER DELETE ON notes
+BEGIN
+    INSERT INTO notes_fts (notes_fts, rowid, note_text) VALUES ('delete', old.id, old.note_text);
+END;
+
+CREATE TRIGGER IF NOT EXISTS notes_fts_update AFTER UPDATE OF note_text ON notes
+WHEN old.note_text IS NOT new.note_text
+BEGIN
+    INSERT INTO notes_fts (notes_fts, rowid, note_text) VALUES ('delete', old.id, old.note_text);
+    INSERT INTO notes_fts (rowid, note_text) VALUES (new.id, new.note_text);
+END;
+
+INSERT INTO notes_fts (notes_fts) VALUES ('rebuild');
+
+CREATE VIRTUAL TABLE IF NOT EXISTS todos_fts USING fts5(
+    todo_text,
+    content='todos',
+    content_rowid='id',
+    tokenize='porter unicode61',
+    prefix='2 3'
+);
+
+CREATE TRIGGER IF NOT EXISTS todos_fts_insert AFTER INSERT ON todos
+BEGIN
+    INSERT INTO todos_fts (rowid, todo_text) VALUES (new.id, new.todo_text);
+END;
+
+CREATE TRIGGER IF NOT EXISTS todos_fts_delete AFTER DELETE ON todos
+BEGIN
+    INSERT INTO todos_fts (todos_fts, rowid, todo_text) VALUES ('delete', old.id, old.todo_text);
+END;
+
+CREATE TRIGGER IF NOT EXISTS todos_fts_update AFTER UPDATE OF todo_text ON todos
+WHEN old.todo_text IS NOT new.todo_text
+BEGIN
+    INSERT INTO todos_fts (todos_fts, rowid, todo_text) VALUES ('delete', old.id, old.todo_text);
+    INSERT INTO todos_fts (rowid, todo_text) VALUES (new.id, new.todo_text);
+END;
+
+INSERT INTO todos_fts (todos_fts) VALUES ('rebuild');
+
+CREATE VIRTUAL TABLE IF NOT EXISTS actions_fts USING fts5(
+    action_text,
+    content='actions',
+    content_rowid='id',
+    tokenize='porter unicode61',
+    prefix='2 3'
+);
+
+CREATE TRIGGER IF NOT EXISTS actions_fts_insert AFTER INSERT ON actions
+BEGIN
+    INSERT INTO actions_fts (rowid, action_text) VALUES (new.id, new.action_text);
+END;
+
+CREATE TRIGGER IF NOT EXISTS actions_fts_delete AFTER DELETE ON actions
+BEGIN
+    INSERT INTO actions_fts (actions_fts, rowid, action_text) VALUES ('delete', old.id, old.action_text);
+END;
+
+CREATE TRIGGER IF NOT EXISTS actions_fts_update AFTER UPDATE OF action_text ON actions
+WHEN old.action_text IS NOT new.action_text
+BEGIN
+    INSERT INTO actions_fts (actions_fts, rowid, action_text) VALUES ('delete', old.id, old.action_text);
+    INSERT INTO actions_fts (rowid, action_text) VALUES (new.id, new.action_text);
+END;
+
+INSERT INTO actions_fts (actions_fts) VALUES ('rebuild');
+
+CREATE VIRTUAL TABLE IF NOT EXISTS curiosities_fts USING fts5(
+    curiosity_text,
+    content='curiosities',
+    content_rowid='id',
+    tokenize='porter unicode61',
+    prefix='2 3'
+);
+
+CREATE TRIGGER IF NOT EXISTS curiosities_fts_insert AFTER INSERT ON curiosities
+BEGIN
+    INSERT INTO curiosities_fts (rowid, curiosity_text) VALUES (new.id, new.curiosity_text);
+END;
+
+CREATE TRIGGER IF NOT EXISTS curiosities_fts_delete AFTER DELETE ON curiosities
+BEGIN
+    INSERT INTO curiosities_fts (curiosities_fts, rowid, curiosity_text) VALUES ('delete', old.id, old.curiosity_text);
+END;
+
+CREATE TRIGGER IF NOT EXISTS curiosities_fts_update AFTER UPDATE OF curiosity_text ON curiosities
+WHEN old.curiosity_text IS NOT new.curiosity_text
+BEGIN
+    INSERT INTO curiosities_fts (curiosities_fts, rowid, curiosity_text) VALUES ('delete', old.id, old.curiosity_text);
+    INSERT INTO curiosities_fts (rowid, curiosity_text) VALUES (new.id, new.curiosity_text);
+END;
+
+INSERT INTO curiosities_fts (curiosities_fts) VALUES ('rebuild');
@@ -0,0 +1,7 @@
+-- The number of todos in the todo index and their total length, which
+-- the index keeps up to date instead of counting them on every search.
+-- See src/db/todo_index.py.
+
+CREATE TABLE IF NOT EXISTS todo_term_stats (id INTEGER PRIMARY KEY CHECK (id = 1), documents INTEGER NOT NULL, total_length INTEGER NOT NULL);
+
+INSERT OR IGNORE INTO todo_term_stats (id, documents, total_length) SELECT 1, COUNT(DISTINCT todo_id), COALESCE(SUM(count), 0) FROM todo_terms;
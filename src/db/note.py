@@ -1,12 +1,38 @@
 from datetime import datetime
-from typing import List, Optional, TYPE_CHECKING
-from pydantic import BaseModel, Field
-
-
-from ..config import TIMESTAMP_FORMAT
+from typing import (
+    ClassVar,
+    Dict,
+    Iterable,
+    List,
+    NamedTuple,
+    Optional,
+    TYPE_CHECKING,
+)
+from pydantic import BaseModel, Field, PrivateAttr
+
+
+from ..config import (
+    ENGINE_LEASE_SECONDS,
+    ENGINE_MAX_ATTEMPTS,
+    NOTES_BULK_CHUNK,
+)
 from ..logging import get_logger
-from ..util import format_time
+from ..util import chunked, format_time, parse_time
+from .changes import changed
 from .connection import get_connection
+from .export import export_table
+from .fts import (
+    FULL_TEXT_INDEXES,
+    bulk_insert,
+    ensure_full_text_index,
+    format_snippet,
+    get_match_query,
+    get_matches,
+)
+from .indexes import ensure_indexes
+from .pagination import Page, get_cursor, get_next_cursor
+from .rows import construct
+from .session import lookup, remember
 
 if TYPE_CHECKING:
     from .action import Action
@@ -17,11 +43,24 @@ if TYPE_CHECKING:
 logger = get_logger(__name__)
 
 
+class NoteRow(NamedTuple):
+    """
+    A note for Note.bulk_create. A (timestamp, note_text) tuple will do.
+    """
+
+    timestamp: Optional[datetime | str]
+    note_text: str
+    processed_note_text: str = ""
+    processing_error: str = ""
+
+
 class Note(BaseModel):
     """
     Represents a note with a timestamp and text.
     """
 
+    table_name: ClassVar[str] = "notes"
+
     id: int = Field(..., description="Unique identifier for the note")
     timestamp: datetime = Field(..., description="Timestamp of the note")
     note_text: str = Field(..., description="Text of the note")
@@ -35,11 +74,32 @@ class Note(BaseModel):
         False, description="Whether the note has been processed"
     )
 
+    # filled in by load_related, so that a page of notes can be rendered
+    # without querying per note
+    _actions: Optional[list] = PrivateAttr(default=None)
+    _todos: Optional[list] = PrivateAttr(default=None)
+    _tool_calls: Optional[list] = PrivateAttr(default=None)
+    _curiosities: Optional[list] = PrivateAttr(default=None)
+    _num_actions: Optional[int] = PrivateAttr(default=None)
+    _num_todos: Optional[int] = PrivateAttr(default=None)
+    # filled in by get_all when searching
+    _snippet: Optional[str] = PrivateAttr(default=None)
+
+    @property
+    def snippet(self) -> Optional[str]:
+        """
+        The text around the search matches, as HTML, if the note was found
+        by searching.
+        """
+        return self._snippet
+
     @property
     def actions(self) -> List["Action"]:
         """
         Returns the actions associated with the note.
         """
+        if self._actions is not None:
+            return self._actions
         from .action import Action
 
         return Action.get_by_source_note_id(self.id)
@@ -49,6 +109,8 @@ class Note(BaseModel):
         """
         Returns the number of actions associated with the note.
         """
+        if self._num_actions is not None:
+            return self._num_actions
         from .action import Action
 
         return Action.count(source_note_id=self.id)
@@ -58,6 +120,8 @@ class Note(BaseModel):
         """
         Returns the todos associated with the note.
         """
+        if self._todos is not None:
+            return self._todos
         from .todo import Todo
 
         return Todo.get_by_source_note_id(self.id)
@@ -67,6 +131,8 @@ class Note(BaseModel):
         """
         Returns the number of todos associated with the note.
         """
+        if self._num_todos is not None:
+            return self._num_todos
         from .todo import Todo
 
         return Todo.count(source_note_id=self.id)
@@ -76,6 +142,8 @@ class Note(BaseModel):
         """
         Returns the tool calls associated with the note.
         """
+        if self._tool_calls is not None:
+            return self._tool_calls
         from .tool_call import ToolCall
 
         return ToolCall.get_by_source_note_id(self.id)
@@ -85,10 +153,85 @@ class Note(BaseModel):
         """
         Returns the curiosities associated with the note.
         """
+        if self._curiosities is not None:
+            return self._curiosities
         from .curiosity import Curiosity
 
         return Curiosity.get_by_source_note_id(self.id)
 
+    @classmethod
+    def load_related(
+        cls,
+        notes: List["Note"],
+        counts: bool = True,
+        children: bool = False,
+    ) -> List["Note"]:
+        """
+        Loads the related objects of a page of notes with one grouped
+        query per table, instead of several queries per note.
+
+        counts fills in num_todos and num_actions. children loads the
+        todos, actions, tool calls and curiosities themselves, which also
+        gives the counts. The loaded values are a snapshot; they are not
+        updated when objects are created for a note afterwards.
+        """
+        if not notes:
+            return notes
+        note_ids = [note.id for note in notes]
+        if children:
+            from .action import Action
+            from .todo import Todo
+            from .tool_call import ToolCall
+            from .curiosity import Curiosity
+
+            related = {
+                "_actions": Action.get_by_source_note_ids(note_ids),
+                "_todos": Todo.get_by_source_note_ids(note_ids),
+                "_tool_calls": ToolCall.get_by_source_note_ids(note_ids),
+                "_curiosities": Curiosity.get_by_source_note_ids(note_ids),
+            }
+            for attr, objects in related.items():
+                grouped: Dict[int, list] = {
+                    note_id: [] for note_id in note_ids
+                }
+                for obj in objects:
+                    grouped[obj.source_note_id].append(obj)
+                for note in notes:
+                    setattr(note, attr, grouped[note.id])
+            for note in notes:
+                note._num_actions = len(note._actions or [])
+                note._num_todos = len(note._todos or [])
+        elif counts:
+            action_counts = cls._count_by_note_id("actions", note_ids)
+            todo_counts = cls._count_by_note_id("todos", note_ids)
+            for note in notes:
+                note._num_actions = action_counts.get(note.id, 0)
+                note._num_todos = todo_counts.get(note.id, 0)
+        return notes
+
+    @staticmethod
+    def _count_by_note_id(
+        table: str, note_ids: List[int]
+    ) -> Dict[int, int]:
+        """
+        Counts the rows of a table that belong to each of the given notes.
+        """
+        counts = {}
+        with get_connection() as conn:
+            cursor = conn.cursor()
+            for chunk in chunked(note_ids):
+                placeholders = ", ".join("?" for _ in chunk)
+                cursor.execute(
+                    f"""
+                    SELECT source_note_id, COUNT(*) FROM {table}
+                    WHERE source_note_id IN ({placeholders})
+                    GROUP BY source_note_id
+                    """,
+                    chunk,
+                )
+                counts.update(cursor.fetchall())
+        return counts
+
     @classmethod
     def ensure_table(cls):
         """
@@ -101,35 +244,189 @@ class Note(BaseModel):
                 note_text TEXT NOT NULL,
                 processed_note_text TEXT DEFAULT "",
                 processing_error TEXT DEFAULT "",
-                processed INTEGER DEFAULT 0
+                processed INTEGER DEFAULT 0,
+                claimed_by TEXT DEFAULT NULL,
+                claimed_at DATETIME DEFAULT NULL,
+                attempts INTEGER NOT NULL DEFAULT 0
             )
         """
         with get_connection() as conn:
             cursor = conn.cursor()
             cursor.execute(query)
+            ensure_indexes(cursor, "notes")
+            ensure_full_text_index(cursor, "notes")
             conn.commit()
 
     @classmethod
     def from_sqlite_row(cls, row):
         """
-        Converts a SQLite row to a DbNote instance.
-        """
-        return cls(
-            id=row[0],
-            timestamp=datetime.strptime(row[1], TIMESTAMP_FORMAT),
-            note_text=row[2],
-            processed_note_text=row[3],
-            processing_error=row[4],
-            processed=bool(row[5]),
+        Converts a trusted SQLite row to a DbNote instance, see
+        src/db/rows.py.
+        """
+        return remember(
+            construct(
+                cls,
+                id=row[0],
+                timestamp=parse_time(row[1]),
+                note_text=row[2],
+                processed_note_text=row[3],
+                processing_error=row[4],
+                processed=bool(row[5]),
+            )
         )
 
+    @classmethod
+    def get_unprocessed(
+        cls, limit: int = 25, exclude_ids: Iterable[int] = ()
+    ) -> List["Note"]:
+        """
+        Returns unprocessed notes, oldest first.
+        """
+        exclude_ids = list(exclude_ids)
+        query = "SELECT * FROM notes WHERE processed = 0"
+        if exclude_ids:
+            placeholders = ", ".join("?" for _ in exclude_ids)
+            query += f" AND id NOT IN ({placeholders})"
+        query += " ORDER BY timestamp, id LIMIT ?"
+        with get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(query, exclude_ids + [limit])
+            return [cls.from_sqlite_row(row) for row in cursor.fetchall()]
+
+    @classmethod
+    def claim(
+        cls,
+        claimed_by: str,
+        limit: int = 1,
+        lease_seconds: int = ENGINE_LEASE_SECONDS,
+        max_attempts: int = ENGINE_MAX_ATTEMPTS,
+    ) -> List["Note"]:
+        """
+        Claims up to limit unprocessed notes for claimed_by, oldest first,
+        in a single statement, so that two engines never get the same note.
+        A claim lapses after lease_seconds, so the notes of an engine that
+        died get picked up again. Notes that have been claimed max_attempts
+        times are left alone.
+        """
+        query = """
+            UPDATE notes
+            SET
+                claimed_by = ?,
+                claimed_at = strftime('%Y-%m-%d %H:%M:%S', 'now'),
+                attempts = attempts + 1
+            WHERE id IN (
+                SELECT id FROM notes
+                WHERE processed = 0
+                AND attempts < ?
+                AND (
+                    claimed_at IS NULL
+                    OR claimed_at < strftime('%Y-%m-%d %H:%M:%S', 'now', ?)
+                )
+                ORDER BY timestamp, id
+                LIMIT ?
+            )
+            RETURNING *
+        """
+        with get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                query,
+                (
+                    claimed_by,
+                    max_attempts,
+                    f"-{lease_seconds} seconds",
+                    limit,
+                ),
+            )
+            notes = [cls.from_sqlite_row(row) for row in cursor.fetchall()]
+            conn.commit()
+        # RETURNING does not keep the subquery's order
+        return sorted(notes, key=lambda note: (note.timestamp, note.id))
+
+    @classmethod
+    def claim_ids(
+        cls,
+        claimed_by: str,
+        ids: Iterable[int],
+        lease_seconds: int = ENGINE_LEASE_SECONDS,
+    ) -> List["Note"]:
+        """
+        Claims the given notes for claimed_by, as claim does, leaving out
+        the ones that are processed or that someone else holds a lease on.
+        Notes claimed_by already holds are claimed again.
+        """
+        ids = list(ids)
+        if not ids:
+            return []
+        query = f"""
+            UPDATE notes
+            SET
+                claimed_by = ?,
+                claimed_at = strftime('%Y-%m-%d %H:%M:%S', 'now'),
+                attempts = attempts + 1
+            WHERE id IN ({", ".join("?" * len(ids))})
+            AND processed = 0
+            AND (
+                claimed_by = ?
+                OR claimed_at IS NULL
+                OR claimed_at < strftime('%Y-%m-%d %H:%M:%S', 'now', ?)
+            )
+            RETURNING *
+        """
+        with get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                query,
+                (
+                    claimed_by,
+                    *ids,
+                    claimed_by,
+                    f"-{lease_seconds} seconds",
+                ),
+            )
+            notes = [cls.from_sqlite_row(row) for row in cursor.fetchall()]
+            conn.commit()
+        return sorted(notes, key=lambda note: (note.timestamp, note.id))
+
+    def renew_claim(self, claimed_by: str) -> bool:
+        """
+        Restarts the lease on this note. Returns False if the note is no
+        longer claimed by claimed_by, because the lease ran out and someone
+        else claimed it.
+        """
+        query = """
+            UPDATE notes
+            SET claimed_at = strftime('%Y-%m-%d %H:%M:%S', 'now')
+            WHERE id = ? AND claimed_by = ?
+        """
+        with get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(query, (self.id, claimed_by))
+            conn.commit()
+            return cursor.rowcount == 1
+
+    @classmethod
+    def release_claims(cls, claimed_by: str):
+        """
+        Gives up the claims on notes that claimed_by has not processed.
+        """
+        query = """
+            UPDATE notes
+            SET claimed_by = NULL, claimed_at = NULL
+            WHERE claimed_by = ? AND processed = 0
+        """
+        with get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(query, (claimed_by,))
+            conn.commit()
+
     @classmethod
     def get_next_unprocessed_note(cls):
         """
         Returns the SQL query to fetch the next unprocessed note.
         """
         query = """
-            SELECT * FROM notes WHERE processed = 0 
+            SELECT * FROM notes WHERE processed = 0 ORDER BY timestamp, id
         """
         with get_connection() as conn:
             cursor = conn.cursor()
@@ -156,6 +453,9 @@ class Note(BaseModel):
         """
         Fetches a note by its ID.
         """
+        note = lookup(cls, note_id)
+        if note is not None:
+            return note
         query = """
             SELECT * FROM notes WHERE id = ?
         """
@@ -168,6 +468,26 @@ class Note(BaseModel):
             else:
                 return None
 
+    @classmethod
+    def get_by_ids(cls, note_ids: List[int]) -> List["Note"]:
+        """
+        Fetches several notes at once, in the order of note_ids. Missing
+        notes are left out.
+        """
+        found: Dict[int, "Note"] = {}
+        with get_connection() as conn:
+            cursor = conn.cursor()
+            for chunk in chunked(note_ids):
+                placeholders = ", ".join("?" for _ in chunk)
+                cursor.execute(
+                    f"SELECT * FROM notes WHERE id IN ({placeholders})",
+                    chunk,
+                )
+                for row in cursor.fetchall():
+                    note = cls.from_sqlite_row(row)
+                    found[note.id] = note
+        return [found[note_id] for note_id in note_ids if note_id in found]
+
     @classmethod
     def create(
         cls,
@@ -179,30 +499,77 @@ class Note(BaseModel):
         Inserts a new note into the database.
         """
         query = """
-            INSERT INTO notes (note_text) VALUES (?)
+            INSERT INTO notes (note_text) VALUES (?) RETURNING *
         """
         with get_connection() as conn:
             cursor = conn.cursor()
             cursor.execute(query, (note_text,))
+            row = cursor.fetchone()
             conn.commit()
-            if cursor.lastrowid is None:
+            if row is None:
                 raise Exception("Failed to create note.")
-            note = cls.get_by_id(cursor.lastrowid)
-            if note is None:
-                raise Exception("Failed to retrieve created note.")
+            note = cls.from_sqlite_row(row)
             # less common, likely only in tests
             if timestamp or processed_note_text:
                 if timestamp:
                     if isinstance(timestamp, str):
-                        timestamp = datetime.strptime(
-                            timestamp, TIMESTAMP_FORMAT
-                        )
+                        timestamp = parse_time(timestamp)
                     note.timestamp = timestamp
                 if processed_note_text:
                     note.processed_note_text = processed_note_text
                 note.save()
+            else:
+                changed("notes", note)
             return note
 
+    @classmethod
+    def bulk_create(
+        cls,
+        rows: Iterable[NoteRow | tuple],
+        chunk_size: int = NOTES_BULK_CHUNK,
+    ) -> List[int]:
+        """
+        Inserts many notes, chunk_size to a transaction, and returns their
+        ids in order. Unlike create, nothing is read back, and rows are
+        consumed as they go, so they can stream from a large file. Notes
+        without a timestamp get the current time.
+        """
+        query = """
+            INSERT INTO notes (timestamp, note_text, processed_note_text, processing_error)
+            VALUES (?, ?, ?, ?)
+        """
+        ids = []
+        with get_connection() as conn:
+            cursor = conn.cursor()
+            for chunk in chunked(rows, chunk_size):
+                now = format_time(datetime.now())
+                values = []
+                for row in chunk:
+                    row = NoteRow(*row)
+                    timestamp = row.timestamp or now
+                    if isinstance(timestamp, str):
+                        timestamp = parse_time(timestamp)
+                    values.append(
+                        (
+                            format_time(timestamp),
+                            row.note_text,
+                            row.processed_note_text or "",
+                            row.processing_error or "",
+                        )
+                    )
+                with bulk_insert(cursor, "notes"):
+                    cursor.executemany(query, values)
+                    # the transaction holds the write lock, so the ids
+                    # AUTOINCREMENT gave it are the ones up to the last
+                    (last_id,) = cursor.execute(
+                        "SELECT last_insert_rowid()"
+                    ).fetchone()
+                ids.extend(range(last_id - len(values) + 1, last_id + 1))
+                conn.commit()
+        if ids:
+            changed("notes")
+        return ids
+
     def save(self):
         """
         Updates the note in the database.
@@ -224,6 +591,7 @@ class Note(BaseModel):
                 ),
             )
             conn.commit()
+        changed("notes", self)
 
     @classmethod
     def get_all(
@@ -234,125 +602,138 @@ class Note(BaseModel):
         offset=0,
         limit=15,
         max_id: Optional[int] = None,
-    ):
-        """
-        Fetches notes from the database with optional filters.
-        """
-        query = """
-        SELECT *
-        FROM notes 
-        WHERE 1=1
-        """
-        params = []
+        with_counts: bool = False,
+        cursor: Optional[str] = None,
+    ) -> Page["Note"]:
+        """
+        Fetches notes from the database with optional filters, newest
+        first. with_counts also loads num_todos and num_actions for the
+        whole page. A search returns the best matches first, each with its
+        snippet. Pass the next_cursor of a page as cursor for the page
+        after it.
+        """
+        page = get_cursor(cursor)
+        match = get_match_query(search) if search else None
+        fts = FULL_TEXT_INDEXES["notes"]
+        if match:
+            columns = f"notes.*, {fts.snippet}"
+            from_where = f"""
+            FROM notes
+            JOIN {fts.name} ON {fts.name}.rowid = notes.id
+            WHERE {fts.name} MATCH ?
+            """
+            params = [match]
+        else:
+            columns = "*"
+            from_where = """
+            FROM notes 
+            WHERE 1=1
+            """
+            params = []
 
         if before:
-            query += " AND timestamp < ?"
+            from_where += " AND notes.timestamp < ?"
             if isinstance(before, datetime):
-                before = datetime.strftime(before, TIMESTAMP_FORMAT)
+                before = format_time(before)
             params.append(before)
         if after:
-            query += " AND timestamp > ?"
+            from_where += " AND notes.timestamp > ?"
             if isinstance(after, datetime):
-                after = datetime.strftime(after, TIMESTAMP_FORMAT)
+                after = format_time(after)
             params.append(after)
-        if search:
-            query += " AND note_text LIKE ?"
-            params.append(f"%{search}%")
         if max_id:
-            query += " AND id < ?"
+            from_where += " AND notes.id < ?"
             params.append(max_id)
-        query += " ORDER BY id desc LIMIT ? OFFSET ?"
-        params.append(limit)
-        params.append(offset)
+        if page.id is not None and not match:
+            from_where += " AND (notes.timestamp, notes.id) < (?, ?)"
+            params.extend([page.timestamp, page.id])
 
+        older_match = False
         with get_connection() as conn:
-            cursor = conn.cursor()
-            cursor.execute(query, tuple(params))
-            notes = cursor.fetchall()
-            return [cls.from_sqlite_row(note) for note in notes]
+            db_cursor = conn.cursor()
+            if match:
+                rows, older_match = get_matches(
+                    db_cursor,
+                    fts,
+                    f"SELECT {columns}",
+                    from_where,
+                    params,
+                    "rank, notes.timestamp desc, notes.id desc",
+                    limit,
+                    offset + page.offset,
+                    page.match_id,
+                )
+            else:
+                db_cursor.execute(
+                    f"SELECT {columns} {from_where} ORDER BY notes.timestamp desc, notes.id desc LIMIT ? OFFSET ?",
+                    (*params, limit, offset + page.offset),
+                )
+                rows = db_cursor.fetchall()
+        notes = Page(
+            [cls.from_sqlite_row(row) for row in rows],
+            get_next_cursor(
+                page,
+                rows,
+                limit,
+                1,
+                ranked=bool(match),
+                older_match=older_match,
+            ),
+        )
+        if match:
+            for note, row in zip(notes, rows):
+                note._snippet = format_snippet(row[-1])
+        if with_counts:
+            cls.load_related(notes, counts=True)
+        return notes
 
     @classmethod
     def export_csv(cls, filepath: str, stripped: bool = True):
         """
-        Exports all notes to a CSV file.
-        """
-        import csv
-
-        with get_connection() as conn:
-            cursor = conn.cursor()
-            cursor.execute("SELECT * FROM notes")
-            rows = cursor.fetchall()
-            with open(filepath, "w", newline="") as csvfile:
-                writer = csv.writer(csvfile)
-                if stripped:
-                    writer.writerow(["timestamp", "note_text"])
-                else:
-                    writer.writerow(
-                        [
-                            "id",
-                            "timestamp",
-                            "note_text",
-                            "processed_note_text",
-                            "processing_error",
-                        ]
-                    )
-                for row in rows:
-                    if stripped:
-                        writer.writerow(
-                            [
-                                datetime.strptime(
-                                    row[1], TIMESTAMP_FORMAT
-                                ).strftime(TIMESTAMP_FORMAT),
-                                row[2],
-                            ]
-                        )
-                    else:
-                        writer.writerow(row)
+        Exports all notes to a CSV file, streaming them from the database
+        a chunk at a time. Stripped exports only have the timestamp and
+        text of each note, which import_csv reads back.
+        """
+        if stripped:
+            columns = ["timestamp", "note_text"]
+        else:
+            columns = [
+                "id",
+                "timestamp",
+                "note_text",
+                "processed_note_text",
+                "processing_error",
+            ]
+        export_table("notes", filepath, columns=columns)
 
     @classmethod
-    def import_csv(cls, filepath: str) -> List["Note"]:
+    def import_csv(
+        cls, filepath: str, chunk_size: int = NOTES_BULK_CHUNK
+    ) -> List[int]:
         """
-        Imports notes from a CSV file.
+        Imports notes from a CSV file, as written by export_csv, and
+        returns their ids in order. The file is streamed into bulk_create,
+        and the notes are not read back; Note.get_by_ids loads them.
         """
         import csv
 
-        notes = []
-        with open(filepath, "r") as csvfile:
-            reader = csv.reader(csvfile)
-            headers = next(reader)
-            for row in reader:
-                row_dict = dict(zip(headers, row))
-                extracted_note_text = row_dict.get("note_text")
-                if not extracted_note_text:
+        def read_rows(reader):
+            for row_dict in reader:
+                note_text = row_dict.get("note_text")
+                if not note_text:
                     logger.warning(
-                        f"Skipping row with missing note_text: {row}"
+                        f"Skipping row with missing note_text: {row_dict}"
                     )
                     continue
-                note_text = str(extracted_note_text)
-                processed_note_text = (
-                    row_dict.get("processed_note_text") or ""
+                yield NoteRow(
+                    timestamp=row_dict.get("timestamp") or None,
+                    note_text=str(note_text),
+                    processed_note_text=row_dict.get("processed_note_text")
+                    or "",
+                    processing_error=row_dict.get("processing_error") or "",
                 )
-                processing_error = row_dict.get("processing_error") or ""
-                timestamp_str = row_dict.get("timestamp")
-                if timestamp_str:
-                    timestamp: Optional[datetime] = datetime.strptime(
-                        timestamp_str, TIMESTAMP_FORMAT
-                    )
-                else:
-                    timestamp = None
-                if timestamp is not None:
-                    new_note = cls.create(
-                        note_text=note_text,
-                        timestamp=timestamp,
-                        processed_note_text=processed_note_text,
-                    )
-                else:
-                    new_note = cls.create(
-                        note_text=note_text,
-                        processed_note_text=processed_note_text,
-                    )
-                if processing_error:
-                    new_note.processing_error = processing_error
-                    new_note.save()
-                notes.append(new_note)
-        return notes
+
+        with open(filepath, "r", newline="") as csvfile:
+            return cls.bulk_create(
+                read_rows(csv.DictReader(csvfile)), chunk_size
+            )
@@ -0,0 +1,104 @@
+"""
+Cursor pagination for the get_all methods.
+
+Lists are read newest first, ordered by (timestamp, id). Rather than
+skipping offset rows, which gets slower the deeper the page and shifts
+when the engine inserts rows meanwhile, the next page starts after the
+(timestamp, id) of the last row of this one. That is a range on the
+timestamp indexes, however deep the page.
+
+Search results are ordered by rank, which has no such key, so their
+cursors hold an offset into the ranked matches instead. There are at most
+fts.RANK_WINDOW of those; the older matches after them are paged through
+by id again (see fts.get_matches).
+
+Cursors are opaque to clients: urlsafe base64 of a small JSON object.
+"""
+
+import base64
+import binascii
+import json
+from dataclasses import asdict, dataclass
+from typing import Iterable, List, Optional, Sequence, TypeVar
+
+from src.errors import InvalidCursorError
+
+T = TypeVar("T")
+
+
+@dataclass(frozen=True)
+class Cursor:
+    # the sort key of the last row of the previous page
+    timestamp: Optional[str] = None
+    id: Optional[int] = None
+    # for search results, the number of matches already returned
+    offset: int = 0
+    # for search results past the ranked ones, the id of the last match
+    match_id: Optional[int] = None
+
+    def encode(self) -> str:
+        data = {key: value for key, value in asdict(self).items() if value}
+        return (
+            base64.urlsafe_b64encode(json.dumps(data).encode())
+            .decode()
+            .rstrip("=")
+        )
+
+    @classmethod
+    def decode(cls, cursor: str) -> "Cursor":
+        try:
+            data = json.loads(
+                base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+            )
+            decoded = cls(**data)
+        except (binascii.Error, ValueError, TypeError) as e:
+            raise InvalidCursorError(f"Invalid cursor: {cursor!r}") from e
+        if (decoded.timestamp is None) != (decoded.id is None):
+            raise InvalidCursorError(f"Invalid cursor: {cursor!r}")
+        return decoded
+
+
+class Page(List[T]):
+    """
+    A page of results, with the cursor of the next page, or None if this
+    is the last one. Otherwise a plain list.
+    """
+
+    def __init__(self, items: Iterable[T], next_cursor: Optional[str]):
+        super().__init__(items)
+        self.next_cursor = next_cursor
+
+
+def get_cursor(cursor: Optional[str]) -> Cursor:
+    """
+    Decodes a cursor from a client, or returns the cursor of the first
+    page if there is none.
+    """
+    return Cursor.decode(cursor) if cursor else Cursor()
+
+
+def get_next_cursor(
+    cursor: Cursor,
+    rows: Sequence[Sequence],
+    limit: int,
+    timestamp_column: int,
+    id_column: int = 0,
+    ranked: bool = False,
+    older_match: bool = False,
+) -> Optional[str]:
+    """
+    The cursor of the page after the given rows, or None if they didn't
+    fill the page. The key is read from the rows as the database returned
+    them, so that it compares exactly. older_match says the last row is a
+    search match past the ranked ones.
+    """
+    if not rows or len(rows) < limit:
+        return None
+    last = rows[-1]
+    if older_match:
+        return Cursor(match_id=last[id_column]).encode()
+    if ranked:
+        return Cursor(offset=cursor.offset + len(rows)).encode()
+    return Cursor(
+        timestamp=last[timestamp_column], id=last[id_column]
+    ).encode()
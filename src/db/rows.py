@@ -0,0 +1,64 @@
+"""
+Builds models from database rows without validating them.
+
+Every row read goes through a model's from_sqlite_row. The database only
+holds what went through the models, so its rows are trusted: they are
+built with construct, which skips pydantic's validation, leaving it for
+the values that come from users, in create and the routes.
+
+pydantic's own model_construct is no faster than validating, as it works
+out the defaults of every field and private attribute for every object.
+construct sets the instance attributes model_construct would, from the
+given fields and private defaults worked out once per model, which makes
+building a row several times faster.
+
+Every field of the model has to be given, already of the declared type.
+"""
+
+from functools import lru_cache
+from typing import Any, Dict, Type, TypeVar
+
+from pydantic import BaseModel
+
+M = TypeVar("M", bound=BaseModel)
+
+# defaults that can be shared between objects
+IMMUTABLE_TYPES = (type(None), bool, int, float, str, bytes, tuple)
+
+_object_setattr = object.__setattr__
+
+
+@lru_cache(maxsize=None)
+def get_private_defaults(model: Type[BaseModel]) -> Dict[str, Any] | None:
+    """
+    The defaults of the model's private attributes, or None if one of
+    them has to be made afresh for every object.
+    """
+    defaults = {
+        name: attribute.get_default()
+        for name, attribute in model.__private_attributes__.items()
+    }
+    if all(
+        isinstance(value, IMMUTABLE_TYPES) for value in defaults.values()
+    ):
+        return defaults
+    return None
+
+
+def construct(model: Type[M], **fields) -> M:
+    """
+    Builds a model from trusted values, as model_construct does.
+    """
+    obj = model.__new__(model)
+    _object_setattr(obj, "__dict__", fields)
+    _object_setattr(obj, "__pydantic_fields_set__", set(fields))
+    _object_setattr(obj, "__pydantic_extra__", None)
+    defaults = get_private_defaults(model)
+    if defaults is None:
+        defaults = {
+            name: attribute.get_default()
+            for name, attribute in model.__private_attributes__.items()
+        }
+    # None for a model without private attributes, as pydantic has it
+    _object_setattr(obj, "__pydantic_private__", dict(defaults) or None)
+    return obj
@@ -0,0 +1,226 @@
+import sqlite3
+import threading
+from contextlib import contextmanager
+from typing import Dict, Iterator, Optional, Tuple, Type, TypeVar
+
+from pydantic import BaseModel
+
+from ..logging import get_logger
+from ..settings import get_setting
+from .changes import changed_all
+
+logger = get_logger(__name__)
+
+M = TypeVar("M", bound=BaseModel)
+
+# the session the calling thread is working in, if any
+_local = threading.local()
+
+
+class SessionConnection:
+    """
+    Stands in for the notebook connection while a session is active. The
+    models call commit() after every statement; here that does nothing, so
+    all of their statements land in the session's single transaction.
+    """
+
+    def __init__(self, connection: sqlite3.Connection):
+        self._connection = connection
+
+    def __enter__(self) -> "SessionConnection":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> bool:
+        # the session decides whether to commit or roll back
+        return False
+
+    def commit(self):
+        pass
+
+    def __getattr__(self, name):
+        return getattr(self._connection, name)
+
+
+class Session:
+    """
+    A unit of work against one notebook.
+
+    While a session is active on a thread, get_connection() hands out the
+    session's connection and the models' own commits are deferred, so
+    everything done inside the session is committed (or rolled back) as
+    one transaction when it ends.
+
+    The session also keeps an identity map: every row loaded or created
+    while it is active resolves to a single object per (table, id), so
+    get_by_id, parent lookups and the like are served from memory after
+    the first fetch.
+
+    Objects changed without calling save() can be handed to add(); they
+    are saved when the session is flushed or committed.
+
+        with Session() as session:
+            note = Note.get_by_id(1)
+            note.processed = True
+            session.add(note)
+    """
+
+    def __init__(self, notebook: Optional[str] = None):
+        self.notebook = notebook
+        self.identity_map: Dict[Tuple[str, int], BaseModel] = {}
+        self._pending: Dict[Tuple[str, int], BaseModel] = {}
+        self._raw_connection: Optional[sqlite3.Connection] = None
+        self.connection: Optional[SessionConnection] = None
+
+    def __enter__(self) -> "Session":
+        # connection.py asks this module for the active session
+        from .connection import get_connection
+
+        if get_current_session() is not None:
+            raise RuntimeError(
+                "A session is already active on this thread"
+            )
+        if self.notebook is None:
+            self.notebook = get_setting("notebook") or "default"
+        self._raw_connection = get_connection(self.notebook)
+        self.connection = SessionConnection(self._raw_connection)
+        _local.session = self
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> bool:
+        try:
+            if exc_type is None:
+                self.commit()
+            else:
+                logger.warning(
+                    f"rolling back session after {exc_type.__name__}: {exc_value}"
+                )
+                self.rollback()
+        finally:
+            _local.session = None
+        return False
+
+    @staticmethod
+    def _key(obj: BaseModel) -> Tuple[str, int]:
+        return (getattr(obj, "table_name"), getattr(obj, "id"))
+
+    def lookup(self, model: Type[M], obj_id: int) -> Optional[M]:
+        """
+        Returns the object already loaded for this table and id, if any.
+        """
+        return self.identity_map.get((getattr(model, "table_name"), obj_id))  # type: ignore[return-value]
+
+    def remember(self, obj: M) -> M:
+        """
+        Registers a freshly loaded object. If the row was loaded before,
+        the existing object wins, so unsaved changes to it are kept.
+        """
+        key = self._key(obj)
+        existing = self.identity_map.get(key)
+        if existing is not None:
+            return existing  # type: ignore[return-value]
+        self.identity_map[key] = obj
+        return obj
+
+    def forget(self, obj: BaseModel):
+        """
+        Drops a deleted object from the identity map.
+        """
+        key = self._key(obj)
+        self.identity_map.pop(key, None)
+        self._pending.pop(key, None)
+
+    def add(self, obj: BaseModel):
+        """
+        Marks an object to be saved at the next flush.
+        """
+        key = self._key(obj)
+        self.identity_map.setdefault(key, obj)
+        self._pending[key] = obj
+
+    def flush(self):
+        """
+        Saves the objects passed to add(), inside the open transaction.
+        """
+        pending = list(self._pending.values())
+        self._pending.clear()
+        for obj in pending:
+            obj.save()  # type: ignore[attr-defined]
+
+    def commit(self):
+        """
+        Flushes pending objects and commits the transaction.
+        """
+        if self._raw_connection is None:
+            raise RuntimeError("Session is not active")
+        try:
+            self.flush()
+            self._raw_connection.commit()
+        except BaseException:
+            # otherwise the partly flushed writes stay open on the
+            # thread's connection, for its next commit to persist
+            self.rollback()
+            raise
+
+    def rollback(self):
+        """
+        Rolls back the transaction. Loaded objects may no longer match the
+        database, so the identity map is cleared as well.
+        """
+        if self._raw_connection is None:
+            raise RuntimeError("Session is not active")
+        self._raw_connection.rollback()
+        self._pending.clear()
+        self.identity_map.clear()
+        # writes announced during the session may have been undone
+        changed_all()
+
+
+def get_current_session() -> Optional[Session]:
+    """
+    Returns the session active on the calling thread, if any.
+    """
+    return getattr(_local, "session", None)
+
+
+@contextmanager
+def session_scope(notebook: Optional[str] = None) -> Iterator[Session]:
+    """
+    Runs the enclosed block as one unit of work. If a session is already
+    active on this thread, the block joins it instead.
+    """
+    current = get_current_session()
+    if current is not None:
+        yield current
+        return
+    with Session(notebook) as new_session:
+        yield new_session
+
+
+def remember(obj: M) -> M:
+    """
+    Registers obj with the active session, if there is one, and returns
+    the canonical object for its row.
+    """
+    current = get_current_session()
+    if current is None:
+        return obj
+    return current.remember(obj)
+
+
+def lookup(model: Type[M], obj_id: int) -> Optional[M]:
+    """
+    Returns the active session's object for this row, if it has one.
+    """
+    current = get_current_session()
+    if current is None:
+        return None
+    return current.lookup(model, obj_id)
+
+
+def forget(obj: BaseModel):
+    """
+    Drops obj from the active session, if there is one.
+    """
+    current = get_current_session()
+    if current is not None:
+        current.forget(obj)
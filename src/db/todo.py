@@ -1,13 +1,25 @@
 from datetime import datetime
-from typing import TYPE_CHECKING, List, Optional
+from typing import TYPE_CHECKING, ClassVar, List, Optional
 from pydantic import BaseModel, Field, PrivateAttr
 
 
-from ..util import format_time, parse_time
+from ..util import chunked, format_time, parse_time
 from ..errors import CreateDBObjectError, SaveDBObjectError
 from ..logging import get_logger
 from .note import Note
+from . import todo_index
+from .changes import changed
 from .connection import get_connection
+from .fts import (
+    FULL_TEXT_INDEXES,
+    ensure_full_text_index,
+    format_snippet,
+    get_match_query,
+)
+from .indexes import ensure_indexes
+from .pagination import Page, get_cursor, get_next_cursor
+from .rows import construct
+from .session import forget, lookup, remember
 
 if TYPE_CHECKING:
     from .action import Action
@@ -21,6 +33,8 @@ class Todo(BaseModel):
     represents something the user wants to do
     """
 
+    table_name: ClassVar[str] = "todos"
+
     id: int = Field(..., description="Unique identifier for the todo")
     target_start_time: Optional[datetime] = Field(
         None, description="Target start time of the todo"
@@ -41,6 +55,17 @@ class Todo(BaseModel):
     )
 
     _source_note: Optional[Note] = PrivateAttr(default=None)
+    # filled in by get_all when searching
+    _snippet: Optional[str] = PrivateAttr(default=None)
+
+    @property
+    def snippet(self) -> Optional[str]:
+        """
+        The text around the search matches, as HTML, if the todo was found
+        by searching. It comes from the source note when only the note
+        matched.
+        """
+        return self._snippet
 
     @property
     def source_note(self) -> Note:
@@ -79,7 +104,7 @@ class Todo(BaseModel):
         """
         Returns the children todos.
         """
-        return Todo.get_by_source_note_id(self.id)
+        return Todo.get_by_parent_id(self.id)
 
     @property
     def actions(self) -> List["Action"]:
@@ -121,22 +146,29 @@ class Todo(BaseModel):
         with get_connection() as conn:
             cursor = conn.cursor()
             cursor.execute(query)
+            ensure_indexes(cursor, "todos")
+            todo_index.ensure_table(cursor)
+            ensure_full_text_index(cursor, "todos")
             conn.commit()
 
     @classmethod
     def from_sqlite_row(cls, row) -> "Todo":
         """
-        Creates a Todo instance from a SQLite row.
-        """
-        return cls(
-            id=row[0],
-            target_start_time=parse_time(row[1]) if row[1] else None,
-            target_end_time=parse_time(row[2]) if row[2] else None,
-            todo_text=row[3],
-            source_note_id=row[4],
-            parent_id=row[5],
-            complete=bool(row[6]),
-            cancelled=bool(row[7]),
+        Creates a Todo instance from a trusted SQLite row, without
+        validating it.
+        """
+        return remember(
+            construct(
+                cls,
+                id=row[0],
+                target_start_time=parse_time(row[1]) if row[1] else None,
+                target_end_time=parse_time(row[2]) if row[2] else None,
+                todo_text=row[3],
+                source_note_id=row[4],
+                parent_id=row[5],
+                complete=bool(row[6]),
+                cancelled=bool(row[7]),
+            )
         )
 
     @classmethod
@@ -144,6 +176,9 @@ class Todo(BaseModel):
         """
         Retrieves a Todo instance by its ID.
         """
+        todo = lookup(cls, todo_id)
+        if todo is not None:
+            return todo
         with get_connection() as conn:
             cursor = conn.cursor()
             cursor.execute("SELECT * FROM todos WHERE id = ?", (todo_id,))
@@ -169,6 +204,37 @@ class Todo(BaseModel):
                 [cls.from_sqlite_row(row) for row in rows] if rows else []
             )
 
+    @classmethod
+    def get_by_parent_id(cls, parent_id: int) -> List["Todo"]:
+        """
+        Retrieves the children of a todo.
+        """
+        with get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                "SELECT * FROM todos WHERE parent_id = ?", (parent_id,)
+            )
+            return [cls.from_sqlite_row(row) for row in cursor.fetchall()]
+
+    @classmethod
+    def get_by_source_note_ids(cls, note_ids: List[int]) -> List["Todo"]:
+        """
+        Retrieves the todos of several notes at once.
+        """
+        todos = []
+        with get_connection() as conn:
+            cursor = conn.cursor()
+            for chunk in chunked(note_ids):
+                placeholders = ", ".join("?" for _ in chunk)
+                cursor.execute(
+                    f"SELECT * FROM todos WHERE source_note_id IN ({placeholders})",
+                    chunk,
+                )
+                todos.extend(
+                    cls.from_sqlite_row(row) for row in cursor.fetchall()
+                )
+        return todos
+
     @classmethod
     def count(
         cls,
@@ -288,7 +354,9 @@ class Todo(BaseModel):
         with get_connection() as conn:
             cursor = conn.cursor()
             cursor.execute(query, args)
+            todo_index.index_todo(cursor, self.id, self.todo_text)
             conn.commit()
+        changed("todos", self)
 
     @classmethod
     def get_incomplete(cls, offset=0, limit=15) -> list["Todo"]:
@@ -344,7 +412,8 @@ class Todo(BaseModel):
             )
         query = """
             INSERT INTO todos (target_start_time, target_end_time, todo_text, source_note_id, parent_id)
-            VALUES (?, ?, ?, ?, ?);
+            VALUES (?, ?, ?, ?, ?)
+            RETURNING *;
         """
         args = (
             target_start_time,
@@ -360,20 +429,15 @@ class Todo(BaseModel):
         with get_connection() as conn:
             cursor = conn.cursor()
             cursor.execute(query, args)
-            conn.commit()
-            last_row_id = cursor.lastrowid
-            if last_row_id is None:
+            row = cursor.fetchone()
+            if row is None:
                 logger.error("Failed to create todo in the database.")
                 raise ValueError("Failed to create todo in the database.")
-        created_todo = cls.get_by_id(last_row_id)
-        if created_todo is None:
-            logger.error(
-                f"Todo with ID {last_row_id} not found in the database."
-            )
-            raise ValueError(
-                f"Todo with ID {last_row_id} not found in the database."
-            )
-        return created_todo
+            todo = cls.from_sqlite_row(row)
+            todo_index.index_todo(cursor, todo.id, todo.todo_text)
+            conn.commit()
+        changed("todos", todo)
+        return todo
 
     def delete(self):
         """
@@ -385,7 +449,10 @@ class Todo(BaseModel):
         with get_connection() as conn:
             cursor = conn.cursor()
             cursor.execute(query, (self.id,))
+            todo_index.unindex_todo(cursor, self.id)
             conn.commit()
+        forget(self)
+        changed("todos", self, deleted=True)
 
     @classmethod
     def get_all(
@@ -398,11 +465,46 @@ class Todo(BaseModel):
         search: Optional[str] = None,
         offset: Optional[int] = 0,
         limit: Optional[int] = 25,
-    ) -> list["Todo"]:
-        """
-        Reads todos from the database.
-        """
-        query = """
+        cursor: Optional[str] = None,
+    ) -> Page["Todo"]:
+        """
+        Reads todos from the database, newest source note first. A search
+        matches the todo's text or its source note's, and returns the todos
+        matching on their own text first, best first. Pass the next_cursor
+        of a page as cursor for the page after it.
+        """
+        page = get_cursor(cursor)
+        match = get_match_query(search) if search else None
+        snippet = (
+            ",\n COALESCE(todo_matches.snippet, note_matches.snippet)"
+            if match
+            else ""
+        )
+        query = ""
+        args = []
+        if match:
+            todos_fts = FULL_TEXT_INDEXES["todos"]
+            notes_fts = FULL_TEXT_INDEXES["notes"]
+            # the todos are read starting from the matches, rather than
+            # checking every todo against them
+            query += f"""
+            WITH todo_matches AS MATERIALIZED (
+                SELECT rowid, rank, {todos_fts.snippet} AS snippet
+                FROM {todos_fts.name} WHERE {todos_fts.name} MATCH ?
+            ),
+            note_matches AS MATERIALIZED (
+                SELECT rowid, rank, {notes_fts.snippet} AS snippet
+                FROM {notes_fts.name} WHERE {notes_fts.name} MATCH ?
+            ),
+            matched_todos AS (
+                SELECT rowid AS id FROM todo_matches
+                UNION
+                SELECT todos.id FROM note_matches
+                JOIN todos ON todos.source_note_id = note_matches.rowid
+            )
+            """
+            args.extend([match, match])
+        query += f"""
             SELECT 
                 todos.id, 
                 todos.target_start_time, 
@@ -411,11 +513,24 @@ class Todo(BaseModel):
                 todos.source_note_id, 
                 todos.parent_id,
                 todos.complete,
-                todos.cancelled
-            FROM todos
-            JOIN notes on todos.source_note_id = notes.id
+                todos.cancelled,
+                notes.timestamp{snippet}
         """
-        args = []
+        if match:
+            query += """
+            FROM matched_todos
+            CROSS JOIN todos ON todos.id = matched_todos.id
+            JOIN notes on todos.source_note_id = notes.id
+            LEFT JOIN todo_matches ON todo_matches.rowid = todos.id
+            LEFT JOIN note_matches ON note_matches.rowid = notes.id
+            """
+        else:
+            # newest first down the notes' timestamp index, so a page
+            # stops reading once it is full, instead of sorting every todo
+            query += """
+            FROM notes
+            CROSS JOIN todos ON todos.source_note_id = notes.id
+            """
         # time range stuff
         if before or after:
             query += ""
@@ -441,11 +556,6 @@ class Todo(BaseModel):
         ):  # todo scheduled time or todo created time should be after the given time
             query += " AND (todos.target_start_time > ? OR todos.target_end_time > ? OR notes.timestamp > ?)"
             args.extend([after, after, after])
-        if search:
-            query += (
-                " AND (todos.todo_text LIKE ? OR notes.note_text LIKE ?)"
-            )
-            args.extend(["%" + search + "%", "%" + search + "%"])
         # filter by status
         # active means not cancelled or complete
         # cancelled means cancelled
@@ -465,14 +575,26 @@ class Todo(BaseModel):
             query += " AND (todos.cancelled = 1)"
         if active and not complete and not cancelled:  # active only
             query += " AND (todos.cancelled = 0 and todos.complete = 0)"
+        if page.id is not None and not match:
+            query += " AND (notes.timestamp, todos.id) < (?, ?)"
+            args.extend([page.timestamp, page.id])
+        if match:
+            query += " ORDER BY todo_matches.rank IS NULL, todo_matches.rank, note_matches.rank,"
+        else:
+            query += " ORDER BY"
+        query += " notes.timestamp DESC, todos.id DESC"
         query += " LIMIT ?, ?"
-        args.append(offset)
+        args.append(offset + page.offset)
         args.append(limit)
         with get_connection() as conn:
-            cursor = conn.cursor()
-            if complete is not None:
-                cursor.execute(query, args)
-            else:
-                cursor.execute(query, args)
-            rows = cursor.fetchall()
-            return [cls.from_sqlite_row(row) for row in rows]
+            db_cursor = conn.cursor()
+            db_cursor.execute(query, args)
+            rows = db_cursor.fetchall()
+        todos = Page(
+            [cls.from_sqlite_row(row) for row in rows],
+            get_next_cursor(page, rows, limit, 8, ranked=bool(match)),
+        )
+        if match:
+            for todo, row in zip(todos, rows):
+                todo._snippet = format_snippet(row[-1])
+        return todos
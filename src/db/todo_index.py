@@ -0,0 +1,246 @@
+"""
+A BM25 index over todo text, kept in the notebook next to the todos.
+
+find_todo used to ask the LLM to pick a todo out of every todo from the
+past month. The index finds the likely candidates locally instead, so the
+LLM is only needed when none of them is a clear match.
+
+The postings live in the todo_terms table: how many times each term
+appears in each todo. Todo.create, save and delete keep them up to date
+on the same connection, so they commit or roll back with the todo. Scores
+are worked out in Python, from the postings of the query's terms and of
+the todos that have them.
+
+BM25 also needs the number of todos indexed and their total length.
+Those are kept in the one row of todo_term_stats, which index_todo and
+unindex_todo adjust, rather than being counted from every posting on
+every search.
+"""
+
+import math
+import re
+import sqlite3
+from collections import Counter
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional
+
+from ..logging import get_logger
+
+logger = get_logger(__name__)
+
+# the usual BM25 parameters
+K1 = 1.2
+B = 0.75
+
+STOPWORDS = frozenset("""
+    a an and are as at be been but by do for from had has have i i'm in is
+    it its just me my of on or our so that the their them then there this
+    to up was we were will with you your
+    """.split())
+
+WORD = re.compile(r"[a-z0-9']+")
+
+
+def stem(word: str) -> str:
+    """
+    Strips the common English suffixes, so that "walked", "walking" and
+    "walks" all index as "walk", and "change" and "changing" as "chang".
+    Crude, but the same on both sides.
+    """
+    for suffix in ("ing", "ed", "es", "s", "e"):
+        if word.endswith(suffix) and len(word) - len(suffix) >= 3:
+            return word[: -len(suffix)]
+    return word
+
+
+def tokenize(text: str) -> List[str]:
+    return [
+        stem(word.strip("'"))
+        for word in WORD.findall(text.lower())
+        if word.strip("'") and word not in STOPWORDS
+    ]
+
+
+@dataclass
+class TodoMatch:
+    todo_id: int
+    score: float
+    # how much of the todo's own terms, weighted by idf, the query has
+    coverage: float
+
+
+def ensure_table(cursor: sqlite3.Cursor):
+    """
+    Creates the postings table, and fills it from the todos if it is new.
+    """
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS todo_terms (
+            term TEXT NOT NULL,
+            todo_id INTEGER NOT NULL,
+            count INTEGER NOT NULL,
+            PRIMARY KEY (term, todo_id)
+        ) WITHOUT ROWID
+        """)
+    cursor.execute(
+        "CREATE INDEX IF NOT EXISTS idx_todo_terms_todo_id ON todo_terms (todo_id)"
+    )
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS todo_term_stats (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            documents INTEGER NOT NULL,
+            total_length INTEGER NOT NULL
+        )
+        """)
+    counted = cursor.execute(
+        "SELECT 1 FROM todo_term_stats WHERE id = 1"
+    ).fetchone()
+    if counted is None:
+        cursor.execute("""
+            INSERT INTO todo_term_stats (id, documents, total_length)
+            SELECT 1, COUNT(DISTINCT todo_id), COALESCE(SUM(count), 0)
+            FROM todo_terms
+            """)
+    indexed = cursor.execute("SELECT 1 FROM todo_terms LIMIT 1").fetchone()
+    if indexed is None:
+        rebuild(cursor)
+
+
+def rebuild(cursor: sqlite3.Cursor):
+    cursor.execute("DELETE FROM todo_terms")
+    cursor.execute(
+        "UPDATE todo_term_stats SET documents = 0, total_length = 0 WHERE id = 1"
+    )
+    todos = cursor.execute("SELECT id, todo_text FROM todos").fetchall()
+    for todo_id, todo_text in todos:
+        index_todo(cursor, todo_id, todo_text)
+    if todos:
+        logger.info(f"Indexed {len(todos)} todos.")
+
+
+def index_todo(cursor: sqlite3.Cursor, todo_id: int, todo_text: str):
+    """
+    Replaces the postings of a todo.
+    """
+    unindex_todo(cursor, todo_id)
+    counts = Counter(tokenize(todo_text))
+    cursor.executemany(
+        "INSERT INTO todo_terms (term, todo_id, count) VALUES (?, ?, ?)",
+        [(term, todo_id, count) for term, count in counts.items()],
+    )
+    if counts:
+        _add_to_stats(cursor, 1, sum(counts.values()))
+
+
+def unindex_todo(cursor: sqlite3.Cursor, todo_id: int):
+    (length,) = cursor.execute(
+        "SELECT SUM(count) FROM todo_terms WHERE todo_id = ?", (todo_id,)
+    ).fetchone()
+    if length is None:
+        return
+    cursor.execute("DELETE FROM todo_terms WHERE todo_id = ?", (todo_id,))
+    _add_to_stats(cursor, -1, -length)
+
+
+def _add_to_stats(cursor: sqlite3.Cursor, documents: int, length: int):
+    cursor.execute(
+        """
+        UPDATE todo_term_stats
+        SET documents = documents + ?, total_length = total_length + ?
+        WHERE id = 1
+        """,
+        (documents, length),
+    )
+
+
+def search(
+    cursor: sqlite3.Cursor,
+    text: str,
+    todo_ids: Optional[Iterable[int]] = None,
+    limit: int = 5,
+) -> List[TodoMatch]:
+    """
+    The todos that best match text, best first. Only todos sharing at
+    least one term with it are returned. Pass todo_ids to only consider
+    those todos; the statistics still come from all of them.
+    """
+    terms = Counter(tokenize(text))
+    if not terms:
+        return []
+    placeholders = ", ".join("?" for _ in terms)
+    postings = cursor.execute(
+        f"SELECT term, todo_id, count FROM todo_terms WHERE term IN ({placeholders})",
+        list(terms),
+    ).fetchall()
+    allowed = set(todo_ids) if todo_ids is not None else None
+    matched: Dict[int, Dict[str, int]] = {}
+    for term, todo_id, count in postings:
+        if allowed is None or todo_id in allowed:
+            matched.setdefault(todo_id, {})[term] = count
+    if not matched:
+        return []
+    documents, total_length = cursor.execute(
+        "SELECT documents, total_length FROM todo_term_stats WHERE id = 1"
+    ).fetchone()
+    average_length = total_length / documents
+    document_frequency = Counter(term for term, _, _ in postings)
+    idf = {
+        term: _idf(documents, frequency)
+        for term, frequency in document_frequency.items()
+    }
+    placeholders = ", ".join("?" for _ in matched)
+    lengths = dict(
+        cursor.execute(
+            f"SELECT todo_id, SUM(count) FROM todo_terms WHERE todo_id IN ({placeholders}) GROUP BY todo_id",
+            list(matched),
+        ).fetchall()
+    )
+    scores = {
+        todo_id: sum(
+            idf[term]
+            * count
+            * (K1 + 1)
+            / (
+                count
+                + K1 * (1 - B + B * lengths[todo_id] / average_length)
+            )
+            for term, count in counts.items()
+        )
+        for todo_id, counts in matched.items()
+    }
+    best = sorted(scores, key=scores.__getitem__, reverse=True)[:limit]
+    # coverage needs the idf of every term of the best todos
+    placeholders = ", ".join("?" for _ in best)
+    todo_terms: Dict[int, List[str]] = {}
+    for term, todo_id in cursor.execute(
+        f"SELECT term, todo_id FROM todo_terms WHERE todo_id IN ({placeholders})",
+        best,
+    ):
+        todo_terms.setdefault(todo_id, []).append(term)
+    missing = list(
+        {term for terms in todo_terms.values() for term in terms}
+        - set(idf)
+    )
+    if missing:
+        placeholders = ", ".join("?" for _ in missing)
+        idf.update(
+            (term, _idf(documents, frequency))
+            for term, frequency in cursor.execute(
+                f"SELECT term, COUNT(*) FROM todo_terms WHERE term IN ({placeholders}) GROUP BY term",
+                missing,
+            )
+        )
+    matches = []
+    for todo_id in best:
+        if set(todo_terms[todo_id]) <= set(matched[todo_id]):
+            # exactly, rather than two float sums that can round apart
+            coverage = 1.0
+        else:
+            # rare terms missing from the text count against it the most
+            weight = sum(idf[term] for term in todo_terms[todo_id])
+            coverage = sum(idf[term] for term in matched[todo_id]) / weight
+        matches.append(TodoMatch(todo_id, scores[todo_id], coverage))
+    return matches
+
+
+def _idf(documents: int, frequency: int) -> float:
+    return math.log((documents - frequency + 0.5) / (frequency + 0.5) + 1)
@@ -1,10 +1,14 @@
-from typing import List, Optional
+from typing import ClassVar, List, Optional
 from pydantic import BaseModel, Field, PrivateAttr
 
 from ..logging import get_logger
+from ..util import chunked
 
 from .note import Note
 from .connection import get_connection
+from .indexes import ensure_indexes
+from .rows import construct
+from .session import lookup, remember
 
 
 logger = get_logger(__name__)
@@ -15,6 +19,8 @@ class ToolCall(BaseModel):
     Represents a tool call from a user's note'
     """
 
+    table_name: ClassVar[str] = "tool_calls"
+
     id: int = Field(..., description="Unique identifier for the tool call")
     source_note_id: int = Field(..., description="ID of the source note")
     target_table: str = Field(
@@ -74,20 +80,24 @@ class ToolCall(BaseModel):
         with get_connection() as conn:
             cursor = conn.cursor()
             cursor.execute(query)
+            ensure_indexes(cursor, "tool_calls")
             conn.commit()
 
     @classmethod
     def from_sqlite_row(cls, row):
         """
-        Creates a tool call instance from a SQLite row.
+        Creates a tool call instance from a trusted SQLite row.
         """
-        return cls(
-            id=row[0],
-            source_note_id=row[1],
-            target_table=row[2],
-            target_id=row[3],
-            target=row[4],
-            tool_call=row[5],
+        return remember(
+            construct(
+                cls,
+                id=row[0],
+                source_note_id=row[1],
+                target_table=row[2],
+                target_id=row[3],
+                target=row[4],
+                tool_call=row[5],
+            )
         )
 
     @classmethod
@@ -95,6 +105,9 @@ class ToolCall(BaseModel):
         """
         Retrieves a tool call instance by its ID.
         """
+        tool_call = lookup(cls, tool_call_id)
+        if tool_call is not None:
+            return tool_call
         query = """
             SELECT * FROM tool_calls WHERE id = ?
         """
@@ -122,6 +135,27 @@ class ToolCall(BaseModel):
                 [cls.from_sqlite_row(row) for row in rows] if rows else []
             )
 
+    @classmethod
+    def get_by_source_note_ids(
+        cls, note_ids: List[int]
+    ) -> List["ToolCall"]:
+        """
+        Retrieves the tool calls of several notes at once.
+        """
+        tool_calls = []
+        with get_connection() as conn:
+            cursor = conn.cursor()
+            for chunk in chunked(note_ids):
+                placeholders = ", ".join("?" for _ in chunk)
+                cursor.execute(
+                    f"SELECT * FROM tool_calls WHERE source_note_id IN ({placeholders})",
+                    chunk,
+                )
+                tool_calls.extend(
+                    cls.from_sqlite_row(row) for row in cursor.fetchall()
+                )
+        return tool_calls
+
     @classmethod
     def get_by_target(
         cls, target_table: str, target_id: int
@@ -216,11 +250,13 @@ class ToolCall(BaseModel):
                 raise ValueError(
                     f"Failed to create tool call for source note ID {source_note_id}."
                 )
-            return cls(
-                id=cursor.lastrowid,
-                source_note_id=source_note_id,
-                target_table=target_table,
-                target_id=target_id,
-                target=target,
-                tool_call=tool_call,
+            return remember(
+                cls(
+                    id=cursor.lastrowid,
+                    source_note_id=source_note_id,
+                    target_table=target_table,
+                    target_id=target_id,
+                    target=target,
+                    tool_call=tool_call,
+                )
             )
@@ -1,6 +1,6 @@
 import os
 import sqlite3
-from typing import Optional
+from typing import List, Optional, Tuple
 from pydantic import BaseModel, Field
 
 
@@ -11,6 +11,8 @@ from .connection import get_connection
 
 logger = get_logger(__name__)
 
+MIGRATIONS_DIR = os.path.join("src", "db", "migrations")
+
 
 class Version(BaseModel):
     """
@@ -80,12 +82,42 @@ class Version(BaseModel):
                 "Version table does not exist. Please migrate to a newer version."
             ) from e
 
+    @classmethod
+    def get_migration_steps(
+        cls, current_db_version: str, new_db_version: str
+    ) -> List[Tuple[str, str]]:
+        """
+        Returns the (from, to) versions of the migration files that lead
+        from the current version to the new one, in order.
+        """
+        migrations = {}
+        for filename in os.listdir(MIGRATIONS_DIR):
+            if not filename.endswith(".sql"):
+                continue
+            from_str, to_str = filename[: -len(".sql")].split("-")
+            migrations[from_str.replace("_", ".")] = to_str.replace(
+                "_", "."
+            )
+        steps = []
+        version = current_db_version
+        while version != new_db_version:
+            next_version = migrations.get(version)
+            if next_version is None:
+                curr_str = version.replace(".", "_")
+                new_str = new_db_version.replace(".", "_")
+                raise FileNotFoundError(
+                    f"Migration file {os.path.join(MIGRATIONS_DIR, f'{curr_str}-{new_str}.sql')} does not exist."
+                )
+            steps.append((version, next_version))
+            version = next_version
+        return steps
+
     @classmethod
     def migrate(cls, new_db_version: str) -> None:
         """
-        Migrates the version information in the database to a new version.
+        Migrates the database to a new version, running each migration
+        file between the two in turn.
         """
-        # ensure the new version exists in the migrations folder
         try:
             current_db_version = cls.get().db_version
         except ValueError:
@@ -98,15 +130,22 @@ class Version(BaseModel):
                 f"Version {new_db_version} is already set in the database."
             )
             return
-        curr_str = current_db_version.replace(".", "_")
-        new_str = new_db_version.replace(".", "_")
+        for from_version, to_version in cls.get_migration_steps(
+            current_db_version, new_db_version
+        ):
+            logger.info(f"migrating from {from_version} to {to_version}")
+            cls._run_migration(from_version, to_version)
+
+    @classmethod
+    def _run_migration(cls, from_version: str, to_version: str) -> None:
+        """
+        Runs a single migration file and records the new version.
+        """
+        curr_str = from_version.replace(".", "_")
+        new_str = to_version.replace(".", "_")
         migration_filepath = os.path.join(
-            "src", "db", "migrations", f"{curr_str}-{new_str}.sql"
+            MIGRATIONS_DIR, f"{curr_str}-{new_str}.sql"
         )
-        if not os.path.exists(migration_filepath):
-            raise FileNotFoundError(
-                f"Migration file {migration_filepath} does not exist."
-            )
         # load the migration file
         with open(migration_filepath, "r") as file:
             migration_sql = file.read()
@@ -140,3 +179,13 @@ class Version(BaseModel):
                     raise MigrationError(
                         f"Migration failed unexpectedly: {e} for statement: {statement}"
                     ) from e
+            # record the new version, so the next migration starts here
+            cursor = conn.cursor()
+            cursor.execute(
+                "UPDATE version SET db_version = ?", (to_version,)
+            )
+            if cursor.rowcount == 0:
+                cursor.execute(
+                    "INSERT INTO version (db_version) VALUES (?)",
+                    (to_version,),
+                )
@@ -1,20 +1,49 @@
+import os
+import socket
+import threading
+import time
+import uuid
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, field
 from pprint import pformat
+from typing import List, Optional, Tuple, Union
+
+from openai import OpenAI
+from openai.types.responses import Response
 
 from src import db, processor, logging
+from src.config import (
+    ENGINE_MAX_IDLE_SECONDS,
+    ENGINE_NOTES_PER_REQUEST,
+    ENGINE_WORKERS,
+)
+from src.errors import ProcessorError
+from src.llm import get_light_client
+from src.llm.client import get_usage
+from src.processor.batch import BatchNoteProcessor
+from src.notify import NoteListener, notify_note_created
 
 logger = logging.get_logger(__name__)
 
+Annotator = Union[processor.NoteProcessor, BatchNoteProcessor]
+
+# who this process claims notes as, see Note.claim
+WORKER_NAME = f"{socket.gethostname()}:{os.getpid()}"
+
 
 def cycle_note_processor():
     """
     This function will cycle through notes one at a time in the database and process them.
     """
-    note = db.Note.get_next_unprocessed_note()
-    if not note:
+    notes = db.Note.claim(WORKER_NAME)
+    if not notes:
         logger.debug("No unprocessed notes found.")
         return
+    note = notes[0]
     note_processor = processor.NoteProcessor(note)
-    note_processor.process_note()
+    response = note_processor.request_annotation()
+    pending = note_processor.prepare_tool_calls(response)
+    note_processor.apply_tool_calls(pending, claimed_by=WORKER_NAME)
 
     # processing_payload = pformat(note_processor.to_json())
     # text_file_logger.info(f"Note processing payload:\n{processing_payload}")
@@ -31,3 +60,272 @@ def cycle():
     return {
         "note": note,
     }
+
+
+@dataclass
+class EngineStats:
+    """
+    Running totals for an Engine.
+    """
+
+    processed: int = 0
+    failed: int = 0
+    # annotation requests sent, one per note unless notes are batched
+    requests: int = 0
+    # requests sent again, as an earlier note of the batch changed the
+    # context they were sent with
+    repeated: int = 0
+    # total time spent waiting on the LLM, across all workers
+    llm_seconds: float = 0.0
+    input_tokens: int = 0
+    # input tokens served from the provider's prompt cache
+    cached_tokens: int = 0
+    output_tokens: int = 0
+    # from a note being created to it being processed, for the notes the
+    # engine was notified about
+    latencies: List[float] = field(default_factory=list)
+    started_at: float = field(default_factory=time.monotonic)
+
+    @property
+    def elapsed(self) -> float:
+        return time.monotonic() - self.started_at
+
+    @property
+    def notes_per_second(self) -> float:
+        elapsed = self.elapsed
+        return self.processed / elapsed if elapsed else 0.0
+
+    @property
+    def tokens_per_note(self) -> float:
+        notes = self.processed + self.failed
+        return (
+            (self.input_tokens + self.output_tokens) / notes
+            if notes
+            else 0.0
+        )
+
+    @property
+    def average_latency(self) -> Optional[float]:
+        if not self.latencies:
+            return None
+        return sum(self.latencies) / len(self.latencies)
+
+    def __str__(self) -> str:
+        average = (
+            self.llm_seconds / self.requests if self.requests else 0.0
+        )
+        summary = (
+            f"{self.processed} notes processed, {self.failed} failed in "
+            f"{self.elapsed:.1f}s ({self.notes_per_second:.2f} notes/s, "
+            f"{self.requests} requests, {average:.2f}s average LLM latency)"
+        )
+        if self.repeated:
+            summary += f", {self.repeated} requests repeated"
+        if self.input_tokens:
+            summary += (
+                f", {self.cached_tokens / self.input_tokens:.0%} of "
+                f"{self.input_tokens} input tokens cached, "
+                f"{self.tokens_per_note:.0f} tokens per note"
+            )
+        if self.latencies:
+            summary += (
+                f", created to processed in {self.average_latency:.2f}s "
+                f"on average, {max(self.latencies):.2f}s at most"
+            )
+        return summary
+
+
+class Engine:
+    """
+    Processes the backlog of unprocessed notes several at a time.
+
+    Notes are claimed before they are processed, so several engines, in
+    one process or many, can work through the same notebook. A note whose
+    processing fails keeps its claim until the lease runs out, and is
+    then retried, up to ENGINE_MAX_ATTEMPTS times.
+
+    The LLM requests, which is where nearly all of the time goes, run on a
+    pool of worker threads. Everything that touches the notebook stays on
+    the calling thread: the notes of a batch are loaded with their context
+    up front, and their responses are applied one at a time, oldest note
+    first, whatever order they come back in.
+
+    The result is the same as processing the notes one after another.
+    Before a note is applied, its context is loaded again, and if an
+    earlier note of the batch changed it, say by creating a todo the note
+    goes on to mention, the note is annotated again with the new context.
+    Only notes whose context doesn't depend on the ones before them gain
+    from the parallel requests.
+
+    With notes_per_request above 1, consecutive notes are annotated
+    together, that many to a request (see src/processor/batch.py). They
+    are still applied one note at a time.
+    """
+
+    def __init__(
+        self,
+        workers: int = ENGINE_WORKERS,
+        batch_size: Optional[int] = None,
+        client: Optional[OpenAI] = None,
+        name: Optional[str] = None,
+        notes_per_request: int = ENGINE_NOTES_PER_REQUEST,
+    ):
+        self.workers = workers
+        self.notes_per_request = max(notes_per_request, 1)
+        self.batch_size = (
+            batch_size or workers * 2 * self.notes_per_request
+        )
+        self.client = client or get_light_client()
+        self.name = name or f"{WORKER_NAME}:{uuid.uuid4().hex[:8]}"
+        self.stats = EngineStats()
+        self._listener: Optional[NoteListener] = None
+        self._stopping = threading.Event()
+        self._pool = ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix="engine"
+        )
+
+    def __enter__(self) -> "Engine":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        self._pool.shutdown(wait=True, cancel_futures=True)
+        # let other engines have whatever this one didn't get to
+        db.Note.release_claims(self.name)
+
+    def _request(self, annotator: Annotator) -> Tuple[Response, float]:
+        start = time.monotonic()
+        response = annotator.request_annotation()
+        return response, time.monotonic() - start
+
+    def _annotators(self, notes: List[db.Note]) -> List[Annotator]:
+        if self.notes_per_request == 1:
+            return [
+                processor.NoteProcessor(note, self.client)
+                for note in notes
+            ]
+        return [
+            BatchNoteProcessor(
+                notes[i : i + self.notes_per_request], self.client
+            )
+            for i in range(0, len(notes), self.notes_per_request)
+        ]
+
+    def cycle(self) -> int:
+        """
+        Processes one batch of unprocessed notes. Returns the number of
+        notes that were handled, successfully or not.
+        """
+        notes = db.Note.claim(self.name, limit=self.batch_size)
+        if not notes:
+            logger.debug("No unprocessed notes found.")
+            return 0
+        annotators = self._annotators(notes)
+        futures: List[Future] = [
+            self._pool.submit(self._request, annotator)
+            for annotator in annotators
+        ]
+        for annotator, future in zip(annotators, futures):
+            try:
+                response, seconds = future.result()
+                self._count(response, seconds)
+                if not annotator.context_is_current():
+                    # annotated before an earlier note was applied
+                    annotator = self._annotators(self._notes(annotator))[0]
+                    response, seconds = self._request(annotator)
+                    self._count(response, seconds)
+                    self.stats.repeated += 1
+            except Exception as e:
+                for note in self._notes(annotator):
+                    self._failed(note, e)
+                continue
+            if isinstance(annotator, BatchNoteProcessor):
+                split = annotator.split_tool_calls(response)
+            else:
+                split = [(annotator, processor.parse_tool_calls(response))]
+            for note_processor, pending in split:
+                self._apply(note_processor, pending)
+        logger.info(f"Engine: {self.stats}")
+        return len(notes)
+
+    def _notes(self, annotator: Annotator) -> List[db.Note]:
+        if isinstance(annotator, BatchNoteProcessor):
+            return annotator.notes
+        return [annotator.note]
+
+    def _count(self, response: Response, seconds: float):
+        self.stats.requests += 1
+        self.stats.llm_seconds += seconds
+        usage = get_usage(response)
+        self.stats.input_tokens += usage.input_tokens
+        self.stats.cached_tokens += usage.cached_tokens
+        self.stats.output_tokens += usage.output_tokens
+
+    def _apply(
+        self,
+        note_processor: processor.NoteProcessor,
+        pending: List[processor.PendingToolCall],
+    ):
+        note = note_processor.note
+        try:
+            note_processor.resolve_tool_calls(pending)
+            note_processor.apply_tool_calls(pending, claimed_by=self.name)
+        except Exception as e:
+            self._failed(note, e)
+            return
+        self.stats.processed += 1
+        if self._listener is not None:
+            created_at = self._listener.created_at.pop(note.id, None)
+            if created_at is not None:
+                self.stats.latencies.append(time.time() - created_at)
+
+    def _failed(self, note: db.Note, e: Exception):
+        logger.error(f"Failed to process note {note.id}: {e}")
+        self.stats.failed += 1
+        # apply_tool_calls records its own failures
+        if not isinstance(e, ProcessorError):
+            note.processing_error = str(e)
+            note.save()
+
+    def drain(self) -> EngineStats:
+        """
+        Processes notes until none are left.
+        """
+        while self.cycle():
+            pass
+        return self.stats
+
+    def run(
+        self,
+        idle_interval: float = 1.0,
+        max_idle_interval: float = ENGINE_MAX_IDLE_SECONDS,
+    ):
+        """
+        Processes notes as they come in, until stop() is called.
+
+        New notes wake the engine straight away (see src/notify.py).
+        Otherwise it polls, backing off from idle_interval to
+        max_idle_interval while the notebook stays quiet.
+        """
+        self._listener = NoteListener()
+        interval = idle_interval
+        try:
+            while not self._stopping.is_set():
+                if self.cycle():
+                    interval = idle_interval
+                elif self._listener.wait(interval):
+                    interval = idle_interval
+                else:
+                    interval = min(interval * 2, max_idle_interval)
+        finally:
+            self._listener.close()
+            self._listener = None
+
+    def stop(self):
+        """
+        Makes run() return once the current batch is done.
+        """
+        self._stopping.set()
+        notify_note_created()
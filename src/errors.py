@@ -33,6 +33,24 @@ class SaveDBObjectError(DatabaseError):
     pass
 
 
+class InvalidCursorError(DatabaseError):
+    """Exception raised for a page cursor that can't be decoded."""
+
+    pass
+
+
+class ExportError(DatabaseError):
+    """Exception raised for an export that can't be made."""
+
+    pass
+
+
+class ExportUnavailableError(ExportError):
+    """Exception raised for an export format whose library is missing."""
+
+    pass
+
+
 ###########################################################################
 #                             PROCESSOR ERRORS                            #
 ###########################################################################
@@ -54,3 +72,32 @@ class ProcessUpdateError(ProcessorError):
     """Exception raised for errors during the update process."""
 
     pass
+
+
+class ClaimLostError(ProcessorError):
+    """Exception raised when another engine has taken over a note."""
+
+    pass
+
+
+###########################################################################
+#                                LLM ERRORS                               #
+###########################################################################
+
+
+class LLMError(PlannerError):
+    """Base class for all LLM-related exceptions."""
+
+    pass
+
+
+class CacheMissError(LLMError):
+    """Exception raised when replaying a request that was never cached."""
+
+    pass
+
+
+class BatchError(LLMError):
+    """Exception raised when a batch of requests fails as a whole."""
+
+    pass
@@ -6,15 +6,19 @@
 
 import logging
 import os
+import threading
+from typing import Optional
+
 from openai import OpenAI
 
 from ..logging import get_logger
-from ..config import CHAT_SERVICE
+from ..config import CHAT_SERVICE, LLM_CACHE_MODE
 
+from .cache import ResponseCache
+from .client import LLMClient
 from .grok import GrokChatClient
 from .openAI import OpenAIChatClient
 
-
 logger = get_logger(__name__)
 logger.setLevel(logging.INFO)
 
@@ -33,24 +37,65 @@ def get_client() -> GrokChatClient | OpenAIChatClient:
         raise ValueError(f"Unsupported chat service: {CHAT_SERVICE}")
 
 
-def get_light_client() -> OpenAI:
+def get_client_kwargs() -> dict:
     """
-    Factory function to create a light client based on the configured chat service.
+    The arguments for the openai client of the configured chat service.
     """
     if CHAT_SERVICE == "grok":
-        logger.info("Using Grok")
         api_key = os.getenv("XAI_API_KEY")
-        if not api_key:
+        if not api_key and LLM_CACHE_MODE != "replay":
             raise ValueError("Missing API key")
-        return OpenAI(api_key=api_key, base_url="https://api.x.ai/v1")
+        return {"api_key": api_key, "base_url": "https://api.x.ai/v1"}
     elif CHAT_SERVICE == "openai":
-        logger.info("Using OpenAI")
-        return OpenAI()
+        return {}
     elif CHAT_SERVICE == "ollama":
-        logger.info("Using Ollama")
-        return OpenAI(
-            base_url="http://localhost:11434/v1",  # Default Ollama local endpoint
-            api_key="ollama",  # Ollama doesn't require a real API key, using dummy value
-        )
+        return {
+            "base_url": "http://localhost:11434/v1",  # Default Ollama local endpoint
+            "api_key": "ollama",  # Ollama doesn't require a real API key, using dummy value
+        }
     else:
         raise ValueError(f"Unsupported chat service: {CHAT_SERVICE}")
+
+
+_shared_client: Optional[LLMClient] = None
+_shared_client_pid: Optional[int] = None
+_shared_client_lock = threading.Lock()
+
+
+def get_shared_client() -> LLMClient:
+    """
+    The process' LLMClient, created on first use. Everything that talks to
+    the LLM goes through it, so they share its connection pool and limits.
+    """
+    global _shared_client, _shared_client_pid
+    with _shared_client_lock:
+        # a forked child doesn't get the parent's event loop thread
+        if _shared_client is None or _shared_client_pid != os.getpid():
+            logger.info(f"Using {CHAT_SERVICE}")
+            kwargs = get_client_kwargs()
+            if LLM_CACHE_MODE == "replay":
+                # nothing is sent, so no key is needed
+                kwargs["api_key"] = (
+                    kwargs.get("api_key")
+                    or os.getenv("OPENAI_API_KEY")
+                    or "replay"
+                )
+            _shared_client = LLMClient(cache=ResponseCache(), **kwargs)
+            _shared_client_pid = os.getpid()
+        return _shared_client
+
+
+def get_light_client() -> LLMClient:
+    """
+    The client the processor uses to call the responses API directly.
+    """
+    return get_shared_client()
+
+
+def get_batch_client() -> OpenAI:
+    """
+    A plain client for the files and batches endpoints, which the shared
+    client doesn't cover. Batches are limited by the provider's own batch
+    queue rather than per request, so they don't go through its limits.
+    """
+    return OpenAI(**get_client_kwargs())
@@ -0,0 +1,208 @@
+"""
+A local cache of LLM responses, keyed by a hash of the request.
+
+The same note, context, model and tools always make the same request, so
+reprocessing a stripped notebook can be served from here instead of from
+the provider. Entries expire after a TTL, and the least recently used ones
+are dropped once there are more than max_entries.
+
+In replay mode nothing is sent to the provider at all: a request that
+isn't cached raises CacheMissError. That makes runs repeatable and lets
+them work offline.
+"""
+
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, Optional, Type
+
+from openai.types.chat import ChatCompletion
+from openai.types.responses import Response
+from pydantic import BaseModel
+
+from ..config import (
+    LLM_CACHE_MAX_ENTRIES,
+    LLM_CACHE_MODE,
+    LLM_CACHE_PATH,
+    LLM_CACHE_TTL_SECONDS,
+)
+from ..logging import get_logger
+
+logger = get_logger(__name__, "llm.log")
+
+CACHE_MODES = ("off", "on", "replay")
+
+# how to rebuild a cached response, by endpoint
+RESPONSE_TYPES: Dict[str, Type[BaseModel]] = {
+    "responses": Response,
+    "chat.completions": ChatCompletion,
+}
+
+
+def get_cache_key(endpoint: str, request: Dict[str, Any]) -> str:
+    """
+    Hashes a request, with its keys sorted so that the same request always
+    gets the same key.
+    """
+    payload = json.dumps(
+        {"endpoint": endpoint, "request": request},
+        sort_keys=True,
+        separators=(",", ":"),
+        default=str,
+    )
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+@dataclass
+class CacheStats:
+    hits: int = 0
+    misses: int = 0
+    expired: int = 0
+    evicted: int = 0
+
+
+class ResponseCache:
+    """
+    Stores responses in a SQLite database of their own, next to the
+    notebooks. Safe to share between threads.
+    """
+
+    def __init__(
+        self,
+        path: str = LLM_CACHE_PATH,
+        mode: str = LLM_CACHE_MODE,
+        ttl_seconds: int = LLM_CACHE_TTL_SECONDS,
+        max_entries: int = LLM_CACHE_MAX_ENTRIES,
+    ):
+        if mode not in CACHE_MODES:
+            raise ValueError(
+                f"Unknown cache mode {mode}, expected one of {CACHE_MODES}"
+            )
+        self.path = path
+        self.mode = mode
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.stats = CacheStats()
+        self._lock = threading.Lock()
+        self._connection: Optional[sqlite3.Connection] = None
+
+    @property
+    def enabled(self) -> bool:
+        return self.mode != "off"
+
+    @property
+    def replay(self) -> bool:
+        return self.mode == "replay"
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._connection is None:
+            connection = sqlite3.connect(
+                self.path, check_same_thread=False
+            )
+            connection.execute("""
+                CREATE TABLE IF NOT EXISTS llm_responses (
+                    key TEXT PRIMARY KEY,
+                    endpoint TEXT NOT NULL,
+                    model TEXT,
+                    response TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    used_at REAL NOT NULL,
+                    hits INTEGER NOT NULL DEFAULT 0
+                )
+                """)
+            connection.execute("""
+                CREATE INDEX IF NOT EXISTS idx_llm_responses_used_at
+                ON llm_responses (used_at)
+                """)
+            connection.commit()
+            self._connection = connection
+        return self._connection
+
+    def get(self, endpoint: str, request: Dict[str, Any]) -> Optional[Any]:
+        """
+        Returns the cached response to the request, or None.
+        """
+        key = get_cache_key(endpoint, request)
+        now = time.time()
+        with self._lock:
+            connection = self._connect()
+            row = connection.execute(
+                "SELECT response, created_at FROM llm_responses WHERE key = ?",
+                (key,),
+            ).fetchone()
+            if row is not None and now - row[1] > self.ttl_seconds:
+                connection.execute(
+                    "DELETE FROM llm_responses WHERE key = ?", (key,)
+                )
+                connection.commit()
+                self.stats.expired += 1
+                row = None
+            if row is None:
+                self.stats.misses += 1
+                return None
+            connection.execute(
+                "UPDATE llm_responses SET used_at = ?, hits = hits + 1 WHERE key = ?",
+                (now, key),
+            )
+            connection.commit()
+        self.stats.hits += 1
+        # stored from a response the openai client already parsed, so it
+        # is rebuilt without validating it again, as the client does
+        return RESPONSE_TYPES[endpoint].model_construct(
+            **json.loads(row[0])
+        )
+
+    def put(self, endpoint: str, request: Dict[str, Any], response: Any):
+        """
+        Stores the response to the request, evicting the least recently
+        used responses if the cache is full.
+        """
+        key = get_cache_key(endpoint, request)
+        now = time.time()
+        with self._lock:
+            connection = self._connect()
+            connection.execute(
+                """
+                INSERT OR REPLACE INTO llm_responses
+                (key, endpoint, model, response, created_at, used_at)
+                VALUES (?, ?, ?, ?, ?, ?)
+                """,
+                (
+                    key,
+                    endpoint,
+                    request.get("model"),
+                    response.model_dump_json(),
+                    now,
+                    now,
+                ),
+            )
+            count = connection.execute(
+                "SELECT COUNT(*) FROM llm_responses"
+            ).fetchone()[0]
+            if count > self.max_entries:
+                cursor = connection.execute(
+                    """
+                    DELETE FROM llm_responses WHERE key IN (
+                        SELECT key FROM llm_responses
+                        ORDER BY used_at LIMIT ?
+                    )
+                    """,
+                    (count - self.max_entries,),
+                )
+                self.stats.evicted += cursor.rowcount
+            connection.commit()
+
+    def clear(self):
+        with self._lock:
+            connection = self._connect()
+            connection.execute("DELETE FROM llm_responses")
+            connection.commit()
+
+    def close(self):
+        with self._lock:
+            if self._connection is not None:
+                self._connection.close()
+                self._connection = None
@@ -0,0 +1,295 @@
+import asyncio
+import json
+import threading
+import time
+from dataclasses import dataclass
+from types import SimpleNamespace
+from typing import Any, Awaitable, Callable, Coroutine, Optional, TypeVar
+
+from openai import AsyncOpenAI
+
+from ..config import LLM_MAX_IN_FLIGHT, LLM_TOKENS_PER_MINUTE
+from ..errors import CacheMissError
+from ..logging import get_logger
+from .cache import ResponseCache
+
+logger = get_logger(__name__, "llm.log")
+
+T = TypeVar("T")
+
+
+def estimate_tokens(request: dict) -> int:
+    """
+    Roughly how many tokens a request will use, at about four characters
+    per token. Only used until the response reports the real number.
+    """
+    return len(json.dumps(request, default=str)) // 4
+
+
+@dataclass
+class Usage:
+    """
+    The tokens a response reports, for either API. cached_tokens is the
+    part of the input the provider served from its prompt cache.
+    """
+
+    input_tokens: int = 0
+    cached_tokens: int = 0
+    output_tokens: int = 0
+
+    @property
+    def total_tokens(self) -> int:
+        return self.input_tokens + self.output_tokens
+
+
+def get_usage(response: Any) -> Usage:
+    """
+    Reads the token usage off a responses or chat completions response.
+    Responses without usage, like the stub's, count as zero.
+    """
+    usage = getattr(response, "usage", None)
+    if usage is None:
+        return Usage()
+    # the responses API says input and output, chat completions says
+    # prompt and completion
+    input_tokens = getattr(usage, "input_tokens", None)
+    if input_tokens is None:
+        input_tokens = getattr(usage, "prompt_tokens", 0)
+        details = getattr(usage, "prompt_tokens_details", None)
+        output_tokens = getattr(usage, "completion_tokens", 0)
+    else:
+        details = getattr(usage, "input_tokens_details", None)
+        output_tokens = getattr(usage, "output_tokens", 0)
+    return Usage(
+        input_tokens=input_tokens or 0,
+        cached_tokens=getattr(details, "cached_tokens", 0) or 0,
+        output_tokens=output_tokens or 0,
+    )
+
+
+class TokenBudget:
+    """
+    A token bucket holding up to a minute's worth of tokens, refilled
+    continuously. Requests take their estimated tokens up front, and the
+    difference is settled once the response reports its usage.
+    """
+
+    def __init__(self, tokens_per_minute: int):
+        self.tokens_per_minute = tokens_per_minute
+        self.tokens = float(tokens_per_minute)
+        self._updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(
+            self.tokens_per_minute,
+            self.tokens
+            + (now - self._updated) * self.tokens_per_minute / 60,
+        )
+        self._updated = now
+
+    async def acquire(self, tokens: int) -> float:
+        """
+        Waits until the budget has room for tokens, and takes them. Returns
+        how long it waited.
+        """
+        if not self.tokens_per_minute:
+            return 0.0
+        # a request bigger than the whole budget still has to go out
+        tokens = min(tokens, self.tokens_per_minute)
+        waited = 0.0
+        while True:
+            self._refill()
+            if self.tokens >= tokens:
+                self.tokens -= tokens
+                return waited
+            delay = (tokens - self.tokens) * 60 / self.tokens_per_minute
+            await asyncio.sleep(delay)
+            waited += delay
+
+    def settle(self, estimated: int, used: int):
+        """
+        Corrects the budget once the real usage of a request is known.
+        """
+        if not self.tokens_per_minute:
+            return
+        self._refill()
+        self.tokens = min(
+            self.tokens_per_minute, self.tokens + estimated - used
+        )
+
+
+@dataclass
+class LLMStats:
+    """
+    Running totals for an LLMClient.
+    """
+
+    requests: int = 0
+    # answered from the response cache, without a request
+    cache_hits: int = 0
+    failed: int = 0
+    in_flight: int = 0
+    # the most requests that were ever in flight at once
+    peak_in_flight: int = 0
+    tokens: int = 0
+    input_tokens: int = 0
+    # input tokens served from the provider's prompt cache
+    cached_tokens: int = 0
+    # time spent waiting on the token budget
+    throttled_seconds: float = 0.0
+
+    @property
+    def cached_ratio(self) -> float:
+        return (
+            self.cached_tokens / self.input_tokens
+            if self.input_tokens
+            else 0.0
+        )
+
+
+class _SyncEndpoint:
+    """
+    Gives a blocking create() for one of the client's async endpoints, so
+    that existing callers can use it like the synchronous openai client.
+    """
+
+    def __init__(
+        self,
+        client: "LLMClient",
+        create: Callable[..., Coroutine[Any, Any, Any]],
+    ):
+        self._client = client
+        self._create = create
+
+    def create(self, **kwargs) -> Any:
+        return self._client.run(self._create(**kwargs))
+
+
+class LLMClient:
+    """
+    The process' connection to the LLM provider.
+
+    Wraps one AsyncOpenAI client, and with it one HTTP connection pool, on
+    an event loop of its own. At most max_in_flight requests are sent at
+    once, and no more than tokens_per_minute tokens a minute (0 for no
+    limit).
+
+    Async code awaits create_response and create_chat_completion. Other
+    threads can use client.responses.create and
+    client.chat.completions.create, which block like the openai client's.
+
+    With a response cache (see src/llm/cache.py), repeated requests are
+    answered from it, and in replay mode only from it.
+    """
+
+    def __init__(
+        self,
+        max_in_flight: int = LLM_MAX_IN_FLIGHT,
+        tokens_per_minute: int = LLM_TOKENS_PER_MINUTE,
+        cache: Optional[ResponseCache] = None,
+        **client_kwargs,
+    ):
+        self.stats = LLMStats()
+        self.cache = cache if cache is not None and cache.enabled else None
+        self._client = AsyncOpenAI(**client_kwargs)
+        self._budget = TokenBudget(tokens_per_minute)
+        self._loop = asyncio.new_event_loop()
+        self._semaphore = asyncio.Semaphore(max_in_flight)
+        self._thread = threading.Thread(
+            target=self._loop.run_forever, name="llm", daemon=True
+        )
+        self._thread.start()
+        self.responses = _SyncEndpoint(self, self.create_response)
+        self.chat = SimpleNamespace(
+            completions=_SyncEndpoint(self, self.create_chat_completion)
+        )
+
+    def run(self, coroutine: Awaitable[T]) -> T:
+        """
+        Runs a coroutine on the client's event loop and waits for it.
+        """
+        if threading.current_thread() is self._thread:
+            raise RuntimeError(
+                "LLMClient.run can't be called from its own event loop, await the coroutine instead"
+            )
+        return asyncio.run_coroutine_threadsafe(
+            coroutine, self._loop  # type: ignore[arg-type]
+        ).result()
+
+    async def _send(
+        self,
+        endpoint: str,
+        create: Callable[..., Awaitable[Any]],
+        request: dict,
+    ) -> Any:
+        if self.cache is not None:
+            cached = self.cache.get(endpoint, request)
+            if cached is not None:
+                self.stats.cache_hits += 1
+                return cached
+            if self.cache.replay:
+                raise CacheMissError(
+                    f"No cached response to this {endpoint} request for {request.get('model')}"
+                )
+        estimated = estimate_tokens(request)
+        async with self._semaphore:
+            self.stats.throttled_seconds += await self._budget.acquire(
+                estimated
+            )
+            self.stats.in_flight += 1
+            self.stats.peak_in_flight = max(
+                self.stats.peak_in_flight, self.stats.in_flight
+            )
+            start = time.monotonic()
+            try:
+                response = await create(**request)
+            except Exception:
+                self.stats.failed += 1
+                self._budget.settle(estimated, 0)
+                raise
+            finally:
+                self.stats.in_flight -= 1
+        usage = get_usage(response)
+        used = usage.total_tokens or estimated
+        self._budget.settle(estimated, used)
+        self.stats.requests += 1
+        self.stats.tokens += used
+        self.stats.input_tokens += usage.input_tokens
+        self.stats.cached_tokens += usage.cached_tokens
+        logger.info(
+            f"{request.get('model')} answered in {time.monotonic() - start:.2f}s: "
+            f"{usage.input_tokens} input tokens ({usage.cached_tokens} cached), "
+            f"{usage.output_tokens} output tokens"
+        )
+        if self.cache is not None:
+            self.cache.put(endpoint, request, response)
+        return response
+
+    async def create_response(self, **kwargs) -> Any:
+        """
+        Sends a request to the responses API.
+        """
+        return await self._send(
+            "responses", self._client.responses.create, kwargs
+        )
+
+    async def create_chat_completion(self, **kwargs) -> Any:
+        """
+        Sends a request to the chat completions API.
+        """
+        return await self._send(
+            "chat.completions",
+            self._client.chat.completions.create,
+            kwargs,
+        )
+
+    def close(self):
+        """
+        Closes the connection pool and stops the event loop.
+        """
+        if not self._loop.is_running():
+            return
+        self.run(self._client.close())
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
@@ -2,25 +2,25 @@ import json
 import os
 from pprint import pformat
 
-from openai import OpenAI
-
+from ..config import LLM_CACHE_MODE
 from ..logging import get_logger
 
 from .base import ChatClient
+from .client import LLMClient
 
 
 logger = get_logger(__name__, 'llm.log')
 
 
 class GrokChatClient(ChatClient):
-    def _get_client(self) -> OpenAI:
+    def _get_client(self) -> LLMClient:
         api_key = os.getenv("XAI_API_KEY")
-        if not api_key:
+        # replaying from the response cache sends nothing
+        if not api_key and LLM_CACHE_MODE != "replay":
             raise ValueError("Missing API key")
-        return OpenAI(
-            api_key=api_key,
-            base_url="https://api.x.ai/v1"
-        )
+        from . import get_shared_client
+
+        return get_shared_client()
 
     def chat(self, content: str, role: str = 'user', retries: int = 3) -> dict:
         """
@@ -1,24 +1,26 @@
 import json
 import os
-from openai import OpenAI
 from pprint import pformat
 
+from ..config import LLM_CACHE_MODE
 from ..logging import get_logger
 
 from .base import ChatClient
+from .client import LLMClient
 
 
 logger = get_logger(__name__, 'llm.log')
 
 
 class OpenAIChatClient(ChatClient):
-    def _get_client(self) -> OpenAI:
+    def _get_client(self) -> LLMClient:
         api_key = os.getenv("OPENAI_API_KEY")
-        if not api_key:
+        # replaying from the response cache sends nothing
+        if not api_key and LLM_CACHE_MODE != "replay":
             raise ValueError("Missing API key")
-        return OpenAI(
-            api_key=api_key,
-        )
+        from . import get_shared_client
+
+        return get_shared_client()
 
     def chat(self, content: str, role: str = 'user', retries: int = 3) -> dict:
         """
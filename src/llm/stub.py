@@ -0,0 +1,235 @@
+import json
+import threading
+import time
+import uuid
+from types import SimpleNamespace
+from typing import Any, Callable, Dict, List, Optional, Set
+
+from openai.types.responses import ResponseFunctionToolCall
+
+from .client import estimate_tokens
+
+# maps the keyword arguments of a responses.create call to the function
+# calls the stub should answer with, as (name, arguments) pairs
+Responder = Callable[[Dict[str, Any]], List[tuple]]
+
+
+def function_call(name: str, **arguments) -> ResponseFunctionToolCall:
+    """
+    Builds a function call output item, like the ones the API returns.
+    """
+    call_id = uuid.uuid4().hex
+    return ResponseFunctionToolCall(
+        type="function_call",
+        id=f"fc_{call_id}",
+        call_id=f"call_{call_id}",
+        name=name,
+        arguments=json.dumps(arguments),
+        status="completed",
+    )
+
+
+class StubResponse:
+    """
+    The parts of openai's Response object that the processor reads.
+    """
+
+    def __init__(
+        self,
+        output: List[ResponseFunctionToolCall],
+        usage: Optional[SimpleNamespace] = None,
+    ):
+        self.output = output
+        self.usage = usage
+
+
+class StubResponses:
+    def __init__(self, client: "StubClient"):
+        self._client = client
+
+    def create(self, **kwargs) -> StubResponse:
+        return self._client._respond(kwargs)
+
+
+class StubClient:
+    """
+    Stands in for the OpenAI client in tests and benchmarks. Answers every
+    responses.create call with the function calls the responder returns,
+    after an optional delay to imitate network latency.
+
+    With usage=True, responses report roughly the tokens a real request
+    would use, estimated from its size. The instructions and tools count
+    as cached from the second request that sends the same ones, like the
+    provider's prompt cache. output_latency adds a delay per output token,
+    as generating the answer is where most of a real request's time goes.
+
+    files and batches stand in for the batch API, see StubBatches.
+    """
+
+    def __init__(
+        self,
+        responder: Optional[Responder] = None,
+        latency: float = 0.0,
+        output_latency: float = 0.0,
+        usage: bool = False,
+    ):
+        self.responder = responder or (lambda request: [])
+        self.latency = latency
+        self.output_latency = output_latency
+        self.usage = usage
+        self.requests: List[Dict[str, Any]] = []
+        self._prefixes: Set[str] = set()
+        self._lock = threading.Lock()
+        self.responses = StubResponses(self)
+        self.files = StubFiles()
+        self.batches = StubBatches(self)
+
+    def _respond(self, request: Dict[str, Any]) -> StubResponse:
+        prefix = json.dumps(
+            [request.get("instructions"), request.get("tools")],
+            default=str,
+        )
+        with self._lock:
+            self.requests.append(request)
+            prefix_cached = prefix in self._prefixes
+            self._prefixes.add(prefix)
+        output = [
+            function_call(name, **arguments)
+            for name, arguments in self.responder(request)
+        ]
+        output_tokens = (
+            sum(len(item.name) + len(item.arguments) for item in output)
+            // 4
+        )
+        delay = self.latency + self.output_latency * output_tokens
+        if delay:
+            time.sleep(delay)
+        usage = None
+        if self.usage:
+            usage = SimpleNamespace(
+                input_tokens=estimate_tokens(request),
+                input_tokens_details=SimpleNamespace(
+                    cached_tokens=len(prefix) // 4 if prefix_cached else 0
+                ),
+                output_tokens=output_tokens,
+            )
+        return StubResponse(output, usage)
+
+
+class StubFileContent:
+    """
+    The parts of the content of a downloaded file that the backfill reads.
+    """
+
+    def __init__(self, content: bytes):
+        self.content = content
+
+    def write_to_file(self, path: str):
+        with open(path, "wb") as f:
+            f.write(self.content)
+
+
+class StubFiles:
+    def __init__(self):
+        self._files: Dict[str, bytes] = {}
+
+    def create(self, file, purpose: str) -> SimpleNamespace:
+        content = file.read() if hasattr(file, "read") else file[1]
+        file_id = f"file-{uuid.uuid4().hex}"
+        self._files[file_id] = content
+        return SimpleNamespace(id=file_id, purpose=purpose)
+
+    def content(self, file_id: str) -> StubFileContent:
+        return StubFileContent(self._files[file_id])
+
+
+class StubBatches:
+    """
+    A batch endpoint that answers every request of the input file with the
+    client's responder as soon as the batch is created. It still reports
+    the batch in progress the first time it is retrieved, so that callers
+    have to poll for it.
+    """
+
+    def __init__(self, client: "StubClient"):
+        self._client = client
+        self._batches: Dict[str, SimpleNamespace] = {}
+
+    def create(
+        self,
+        input_file_id: str,
+        endpoint: str,
+        completion_window: str,
+        metadata: Optional[Dict[str, str]] = None,
+    ) -> SimpleNamespace:
+        files = self._client.files
+        output, errors = [], []
+        for line in files._files[input_file_id].decode().splitlines():
+            request = json.loads(line)
+            result: Dict[str, Any] = {
+                "id": f"batch_req_{uuid.uuid4().hex}",
+                "custom_id": request["custom_id"],
+            }
+            try:
+                response = self._client._respond(request["body"])
+            except Exception as e:
+                result["response"] = {
+                    "status_code": 500,
+                    "body": {"error": {"message": str(e)}},
+                }
+                result["error"] = None
+                errors.append(result)
+                continue
+            result["response"] = {
+                "status_code": 200,
+                "body": {
+                    "id": f"resp_{uuid.uuid4().hex}",
+                    "object": "response",
+                    "status": "completed",
+                    "output": [
+                        item.model_dump() for item in response.output
+                    ],
+                    "usage": (
+                        json.loads(
+                            json.dumps(response.usage, default=vars)
+                        )
+                        if response.usage
+                        else None
+                    ),
+                },
+            }
+            result["error"] = None
+            output.append(result)
+
+        def write(results: list) -> Optional[str]:
+            if not results:
+                return None
+            content = "".join(
+                json.dumps(result) + "\n" for result in results
+            )
+            file_id = f"file-{uuid.uuid4().hex}"
+            files._files[file_id] = content.encode()
+            return file_id
+
+        batch = SimpleNamespace(
+            id=f"batch_{uuid.uuid4().hex}",
+            endpoint=endpoint,
+            input_file_id=input_file_id,
+            metadata=metadata,
+            status="in_progress",
+            output_file_id=write(output),
+            error_file_id=write(errors),
+            request_counts=SimpleNamespace(
+                total=len(output) + len(errors),
+                completed=len(output),
+                failed=len(errors),
+            ),
+        )
+        self._batches[batch.id] = batch
+        return batch
+
+    def retrieve(self, batch_id: str) -> SimpleNamespace:
+        batch = self._batches[batch_id]
+        status = batch.status
+        batch.status = "completed"
+        return SimpleNamespace(**{**vars(batch), "status": status})
@@ -0,0 +1,119 @@
+"""
+Tells a running engine that there are new notes, so it doesn't have to
+poll for them.
+
+Notifications are small UDP datagrams to localhost. The engine listens on
+PLANNER_NOTIFY_PORT. Nothing is lost if no engine is listening: it picks
+the notes up on its next poll instead. Engines in the same process as the
+writer are also woken through a threading.Event.
+"""
+
+import json
+import select
+import socket
+import threading
+import time
+from typing import Dict, Iterable, Optional
+
+from .config import NOTIFY_PORT
+from .logging import get_logger
+
+logger = get_logger(__name__)
+
+NOTIFY_HOST = "127.0.0.1"
+# big enough for a handful of note ids; bulk uploads send none
+MAX_DATAGRAM = 4096
+
+_note_created = threading.Event()
+
+
+def notify_note_created(
+    note_ids: Iterable[int] = (), port: Optional[int] = None
+):
+    """
+    Wakes up any engine waiting for notes. Pass the ids of the new notes
+    so the engine can report how long they took to get processed.
+    """
+    _note_created.set()
+    payload = json.dumps(
+        {"note_ids": list(note_ids), "created_at": time.time()}
+    ).encode()
+    if len(payload) > MAX_DATAGRAM:
+        payload = json.dumps(
+            {"note_ids": [], "created_at": time.time()}
+        ).encode()
+    try:
+        with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sock:
+            sock.sendto(payload, (NOTIFY_HOST, port or NOTIFY_PORT))
+    except OSError as e:
+        logger.debug(f"could not notify the engine: {e}")
+
+
+class NoteListener:
+    """
+    Waits for note notifications. If the port is taken, for instance by
+    another engine on the same machine, only in-process notifications get
+    through, and the engine falls back to polling.
+    """
+
+    def __init__(self, port: Optional[int] = None):
+        port = port or NOTIFY_PORT
+        # when notified notes were created, by note id
+        self.created_at: Dict[int, float] = {}
+        self._socket: Optional[socket.socket] = None
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        try:
+            sock.bind((NOTIFY_HOST, port))
+            sock.setblocking(False)
+            self._socket = sock
+        except OSError as e:
+            sock.close()
+            logger.warning(
+                f"not listening for new notes on port {port}, falling back to polling: {e}"
+            )
+
+    @property
+    def listening(self) -> bool:
+        return self._socket is not None
+
+    def close(self):
+        if self._socket is not None:
+            self._socket.close()
+            self._socket = None
+
+    def _drain(self) -> bool:
+        received = False
+        while self._socket is not None:
+            try:
+                data = self._socket.recv(MAX_DATAGRAM)
+            except BlockingIOError:
+                break
+            received = True
+            try:
+                message = json.loads(data)
+                for note_id in message.get("note_ids", []):
+                    self.created_at[note_id] = message["created_at"]
+            except (ValueError, KeyError, TypeError):
+                logger.debug(f"ignoring malformed notification {data!r}")
+        return received
+
+    def wait(self, timeout: float) -> bool:
+        """
+        Waits up to timeout seconds for a notification. Returns True if one
+        arrived.
+        """
+        notified = _note_created.is_set()
+        _note_created.clear()
+        if self._socket is None:
+            if not notified:
+                notified = _note_created.wait(timeout)
+                _note_created.clear()
+            return notified
+        notified = self._drain() or notified
+        if not notified:
+            # in-process notifications send a datagram too, so this wakes
+            # up for both
+            select.select([self._socket], [], [], timeout)
+            notified = self._drain()
+        _note_created.clear()
+        return notified
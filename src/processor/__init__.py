@@ -1,17 +1,17 @@
 import json
 import logging
+from dataclasses import dataclass
 from pprint import pformat
-from typing import List
-from openai.types.responses import ToolParam
+from typing import Any, Dict, List, Optional
+from openai import OpenAI
+from openai.types.responses import Response, ToolParam
 
 from src.config import CHAT_MODEL
-from src.errors import SaveDBObjectError
+from src.errors import ClaimLostError, ProcessorError, SaveDBObjectError
 
 # we will import a newly created get_client equivalent, it will just give us the OpenAI client
 from ..llm import get_light_client
-from ..util import NL
-from ..db import Note, Action, Todo, ToolCall
-from ..rendering import strf_action_light, strf_todo_light, strf_note_light
+from ..db import Note, Action, Todo, ToolCall, session_scope
 from ..logging import get_logger
 
 # we will import the various functions and and respective schemas from their files in this directory
@@ -21,6 +21,8 @@ from .create_curiosity import create_curiosity, get_create_curiosity_tool
 from .update_note import update_note, get_update_note_tool
 from .update_todo import update_todo, get_update_todo_tool
 from .update_action import update_action, get_update_action_tool
+from .find_todo import find_todo
+from .context import Context, ContextWindow, context_window
 
 # we will define a processor class
 
@@ -29,7 +31,10 @@ logger.setLevel(logging.DEBUG)
 
 
 # moving this to outside of the class for unit testing purposes
-annotation_system_prompt_template = """
+# the same for every note, so that together with the tool schemas it makes
+# up a prompt prefix the provider can cache. Anything that changes from
+# note to note goes in the input, after it.
+annotation_instructions = """
 You are a world class note taking assistant. The user will create notes throughout the day. You will be fed the notes one at a time, and be tasked with processing them. Your main job is to 
  - log any actions the user takes along with a precise timestamp as to when they took the actions, using the create_action tool.
  - log any todos the user creates along with timestamps for when they intend to start and finish, when included in the users notes, using the create_todo tool. 
@@ -39,8 +44,10 @@ You are a world class note taking assistant. The user will create notes througho
  - the user might ask you to modify an entry in their notebook, so you will be provided the tools to do so.
  - You may have to guess a bit with timestamps. Use the current timestamp provided in the user's note as context to get the full date.
 
-For context, you will be given a chunk of the most recent notes, actions, and todos from past annotations.
+For context, you will be given a chunk of the most recent notes, actions, and todos from past annotations, followed by the note to process. Only use todo ids from the todos given.
+"""
 
+annotation_context_template = """
 here are the notes: 
 
 {notes}
@@ -55,102 +62,287 @@ here are the todos:
 """
 
 
+def format_annotation_context(context: Context) -> str:
+    return annotation_context_template.format(
+        notes=context.notes_text,
+        actions=context.actions_text,
+        todos=context.todos_text,
+    )
+
+
+# the whole prompt as one string, for one-off requests
+annotation_system_prompt_template = (
+    annotation_instructions + annotation_context_template
+)
+
+
+def get_annotation_tools() -> List[ToolParam]:
+    """
+    The tools offered for every note. They don't depend on the note or the
+    notebook, so they are sent exactly the same way every time.
+    """
+    return [
+        get_create_action_tool(),
+        get_create_todo_tool(),
+        get_create_curiosity_tool(),
+        get_update_note_tool(),
+        get_update_todo_tool(),
+        get_update_action_tool(),
+    ]
+
+
+ANNOTATION_TOOLS = get_annotation_tools()
+
+
+@dataclass
+class PendingToolCall:
+    """
+    A tool call from the LLM's response that has not been applied yet.
+    """
+
+    name: str
+    args: Dict[str, Any]
+    # the raw tool call, as stored on the ToolCall row
+    tool_call: str
+
+
+def parse_tool_calls(response: Response) -> List[PendingToolCall]:
+    """
+    The function calls in a response, with their arguments decoded.
+    """
+    pending = []
+    for tool_response in response.output:
+        tool_response_json = tool_response.model_dump()
+        logger.info(f"Tool response:\n{pformat(tool_response_json)}")
+        # get the tool name
+        tool_name = tool_response_json.get("name")
+        if not tool_name:
+            logger.warning("Tool response did not contain a name.")
+            continue
+        # get the arguments
+        args = tool_response_json.get("arguments")
+        if not args:
+            logger.warning("Tool response did not contain arguments.")
+            continue
+        pending.append(
+            PendingToolCall(
+                name=tool_name,
+                args=json.loads(args),
+                tool_call=json.dumps(tool_response_json),
+            )
+        )
+    return pending
+
+
 class NoteProcessor:
-    def __init__(self, note: Note):
+    def __init__(
+        self,
+        note: Note,
+        client: Optional[OpenAI] = None,
+        window: Optional[ContextWindow] = None,
+    ):
         self.note = note
         logger.info(f"Processing note: {self.note.note_text}")
-        self.client = get_light_client()
-        # load context
-        self.context_notes = Note.get_all(
-            limit=25, before=self.note.timestamp
-        )
-        self.context_actions = Action.get_all(
-            limit=25, before=self.note.timestamp
-        )
-        self.context_todos = Todo.get_all(
-            limit=25, complete=False, before=self.note.timestamp
-        )
-        # load tools
-        self.create_action_tool = get_create_action_tool(
-            self.context_todos
-        )
-        self.create_todo_tool = get_create_todo_tool(self.context_todos)
-        self.create_curiosity_tool = get_create_curiosity_tool()
-        self.update_note_tool = get_update_note_tool()
-        self.update_todo_tool = get_update_todo_tool()
-        self.update_action_tool = get_update_action_tool()
-        # we will assign the function schemas to a tools property
-        self.annotation_tools: List[ToolParam] = [
-            self.create_action_tool,
-            self.create_todo_tool,
-            self.create_curiosity_tool,
-            self.update_note_tool,
-            self.update_todo_tool,
-            self.update_action_tool,
-        ]
+        self.client = client or get_light_client()
+        # load context, mostly from what the previous note loaded
+        self.window = window or context_window
+        context = self.window.get(self.note.timestamp)
+        self.context_notes = context.notes
+        self.context_actions = context.actions
+        self.context_todos = context.todos
+        self.annotation_tools: List[ToolParam] = ANNOTATION_TOOLS
         logger.debug(
-            f"Generated system prompt with {len(self.context_notes)} notes, {len(self.context_actions)} actions, and {len(self.context_todos)} todos."
+            f"Generated context with {len(self.context_notes)} notes, {len(self.context_actions)} actions, and {len(self.context_todos)} todos. Context window: {self.window.stats}"
         )
         # 1. pass the raw note to a chatbot along with the last two hours (or 25, whichever is more), open todos, and actions from the past two hours
-        self.annotation_system_prompt = (
-            annotation_system_prompt_template.format(
-                notes=(
-                    NL.join(
-                        strf_note_light(note)
-                        for note in self.context_notes
-                    )
-                    if self.context_notes
-                    else "No notes found."
-                ),
-                actions=(
-                    NL.join(
-                        strf_action_light(action)
-                        for action in self.context_actions
-                    )
-                    if self.context_actions
-                    else "No actions found."
-                ),
-                todos=(
-                    NL.join(
-                        strf_todo_light(todo)
-                        for todo in self.context_todos
-                    )
-                    if self.context_todos
-                    else "No todos found."
-                ),
-            )
+        self.annotation_context = format_annotation_context(context)
+
+    def context_is_current(self) -> bool:
+        """
+        Whether the note would still be given the context it was loaded
+        with. Notes, actions and todos written since can change it.
+        """
+        context = self.window.get(self.note.timestamp)
+        return (
+            format_annotation_context(context) == self.annotation_context
         )
 
+    @property
+    def annotation_system_prompt(self) -> str:
+        return annotation_instructions + self.annotation_context
+
+    @property
+    def annotation_input(self) -> List[Dict[str, str]]:
+        """
+        The sliding context, then the note itself, both after the cached
+        instructions and tools.
+        """
+        return [
+            {"role": "developer", "content": self.annotation_context},
+            {"role": "user", "content": self.note.model_dump_json()},
+        ]
+
+    @property
+    def annotation_request(self) -> Dict[str, Any]:
+        """
+        The arguments of the responses.create call for this note.
+        """
+        return {
+            "model": CHAT_MODEL,
+            "instructions": annotation_instructions,
+            "tools": self.annotation_tools,
+            "input": self.annotation_input,
+        }
+
     # we will process the notes in the following sequence:
     def process_note(self) -> List[ToolCall]:
+        response = self.request_annotation()
+        pending = self.prepare_tool_calls(response)
+        return self.apply_tool_calls(pending)
+
+    def request_annotation(self) -> Response:
+        """
+        Asks the LLM to annotate the note. Nothing is written to the
+        database here.
+        """
         # 1a. the chatbot will be presented with tooling to categorize, annotate, and create spinoff objects
-        response = self.client.responses.create(
-            model=CHAT_MODEL,
-            instructions=self.annotation_system_prompt,
-            input=self.note.model_dump_json(),
-            tools=self.annotation_tools,
-        )
+        response = self.client.responses.create(**self.annotation_request)
         logger.info(
             f"Response:\n{pformat([item.model_dump() for item in response.output])}"
         )
+        return response
+
+    def prepare_tool_calls(
+        self, response: Response
+    ) -> List[PendingToolCall]:
+        """
+        Parses the tool calls out of the response, and makes any follow-up
+        LLM requests they need, so that applying them is database work only.
+        """
+        pending = parse_tool_calls(response)
+        self.resolve_tool_calls(pending)
+        return pending
+
+    def resolve_tool_calls(self, pending: List[PendingToolCall]):
+        """
+        Fills in the todo references the model left to be looked up.
+        """
+        for tool_call in pending:
+            self._resolve_todo_reference(tool_call)
+
+    def _resolve_todo_reference(self, tool_call: PendingToolCall):
+        """
+        A todo id of 0 means the model could not find the todo in its
+        context. Look it up now, rather than from inside the transaction.
+
+        The tool schemas don't list the todo ids, so that they stay the
+        same from note to note. An id that isn't one of the context's todos
+        is treated like a 0.
+        """
+        key = {"create_action": "todo_id", "create_todo": "parent_id"}.get(
+            tool_call.name
+        )
+        todo_id = tool_call.args.get(key) if key else None
+        if todo_id and todo_id not in {
+            todo.id for todo in self.context_todos
+        }:
+            logger.warning(
+                f"{tool_call.name} referenced todo {todo_id}, which is not in the context"
+            )
+            tool_call.args[key] = 0
+        if (
+            tool_call.name == "create_action"
+            and tool_call.args.get("todo_id") == 0
+        ):
+            action = Action(
+                id=0,
+                timestamp=tool_call.args["action_timestamp"],
+                action_text=tool_call.args["action_text"],
+                source_note_id=self.note.id,
+            )
+            found = find_todo(action, client=self.client)
+            tool_call.args["todo_id"] = found[0].id if found else None
+            tool_call.args["mark_complete"] = found[1] if found else False
+        elif (
+            tool_call.name == "create_todo"
+            and tool_call.args.get("parent_id") == 0
+        ):
+            todo = Todo(
+                id=0,
+                todo_text=tool_call.args["todo_text"],
+                source_note_id=self.note.id,
+            )
+            found = find_todo(
+                todo, include_mark_complete=False, client=self.client
+            )
+            if found is None:
+                logger.warning(
+                    "No parent todo found for todo %s", todo.todo_text
+                )
+            tool_call.args["parent_id"] = found[0].id if found else None
+
+    def apply_tool_calls(
+        self,
+        pending: List[PendingToolCall],
+        claimed_by: Optional[str] = None,
+    ) -> List[ToolCall]:
+        """
+        Applies the tool calls to the notebook and marks the note as
+        processed, in one transaction. If any of them fails, none of them
+        are applied and the error is recorded on the note.
+
+        Inside a session, the note joins the session's transaction instead,
+        so several notes can be applied together. A failure then rolls
+        back the whole session.
+
+        If claimed_by is given, the transaction is only committed if the
+        note is still claimed by it (see Note.claim).
+        """
+        try:
+            with session_scope() as session:
+                # tools that load this note should get this object
+                self.note = session.remember(self.note)
+                tool_calls = self._apply_tool_calls(pending)
+                if claimed_by is not None and not self.note.renew_claim(
+                    claimed_by
+                ):
+                    raise ClaimLostError(
+                        f"Note {self.note.id} is no longer claimed by {claimed_by}"
+                    )
+                self.note.processed = True
+                self.note.save()
+        except ClaimLostError:
+            logger.warning(
+                f"Dropped the results for note {self.note.id}, another engine has claimed it"
+            )
+            raise
+        except Exception as e:
+            logger.exception(
+                f"Failed to apply tool calls for note {self.note.id}"
+            )
+            note = Note.get_by_id(self.note.id)
+            if note is not None:
+                note.processing_error = str(e)
+                note.save()
+                self.note = note
+            raise ProcessorError(
+                f"Failed to apply tool calls for note {self.note.id}: {e}"
+            ) from e
+        logger.info(
+            f"Processed note {self.note.id} with {len(tool_calls)} tool calls."
+        )
+        return tool_calls
+
+    def _apply_tool_calls(
+        self, pending: List[PendingToolCall]
+    ) -> List[ToolCall]:
         tool_calls = []
-        for tool_response in response.output:
-            tool_response_json = tool_response.model_dump()
-            logger.info(f"Tool response:\n{pformat(tool_response_json)}")
-            # get the tool name
-            tool_name = tool_response_json.get("name")
-            if not tool_name:
-                logger.warning("Tool response did not contain a name.")
-                continue
-            # get the arguments
-            args = tool_response_json.get("arguments")
-            if not args:
-                logger.warning("Tool response did not contain arguments.")
-                continue
-            args = json.loads(args)
+        for pending_call in pending:
+            tool_name = pending_call.name
+            args = pending_call.args
             tool_call_payload = {
                 "source_note_id": self.note.id,
-                "tool_call": json.dumps(tool_response_json),
+                "tool_call": pending_call.tool_call,
             }
             if tool_name == "create_action":
                 action = create_action(self.note, **args)
@@ -204,11 +396,6 @@ class NoteProcessor:
                 logger.warning(f"Unknown tool name: {tool_name}")
                 continue
             tool_calls.append(tool_call)
-        self.note.processed = True
-        self.note.save()
-        logger.info(
-            f"Processed note {self.note.id} with {len(tool_calls)} tool calls."
-        )
         return tool_calls
 
 
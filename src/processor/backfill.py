@@ -0,0 +1,303 @@
+"""
+Reprocesses a large backlog of notes through the provider's batch API.
+
+Batched requests cost about half as much as interactive ones, in exchange
+for coming back within a day rather than within seconds. That suits
+backfills, such as reprocessing a notebook after strip_db, where nobody is
+waiting on any one note.
+
+A backfill goes through these steps, each of which can be run on its own:
+
+1. write_requests: the annotation request of every unprocessed note,
+   exactly as NoteProcessor would send it, to a JSONL file
+2. submit: uploads the file and creates the batch
+3. wait: polls the batch until the provider is done with it
+4. download: saves the results, and the requests that failed, to JSONL
+5. apply: streams the results back through the NoteProcessor, applying
+   chunk_size notes per transaction
+
+A chunk that fails to apply is rolled back and applied again one note at a
+time, so that one bad note only fails itself. Each chunk's notes are
+claimed under the backfill's name before they are applied, as the engine
+claims them (see Note.claim), so notes processed some other way while the
+batch was running, or claimed by an engine, are skipped.
+"""
+
+import json
+import os
+import socket
+import time
+import uuid
+from dataclasses import dataclass
+from itertools import islice
+from typing import Iterator, List, Optional, Tuple
+
+from openai import OpenAI
+from openai.types.responses import Response
+
+from src.config import (
+    BATCH_APPLY_CHUNK,
+    BATCH_DIR,
+    BATCH_MAX_REQUESTS,
+    BATCH_POLL_SECONDS,
+)
+from src.errors import BatchError, ClaimLostError, ProcessorError
+
+from ..db import Note, Session
+from ..llm import get_batch_client
+from ..logging import get_logger
+from . import NoteProcessor, PendingToolCall
+
+logger = get_logger(__name__, "processor.log")
+
+ENDPOINT = "/v1/responses"
+# statuses a batch doesn't leave
+FINISHED_STATUSES = ("completed", "failed", "expired", "cancelled")
+
+
+def get_custom_id(note: Note) -> str:
+    return f"note-{note.id}"
+
+
+def get_note_id(custom_id: str) -> int:
+    return int(custom_id.removeprefix("note-"))
+
+
+@dataclass
+class BackfillStats:
+    submitted: int = 0
+    processed: int = 0
+    failed: int = 0
+    # processed or claimed some other way before the results came back
+    skipped: int = 0
+    transactions: int = 0
+
+    def __str__(self) -> str:
+        return (
+            f"{self.submitted} notes submitted, {self.processed} processed, "
+            f"{self.failed} failed, {self.skipped} skipped, in "
+            f"{self.transactions} transactions"
+        )
+
+
+class Backfill:
+    def __init__(
+        self,
+        client: Optional[OpenAI] = None,
+        directory: str = BATCH_DIR,
+        max_requests: int = BATCH_MAX_REQUESTS,
+        chunk_size: int = BATCH_APPLY_CHUNK,
+        poll_seconds: float = BATCH_POLL_SECONDS,
+        name: Optional[str] = None,
+    ):
+        self.client = client or get_batch_client()
+        # what the processors use for follow-up requests, like find_todo;
+        # those go through the shared client unless a client was given
+        self.processor_client = client
+        self.directory = directory
+        self.max_requests = max_requests
+        self.chunk_size = chunk_size
+        self.poll_seconds = poll_seconds
+        # who the backfill claims notes as, see Note.claim
+        self.name = name or (
+            f"backfill:{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        )
+        self.stats = BackfillStats()
+        os.makedirs(directory, exist_ok=True)
+
+    def run(self, batch_id: Optional[str] = None) -> BackfillStats:
+        """
+        Backfills the unprocessed notes, or, given a batch_id, picks up a
+        batch submitted earlier.
+        """
+        batch_id = batch_id or self.start()
+        if batch_id is None:
+            return self.stats
+        batch = self.wait(batch_id)
+        for path in self.download(batch):
+            self.apply(path)
+        logger.info(f"Backfill: {self.stats}")
+        return self.stats
+
+    def start(self) -> Optional[str]:
+        """
+        Writes and submits the requests for the unprocessed notes. Returns
+        the id of the batch, or None if there was nothing to submit.
+        """
+        path = os.path.join(
+            self.directory, f"requests_{int(time.time())}.jsonl"
+        )
+        if not self.write_requests(path):
+            logger.info("No unprocessed notes to backfill.")
+            return None
+        return self.submit(path)
+
+    def write_requests(self, path: str) -> int:
+        """
+        Writes a batch request for every unprocessed note, oldest first,
+        up to max_requests. Returns the number of notes written.
+        """
+        notes = Note.get_unprocessed(limit=self.max_requests)
+        with open(path, "w") as f:
+            for note in notes:
+                processor = NoteProcessor(note, self.processor_client)
+                request = {
+                    "custom_id": get_custom_id(note),
+                    "method": "POST",
+                    "url": ENDPOINT,
+                    "body": processor.annotation_request,
+                }
+                f.write(json.dumps(request) + "\n")
+        self.stats.submitted += len(notes)
+        logger.info(f"Wrote {len(notes)} batch requests to {path}")
+        return len(notes)
+
+    def submit(self, path: str) -> str:
+        """
+        Uploads a request file and starts a batch for it. Returns the id
+        of the batch.
+        """
+        with open(path, "rb") as f:
+            uploaded = self.client.files.create(file=f, purpose="batch")
+        batch = self.client.batches.create(
+            input_file_id=uploaded.id,
+            endpoint=ENDPOINT,
+            completion_window="24h",
+        )
+        logger.info(f"Submitted batch {batch.id} for {path}")
+        return batch.id
+
+    def wait(self, batch_id: str):
+        """
+        Polls the batch until it is finished, and returns it. An expired
+        or cancelled batch is returned too, as the requests that did
+        finish still have results.
+        """
+        while True:
+            batch = self.client.batches.retrieve(batch_id)
+            counts = batch.request_counts
+            logger.info(
+                f"Batch {batch_id} is {batch.status}"
+                + (
+                    f", {counts.completed} of {counts.total} done"
+                    if counts
+                    else ""
+                )
+            )
+            if batch.status == "failed":
+                raise BatchError(
+                    f"Batch {batch_id} failed: {getattr(batch, 'errors', None)}"
+                )
+            if batch.status in FINISHED_STATUSES:
+                return batch
+            time.sleep(self.poll_seconds)
+
+    def download(self, batch) -> List[str]:
+        """
+        Saves the batch's results and errors next to its requests, and
+        returns their paths.
+        """
+        paths = []
+        for kind, file_id in [
+            ("results", batch.output_file_id),
+            ("errors", batch.error_file_id),
+        ]:
+            if not file_id:
+                continue
+            path = os.path.join(self.directory, f"{batch.id}_{kind}.jsonl")
+            self.client.files.content(file_id).write_to_file(path)
+            paths.append(path)
+        return paths
+
+    def apply(self, path: str) -> BackfillStats:
+        """
+        Applies a downloaded results file, chunk_size notes at a time.
+        """
+        try:
+            with open(path) as f:
+                lines = (json.loads(line) for line in f if line.strip())
+                for chunk in iter(
+                    lambda: list(islice(lines, self.chunk_size)), []
+                ):
+                    self._apply_chunk(chunk)
+        finally:
+            # the notes that failed go back to the engines
+            Note.release_claims(self.name)
+        return self.stats
+
+    def _prepare(
+        self, results: List[dict]
+    ) -> Iterator[Tuple[NoteProcessor, List[PendingToolCall]]]:
+        by_id = {
+            get_note_id(result["custom_id"]): result for result in results
+        }
+        # claimed as the engine claims them, so that the two never apply
+        # the same note
+        claimed = Note.claim_ids(self.name, by_id)
+        skipped = len(by_id) - len(claimed)
+        if skipped:
+            logger.info(
+                f"Skipped {skipped} notes that were processed or claimed meanwhile"
+            )
+            self.stats.skipped += skipped
+        notes = []
+        for note in claimed:
+            result = by_id[note.id]
+            response = result.get("response") or {}
+            if response.get("status_code") != 200:
+                error = result.get("error") or response.get("body")
+                logger.error(
+                    f"Batch request for note {note.id} failed: {error}"
+                )
+                note.processing_error = json.dumps(error)
+                note.save()
+                self.stats.failed += 1
+                continue
+            notes.append((note, response["body"]))
+        # claim_ids returns them oldest first, as the engine applies them
+        for note, body in notes:
+            processor = NoteProcessor(note, self.processor_client)
+            try:
+                pending = processor.prepare_tool_calls(
+                    Response.model_construct(**body)
+                )
+            except Exception as e:
+                logger.error(f"Failed to prepare note {note.id}: {e}")
+                note.processing_error = str(e)
+                note.save()
+                self.stats.failed += 1
+                continue
+            yield processor, pending
+
+    def _apply_chunk(self, results: List[dict]):
+        prepared = list(self._prepare(results))
+        if not prepared:
+            return
+        try:
+            with Session():
+                for processor, pending in prepared:
+                    processor.apply_tool_calls(
+                        pending, claimed_by=self.name
+                    )
+            self.stats.transactions += 1
+            self.stats.processed += len(prepared)
+            return
+        except ProcessorError as e:
+            logger.warning(
+                f"Rolled back a chunk of {len(prepared)} notes ({e}), applying them one at a time"
+            )
+        for processor, pending in prepared:
+            # the rolled back chunk may have left changes on the objects
+            note = Note.get_by_id(processor.note.id)
+            if note is None:
+                self.stats.skipped += 1
+                continue
+            processor.note = note
+            try:
+                processor.apply_tool_calls(pending, claimed_by=self.name)
+                self.stats.processed += 1
+            except ClaimLostError:
+                self.stats.skipped += 1
+            except ProcessorError:
+                self.stats.failed += 1
+            self.stats.transactions += 1
@@ -0,0 +1,161 @@
+"""
+Annotates several consecutive notes in one LLM request.
+
+The notes of a backfill are mostly short sentences, so a request per note
+spends most of its tokens on the instructions, tools and context that come
+before the note. In batch mode the model is given K notes at once, and
+every tool call it makes says which note it belongs to. The calls are then
+split up by note and applied by each note's own NoteProcessor, exactly as
+if the note had been annotated on its own: one transaction per note, with
+todo references resolved just before it is applied.
+"""
+
+import copy
+from pprint import pformat
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from openai import OpenAI
+from openai.types.responses import Response, ToolParam
+
+from src.config import CHAT_MODEL
+from src.errors import ProcessorError
+
+from ..db import Note, ToolCall
+from ..llm import get_light_client
+from ..logging import get_logger
+from . import (
+    NoteProcessor,
+    PendingToolCall,
+    annotation_instructions,
+    get_annotation_tools,
+    parse_tool_calls,
+)
+from .context import ContextWindow
+
+logger = get_logger(__name__, "processor.log")
+
+# also the same for every request, so the prefix can still be cached
+batch_annotation_instructions = annotation_instructions + """
+This time you will be given several consecutive notes at once, as a JSON list, oldest first. Process each of them as you would on its own; later notes may add to or correct earlier ones. Every tool call must set source_note_id to the id of the note it comes from.
+"""
+
+
+def get_batch_annotation_tools() -> List[ToolParam]:
+    """
+    The annotation tools, each with a source_note_id argument saying which
+    note of the batch the call is for.
+    """
+    tools = []
+    for tool in get_annotation_tools():
+        tool = copy.deepcopy(tool)
+        parameters = tool["parameters"]  # type: ignore[typeddict-item]
+        parameters["properties"]["source_note_id"] = {
+            "type": "integer",
+            "description": "The id of the note this call is for.",
+        }
+        parameters["required"].append("source_note_id")
+        tools.append(tool)
+    return tools
+
+
+BATCH_ANNOTATION_TOOLS = get_batch_annotation_tools()
+
+
+class BatchNoteProcessor:
+    def __init__(
+        self,
+        notes: Sequence[Note],
+        client: Optional[OpenAI] = None,
+        window: Optional[ContextWindow] = None,
+    ):
+        if not notes:
+            raise ValueError("A batch needs at least one note")
+        self.client = client or get_light_client()
+        # oldest first, so each note's context is loaded after the one
+        # before it, and the window only moves forward
+        self.processors = [
+            NoteProcessor(note, self.client, window)
+            for note in sorted(
+                notes, key=lambda note: (note.timestamp, note.id)
+            )
+        ]
+        # the context as of the oldest note; the notes after it are in
+        # the batch itself
+        self.annotation_context = self.processors[0].annotation_context
+
+    @property
+    def notes(self) -> List[Note]:
+        return [processor.note for processor in self.processors]
+
+    def context_is_current(self) -> bool:
+        """
+        Whether every note of the batch would still be given the context
+        it was loaded with. The later notes' contexts are checked too, as
+        their todos are what the model's todo ids are resolved against.
+        """
+        return all(
+            processor.context_is_current() for processor in self.processors
+        )
+
+    @property
+    def annotation_input(self) -> List[Dict[str, str]]:
+        notes = ",".join(note.model_dump_json() for note in self.notes)
+        return [
+            {"role": "developer", "content": self.annotation_context},
+            {"role": "user", "content": f"[{notes}]"},
+        ]
+
+    def process_notes(self) -> Dict[int, List[ToolCall]]:
+        """
+        Annotates and applies every note of the batch. A note that fails
+        has its error recorded and is left out of the result; the others
+        are still applied.
+        """
+        response = self.request_annotation()
+        tool_calls = {}
+        for processor, pending in self.split_tool_calls(response):
+            try:
+                processor.resolve_tool_calls(pending)
+                tool_calls[processor.note.id] = processor.apply_tool_calls(
+                    pending
+                )
+            except ProcessorError as e:
+                logger.error(e)
+        return tool_calls
+
+    def request_annotation(self) -> Response:
+        response = self.client.responses.create(
+            model=CHAT_MODEL,
+            instructions=batch_annotation_instructions,
+            tools=BATCH_ANNOTATION_TOOLS,
+            input=self.annotation_input,  # type: ignore[arg-type]
+        )
+        logger.info(
+            f"Response:\n{pformat([item.model_dump() for item in response.output])}"
+        )
+        return response
+
+    def split_tool_calls(
+        self, response: Response
+    ) -> List[Tuple[NoteProcessor, List[PendingToolCall]]]:
+        """
+        Pairs each note's processor with the tool calls made for it, in
+        the order the notes were written. Notes the model made no calls for
+        get an empty list, and calls for notes outside the batch are
+        dropped.
+        """
+        by_note: Dict[int, List[PendingToolCall]] = {
+            processor.note.id: [] for processor in self.processors
+        }
+        for tool_call in parse_tool_calls(response):
+            note_id = tool_call.args.pop("source_note_id", None)
+            if note_id not in by_note:
+                logger.warning(
+                    f"Dropped {tool_call.name} for note {note_id}, which is not in the batch"
+                )
+                continue
+            by_note[note_id].append(tool_call)
+        return [
+            (processor, by_note[processor.note.id])
+            for processor in self.processors
+        ]
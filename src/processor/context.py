@@ -0,0 +1,326 @@
+import threading
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Set, Tuple
+
+from pydantic import BaseModel
+
+from ..config import CONTEXT_WINDOW_SIZE
+from ..db import Action, Note, Todo, changes
+from ..db.connection import (
+    connection_manager,
+    get_connection,
+    get_notebook,
+    get_notebook_path,
+)
+from ..logging import get_logger
+from ..rendering import strf_action_light, strf_note_light, strf_todo_light
+from ..util import NL
+
+logger = get_logger(__name__, "processor.log")
+
+# timestamps are stored to the second, so "after this minus a second"
+# means "at or after this"
+RESOLUTION = timedelta(seconds=1)
+
+
+@dataclass
+class ContextStats:
+    """
+    How a ContextWindow has been serving its contexts.
+    """
+
+    # served without querying the notebook
+    hits: int = 0
+    # only the rows added since the last context, or the tables that
+    # changed, were queried
+    partial: int = 0
+    # loaded from scratch
+    misses: int = 0
+    queries: int = 0
+
+    @property
+    def total(self) -> int:
+        return self.hits + self.partial + self.misses
+
+    @property
+    def hit_rate(self) -> float:
+        return self.hits / self.total if self.total else 0.0
+
+    @property
+    def partial_rate(self) -> float:
+        return self.partial / self.total if self.total else 0.0
+
+    def __str__(self) -> str:
+        return (
+            f"{self.hits} hits, {self.partial} partial, {self.misses} "
+            f"misses, {self.queries} queries ({self.hit_rate:.0%} hit "
+            f"rate, {self.partial_rate:.0%} partial)"
+        )
+
+
+@dataclass
+class Context:
+    """
+    What the processor tells the LLM about the notebook, as of a note.
+    """
+
+    notes: List[Note]
+    actions: List[Action]
+    todos: List[Todo]
+    notes_text: str
+    actions_text: str
+    todos_text: str
+
+
+class ContextWindow:
+    """
+    The most recent notes, actions and open todos before a point in time,
+    kept up to date between notes instead of being loaded for every one.
+
+    Notes arrive roughly in order, so the context of a note is nearly the
+    same as the one before it. When the window moves forward, only the
+    notes and actions in between are queried. Writes made through the
+    models (see src/db/changes.py) update the window in place, or mark a
+    table to be queried again when they can't be applied exactly. Which
+    open todos are in the window depends on their notes, so they are
+    queried again whenever one changes, or more of them have become due by
+    the time the window moves. The rendered lines are kept as long
+    as the rows behind them don't change.
+
+    The window starts over when the active notebook changes, or the
+    connections are invalidated (see ConnectionManager.invalidate). It
+    also starts over when another connection, such as another process,
+    writes to the notebook, which bumps SQLite's data_version on the
+    connection of the thread asking. A thread's own writes, in a session
+    or not, leave it alone.
+    """
+
+    def __init__(self, size: int = CONTEXT_WINDOW_SIZE):
+        self.size = size
+        self.stats = ContextStats()
+        self._lock = threading.RLock()
+        # the data_version each thread's connection last reported, as
+        # (notebook, data_version)
+        self._local = threading.local()
+        self._reset()
+        changes.add_listener(self._on_change)
+
+    def _reset(self):
+        self._before: Optional[datetime] = None
+        # the notebook path and connection generation the rows are from
+        self._notebook: Optional[Tuple[str, int]] = None
+        self._notes: List[Note] = []
+        self._actions: List[Action] = []
+        self._todos: List[Todo] = []
+        # open todos due before the window's end, when they were loaded
+        self._todo_count: Optional[int] = None
+        self._stale: Set[str] = set(changes.TABLES)
+        # rendered lines, by (table, id)
+        self._rendered: Dict[Tuple[str, int], str] = {}
+
+    def close(self):
+        changes.remove_listener(self._on_change)
+
+    def invalidate(self):
+        """
+        Makes the next context load from scratch.
+        """
+        with self._lock:
+            self._reset()
+
+    def get(self, before: datetime) -> Context:
+        """
+        Returns the context for a note written at before.
+        """
+        with self._lock:
+            self._check_notebook()
+            if self._before is None or before < self._before:
+                self._reset()
+                self._check_notebook()
+                self._load(before)
+                self.stats.misses += 1
+            elif before > self._before or self._stale:
+                self._load(before)
+                self.stats.partial += 1
+            else:
+                self.stats.hits += 1
+            return self._context()
+
+    def _check_notebook(self):
+        """
+        Starts over if the active notebook changed, or another connection
+        wrote to it since this thread last looked.
+        """
+        notebook = (
+            get_notebook_path(get_notebook()),
+            connection_manager.generation,
+        )
+        data_version = (
+            get_connection().execute("PRAGMA data_version").fetchone()[0]
+        )
+        last = getattr(self._local, "data_version", None)
+        if self._notebook is not None and (
+            notebook != self._notebook
+            or (
+                last is not None
+                and last[0] == notebook
+                and last[1] != data_version
+            )
+        ):
+            self._reset()
+        self._notebook = notebook
+        self._local.data_version = (notebook, data_version)
+
+    def _load(self, before: datetime):
+        if "notes" in self._stale:
+            self._notes = Note.get_all(limit=self.size, before=before)
+            self.stats.queries += 1
+        elif self._before is not None and before > self._before:
+            added = Note.get_all(
+                limit=self.size,
+                after=self._before - RESOLUTION,
+                before=before,
+            )
+            self.stats.queries += 1
+            self._notes = self._merge(
+                self._notes, added, key=lambda note: note.id
+            )
+        if "actions" in self._stale:
+            self._actions = Action.get_all(
+                limit=self.size, before=before, include_todo=True
+            )
+            self.stats.queries += 1
+        elif self._before is not None and before > self._before:
+            added = Action.get_all(
+                limit=self.size,
+                after=self._before - RESOLUTION,
+                before=before,
+                include_todo=True,
+            )
+            self.stats.queries += 1
+            self._actions = self._merge(
+                self._actions,
+                added,
+                key=lambda action: (action.timestamp, action.id),
+            )
+        if "todos" in self._stale or before != self._before:
+            # counting is much cheaper than loading, and more todos can
+            # only become due as the window moves forward
+            count = Todo.count(
+                complete=False, cancelled=False, before=before
+            )
+            self.stats.queries += 1
+            if "todos" in self._stale or count != self._todo_count:
+                self._todos = Todo.get_all(
+                    limit=self.size, complete=False, before=before
+                )
+                self.stats.queries += 1
+            self._todo_count = count
+        self._stale.clear()
+        self._before = before
+
+    def _merge(self, current: list, added: list, key) -> list:
+        """
+        The newest size rows of both lists, in the order the models return
+        them.
+        """
+        by_id = {obj.id: obj for obj in current}
+        by_id.update((obj.id, obj) for obj in added)
+        return sorted(by_id.values(), key=key, reverse=True)[: self.size]
+
+    def _render(self, table_name: str, obj, render) -> str:
+        key = (table_name, obj.id)
+        line = self._rendered.get(key)
+        if line is None:
+            line = self._rendered[key] = render(obj)
+        return line
+
+    def _context(self) -> Context:
+        return Context(
+            notes=list(self._notes),
+            actions=list(self._actions),
+            todos=list(self._todos),
+            notes_text=NL.join(
+                self._render("notes", note, strf_note_light)
+                for note in self._notes
+            )
+            or "No notes found.",
+            actions_text=NL.join(
+                self._render("actions", action, strf_action_light)
+                for action in self._actions
+            )
+            or "No actions found.",
+            todos_text=NL.join(
+                self._render("todos", todo, strf_todo_light)
+                for todo in self._todos
+            )
+            or "No todos found.",
+        )
+
+    def _on_change(
+        self, table_name: str, obj: Optional[BaseModel], deleted: bool
+    ):
+        with self._lock:
+            if table_name == "notes":
+                self._apply_change(table_name, self._notes, obj, deleted)
+            elif table_name == "actions":
+                self._apply_change(table_name, self._actions, obj, deleted)
+            elif table_name == "todos":
+                self._apply_todo_change(obj, deleted)
+
+    def _apply_change(
+        self,
+        table_name: str,
+        rows: list,
+        obj: Optional[BaseModel],
+        deleted: bool,
+    ):
+        """
+        Replaces a changed note or action in the window. Anything that
+        could change which rows belong in it has the table queried again.
+        """
+        if obj is None:
+            self._stale.add(table_name)
+            self._forget_rendered(table_name)
+            return
+        obj_id = getattr(obj, "id")
+        self._rendered.pop((table_name, obj_id), None)
+        if self._before is None:
+            return
+        inside = getattr(obj, "timestamp") < self._before
+        for i, row in enumerate(rows):
+            if row.id == obj_id:
+                if deleted or not inside:
+                    self._stale.add(table_name)
+                else:
+                    rows[i] = obj
+                return
+        if inside and not deleted:
+            # a new row, or an old one moved into the window
+            self._stale.add(table_name)
+
+    def _apply_todo_change(self, obj: Optional[BaseModel], deleted: bool):
+        # whether a todo is in the window depends on its note, so any
+        # change to one has the todos queried again
+        self._stale.add("todos")
+        if obj is None:
+            self._forget_rendered("todos")
+            # actions are rendered with the text of their todo
+            self._forget_rendered("actions")
+            return
+        todo_id = getattr(obj, "id")
+        self._rendered.pop(("todos", todo_id), None)
+        for action in self._actions:
+            if action.todo_id == todo_id:
+                self._rendered.pop(("actions", action.id), None)
+                # drop the todo loaded with the action
+                action._todo = None if deleted else obj
+
+    def _forget_rendered(self, table_name: str):
+        for key in [key for key in self._rendered if key[0] == table_name]:
+            del self._rendered[key]
+
+
+# shared by the processors of a process
+context_window = ContextWindow()
@@ -1,4 +1,4 @@
-from typing import List, Optional
+from typing import Any, Dict, List, Optional
 
 from openai.types.responses import FunctionToolParam, ToolParam
 
@@ -48,7 +48,24 @@ def create_action(
     return action
 
 
-def get_create_action_tool(todos: List[Todo]) -> ToolParam:
+def get_create_action_tool(
+    todos: Optional[List[Todo]] = None,
+) -> ToolParam:
+    """
+    Passing todos limits todo_id to their ids. The processor leaves them
+    out, so that the schema is the same for every note and can be cached
+    by the provider.
+    """
+    todo_id_param: Dict[str, Any] = {
+        "type": "integer",
+        "description": """ID of the todo associated with the action. 
+         - If specified, use this ID, but only if it appears in the list of todos. 
+         - If not specified but it appears this action affects a todo already on the list, try to find the todo based on the action text. 
+         - Do not get creative, the user should try to make it obvious if they are trying to match to a todo and they will log many actions that have nothing to do with their todo list.
+         - return a 0 if it appears the user is trying to match to a todo but it is not on the list.""",
+    }
+    if todos is not None:
+        todo_id_param["enum"] = [0] + [todo.id for todo in todos]
     return FunctionToolParam(
         type="function",
         name="create_action",
@@ -64,15 +81,7 @@ def get_create_action_tool(todos: List[Todo]) -> ToolParam:
                     "type": "string",
                     "description": f"Timestamp of the action. It should conform to the format {TIMESTAMP_FORMAT}. If specified, use the time given in the note. Use the current time if not specified. If the time specified is in the past, (I did this yesterday, I did that two hours ago, etc), use the timestamp from the note and extrapolate to get a best guess. Do not drop any digits, always show trailing zero's",
                 },
-                "todo_id": {
-                    "type": "integer",
-                    "description": """ID of the todo associated with the action. 
-                     - If specified, use this ID, but only if it appears in the list of todos. 
-                     - If not specified but it appears this action affects a todo already on the list, try to find the todo based on the action text. 
-                     - Do not get creative, the user should try to make it obvious if they are trying to match to a todo and they will log many actions that have nothing to do with their todo list.
-                     - return a 0 if it appears the user is trying to match to a todo but it is not on the list.""",
-                    "enum": [0] + [todo.id for todo in todos],
-                },
+                "todo_id": todo_id_param,
                 "mark_complete": {
                     "type": "boolean",
                     "description": "True if the action marks the todo as complete. This is only relevant if a todo_id is specified",
@@ -1,4 +1,4 @@
-from typing import List, Optional
+from typing import Any, Dict, List, Optional
 
 from openai.types.responses import FunctionToolParam
 
@@ -55,7 +55,26 @@ def create_todo(
     return todo
 
 
-def get_create_todo_tool(todos: List[Todo]) -> FunctionToolParam:
+def get_create_todo_tool(
+    todos: Optional[List[Todo]] = None,
+) -> FunctionToolParam:
+    """
+    Passing todos limits parent_id to their ids. The processor leaves them
+    out, so that the schema is the same for every note and can be cached
+    by the provider.
+    """
+    parent_id_param: Dict[str, Any] = {
+        "type": "integer",
+        "description": """ID of the parent todo. 
+         - This is relevant when the user mentions a task that is part of a larger task. 
+           - I need to do this in order to do that. 
+           - When I am doing this task I should also do that task. 
+         - The parent task is the one that depends on the child task, so for this param give the value of the task that depends on this newly created task. 
+         - If it seems like the user was trying to reference a task that was not listed, then return 0 and additional todos will be provided. 
+         - This is an optional field so return null if the user does not mention a parent task.""",
+    }
+    if todos is not None:
+        parent_id_param["enum"] = [0] + [todo.id for todo in todos]
     return FunctionToolParam(
         type="function",
         name="create_todo",
@@ -87,17 +106,7 @@ def get_create_todo_tool(todos: List[Todo]) -> FunctionToolParam:
                      - Do not guess a duration and add an end time when the user only states what time they want to start a task. 
                      - This is an optional field so return null unless the user specifies an end time.""",
                 },
-                "parent_id": {
-                    "type": "integer",
-                    "description": """ID of the parent todo. 
-                     - This is relevant when the user mentions a task that is part of a larger task. 
-                       - I need to do this in order to do that. 
-                       - When I am doing this task I should also do that task. 
-                     - The parent task is the one that depends on the child task, so for this param give the value of the task that depends on this newly created task. 
-                     - If it seems like the user was trying to reference a task that was not listed, then return 0 and additional todos will be provided. 
-                     - This is an optional field so return null if the user does not mention a parent task.""",
-                    "enum": [0] + [todo.id for todo in todos],
-                },
+                "parent_id": parent_id_param,
             },
             "required": [
                 "todo_text",
@@ -1,41 +1,74 @@
 import json
+import re
 from datetime import datetime, timedelta
-from typing import List, Optional, Tuple
+from typing import Any, Dict, List, Optional, Tuple
 
+from openai import OpenAI
 from openai.types.responses import FunctionToolParam, ToolParam
 
+from ..config import TODO_MATCH_MIN_COVERAGE, TODO_MATCH_MIN_MARGIN
 from ..logging import get_logger
-from ..db import ToolCall, Action, Todo
+from ..db import ToolCall, Action, Todo, todo_index
+from ..db.connection import get_connection
 from ..llm import get_light_client
 from ..rendering import strf_todo_light
 from ..util import NL
 
 logger = get_logger(__name__)
 
+find_todo_instructions = """You are a master notetaking assistant. Your assignment is to match a command, action or child task to a todo.
+
+For your context, you will be given the todos from the past month. Only use todo ids from the todos given."""
+
+# words in an action that say whether it finishes its todo or only starts
+# it. Only past forms finish it: "finish the report" is still to do.
+COMPLETION_WORDS = frozenset(["done", "finished", "completed"])
+START_WORDS = frozenset("""
+    start starts started starting begin begins began begun beginning
+    continue continues continued continuing
+    """.split())
+# "didn't finish" or "not done with" say the opposite, so a negation up to
+# NEGATION_WINDOW words before one of them leaves it to the LLM. So does
+# any word ending in n't.
+NEGATION_WORDS = frozenset(["not", "no", "never", "cannot", "nothing"])
+NEGATION_WINDOW = 4
+WORD = re.compile(r"[a-z']+")
+
 
 def find_todo(
     input_obj: ToolCall | Action | Todo,
     exclude_todo_id: Optional[int] = None,
     include_mark_complete: bool = True,
+    client: Optional[OpenAI] = None,
 ) -> Optional[Tuple[Todo, bool]]:
-    client = get_light_client()
+    client = client or get_light_client()
     one_month_ago = datetime.now() - timedelta(days=30)
     todos = Todo.get_all(after=one_month_ago)
     # filter out the todo with the exclude_todo_id
     if exclude_todo_id is not None:
         todos = [todo for todo in todos if todo.id != exclude_todo_id]
+    # most references are clear enough to find without the LLM
+    match = match_todo(input_obj, todos, include_mark_complete)
+    if match is not None:
+        return match
     tools: List[ToolParam] = [
-        get_find_todo_tool(todos, include_mark_complete)
+        get_find_todo_tool(include_mark_complete=include_mark_complete)
     ]
+    # the todos go after the instructions and tools, which stay the same
+    # from call to call, so the provider can cache them
     tool_response_json = client.responses.create(
         model="gpt-4.1",
-        instructions=f"""You are a master notetaking assistant. Your assignment is to match a command, action or child task to a todo.
-
-        For your context, here are the todos from the past month:
-
-        {NL.join(strf_todo_light(todo) for todo in todos)}""",
-        input=input_obj.model_dump_json(),
+        instructions=find_todo_instructions,
         tools=tools,
+        input=[  # type: ignore[arg-type]
+            {
+                "role": "developer",
+                "content": f"""here are the todos from the past month:
+
+{NL.join(strf_todo_light(todo) for todo in todos)}""",
+            },
+            {"role": "user", "content": input_obj.model_dump_json()},
+        ],
     )
     # get the first tool response
     if len(tool_response_json.output) == 0:
@@ -50,6 +83,11 @@ def find_todo(
     todo_id = args.get("todo_id")
     if todo_id is None:
         return None
+    if todo_id not in {todo.id for todo in todos}:
+        logger.warning(
+            "Todo with ID %s was not one of the todos given.", todo_id
+        )
+        return None
     todo = Todo.get_by_id(todo_id)
     if todo is None:
         logger.warning(
@@ -62,18 +100,99 @@ def find_todo(
     return todo, mark_complete
 
 
+def match_todo(
+    input_obj: ToolCall | Action | Todo,
+    todos: List[Todo],
+    include_mark_complete: bool = True,
+) -> Optional[Tuple[Todo, bool]]:
+    """
+    Looks the todo up in the todo index. Returns None unless the best
+    match is a clear one, leaving the LLM to decide.
+
+    Whether an action completes its todo is only settled here when the
+    action says so, that it finished it or that it is only starting on
+    it. Otherwise, as "need to call mom again" for "call mom" doesn't
+    complete it where "called mom" does, the LLM decides that too.
+    """
+    text = getattr(input_obj, "action_text", None) or getattr(
+        input_obj, "todo_text", None
+    )
+    if not text or not todos:
+        return None
+    with get_connection() as conn:
+        matches = todo_index.search(
+            conn.cursor(),
+            text,
+            todo_ids=[todo.id for todo in todos],
+            limit=2,
+        )
+    if not matches:
+        return None
+    best = matches[0]
+    if best.coverage < TODO_MATCH_MIN_COVERAGE or (
+        len(matches) > 1
+        and best.score < matches[1].score * TODO_MATCH_MIN_MARGIN
+    ):
+        logger.info(
+            f"No clear match for {text!r} in the todo index, asking the LLM"
+        )
+        return None
+    todo = next(todo for todo in todos if todo.id == best.todo_id)
+    mark_complete = False
+    if include_mark_complete:
+        mark_complete = says_complete(text)
+        if mark_complete is None:
+            logger.info(
+                f"Matched {text!r} to todo {todo.id}, asking the LLM whether it completes it"
+            )
+            return None
+    logger.info(
+        f"Matched {text!r} to todo {todo.id} in the todo index (coverage {best.coverage:.2f})"
+    )
+    return todo, mark_complete
+
+
+def says_complete(text: str) -> Optional[bool]:
+    """
+    True if the text says it finished its todo, False if it says it is only
+    starting on it, and None if it says neither, or if it negates what it
+    says.
+    """
+    words = WORD.findall(text.lower().replace("\u2019", "'"))
+    said = set()
+    for i, word in enumerate(words):
+        if word in START_WORDS:
+            said.add(False)
+        elif word in COMPLETION_WORDS:
+            said.add(True)
+        else:
+            continue
+        if any(
+            before in NEGATION_WORDS or before.endswith("n't")
+            for before in words[max(i - NEGATION_WINDOW, 0) : i]
+        ):
+            return None
+    if False in said:
+        return False
+    return True if said else None
+
+
 def get_find_todo_tool(
-    todos: List[Todo], include_mark_complete: bool = True
+    todos: Optional[List[Todo]] = None, include_mark_complete: bool = True
 ) -> ToolParam:
+    """
+    Passing todos limits todo_id to their ids. find_todo leaves them out,
+    so that the schema is the same for every call.
+    """
+    todo_id_param: Dict[str, Any] = {
+        "type": "integer",
+        "description": "The ID of the todo to match.",
+    }
+    if todos is not None:
+        todo_id_param["enum"] = [todo.id for todo in todos]
     params = {
         "type": "object",
-        "properties": {
-            "todo_id": {
-                "type": "integer",
-                "description": "The ID of the todo to match.",
-                "enum": [todo.id for todo in todos],
-            },
-        },
+        "properties": {"todo_id": todo_id_param},
         "required": ["todo_id"],
         "additionalProperties": False,
     }
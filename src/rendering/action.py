@@ -1,15 +1,14 @@
 from typing import List
-from datetime import datetime
 
 from termcolor import colored
 
-from ..db import Todo, Action
-from ..config import TIMESTAMP_FORMAT
+from ..db import Action
+from ..util import format_time
 
 
 def strf_action(action: Action) -> str:
     if action.todo_id:
-        todo = Todo.get_by_id(action.todo_id)
+        todo = action.todo
         if todo:
             action_text = f"{action.action_text} -> {todo.todo_text}"
         else:
@@ -18,16 +17,17 @@ def strf_action(action: Action) -> str:
             action_text = colored(action_text, "green")
     else:
         action_text = action.action_text
-    pretty_text = f"[{str(action.id).rjust(4, '0')}] {datetime.strftime(action.timestamp, TIMESTAMP_FORMAT)}\n\t{action_text}"
+    pretty_text = f"[{str(action.id).rjust(4, '0')}] {format_time(action.timestamp)}\n\t{action_text}"
     return pretty_text
 
 
 def strf_action_light(action: Action) -> str:
     action_str = f"{action.id} - {action.timestamp} - {action.action_text}"
-    if action.todo and action.mark_complete:
-        action_str += f" -> {action.todo.todo_text} (completed)"
-    elif action.todo:
-        action_str += f" -> {action.todo.todo_text}"
+    todo = action.todo
+    if todo and action.mark_complete:
+        action_str += f" -> {todo.todo_text} (completed)"
+    elif todo:
+        action_str += f" -> {todo.todo_text}"
     return action_str
 
 
@@ -48,6 +48,8 @@ def strf_notes(
     """
     if not notes:
         return "No notes found"
+    # strf_note lists the objects created from each note
+    Note.load_related(notes, children=True)
     pretty_notes = ""
     for note in notes:
         pretty_text = strf_note(note, show_processed_text)
@@ -80,4 +82,6 @@ def json_note_light(note: Note) -> dict:
     # find the related objects
     note_json["num_todos"] = note.num_todos
     note_json["num_actions"] = note.num_actions
+    if note.snippet is not None:
+        note_json["snippet"] = note.snippet
     return note_json
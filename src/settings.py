@@ -1,16 +1,51 @@
 # user configured settings will be stored in a SQLite database
 import os
 import sqlite3
+import threading
+
+
+# each thread keeps its own settings connection, and a cache of the values
+# it has read through it
+_local = threading.local()
+_MISSING = object()
 
 
 def get_settings_connection():
     """
-    Establishes a connection to the SQLite database for configuration.
+    Returns the calling thread's connection to the configuration database,
+    opening it on first use.
     """
-    connection = sqlite3.connect(os.path.join("data", "config.db"))
+    connection = getattr(_local, "connection", None)
+    if connection is None:
+        connection = sqlite3.connect(os.path.join("data", "config.db"))
+        _local.connection = connection
+        _local.cache = {}
+        _local.data_version = None
     return connection
 
 
+def _get_cache() -> dict:
+    """
+    Returns the calling thread's settings cache. The cache is dropped when
+    PRAGMA data_version shows that another connection, in this process or
+    any other, has committed to the settings database since it was filled.
+    """
+    connection = get_settings_connection()
+    data_version = connection.execute("PRAGMA data_version").fetchone()[0]
+    if data_version != _local.data_version:
+        _local.cache = {}
+        _local.data_version = data_version
+    return _local.cache
+
+
+def clear_settings_cache():
+    """
+    Drops the calling thread's cached settings.
+    """
+    _local.cache = {}
+    _local.data_version = None
+
+
 def init_settings_db():
     """
     Initializes the settings database with a table for configuration values.
@@ -27,7 +62,7 @@ def init_settings_db():
         """
     )
     connection.commit()
-    connection.close()
+    clear_settings_cache()
     # ensure the notebook setting is initialized
     notebook = get_setting("notebook")
     if notebook is None:
@@ -38,12 +73,17 @@ def get_setting(key: str):
     """
     Retrieves a setting value by its key.
     """
+    cache = _get_cache()
+    value = cache.get(key, _MISSING)
+    if value is not _MISSING:
+        return value
     connection = get_settings_connection()
     cursor = connection.cursor()
     cursor.execute("SELECT value FROM settings WHERE key = ?", (key,))
     result = cursor.fetchone()
-    connection.close()
-    return result[0] if result else None
+    value = result[0] if result else None
+    cache[key] = value
+    return value
 
 
 def write_setting(key: str, value: str):
@@ -57,4 +97,6 @@ def write_setting(key: str, value: str):
         (key, value),
     )
     connection.commit()
-    connection.close()
+    # our own commits don't change data_version on this connection, so the
+    # cache has to be updated by hand
+    _get_cache()[key] = value
@@ -4,6 +4,7 @@ from flask import Flask, jsonify, render_template, request, Blueprint
 from ..logging import get_logger
 from ..settings import get_setting, write_setting
 from ..db import init_db
+from ..db.connection import connection_manager
 from .api import api_bp
 
 logger = get_logger(__name__)
@@ -22,5 +23,30 @@ def index():
 rest_server.register_blueprint(api_bp)
 
 
+@rest_server.before_request
+def reset_connection_stats():
+    connection_manager.reset_stats()
+
+
+@rest_server.after_request
+def report_connection_stats(response):
+    """
+    Reports how many connections and statements the request needed.
+    """
+    stats = connection_manager.stats
+    response.headers["X-DB-Connections-Opened"] = str(
+        stats.connections_opened
+    )
+    response.headers["X-DB-Connections-Reused"] = str(
+        stats.connections_reused
+    )
+    response.headers["X-DB-Queries"] = str(stats.queries)
+    logger.debug(
+        f"{request.method} {request.path}: {stats.connections_opened} connections opened, "
+        f"{stats.connections_reused} reused, {stats.queries} queries"
+    )
+    return response
+
+
 if __name__ == "__main__":
     rest_server.run(debug=True)
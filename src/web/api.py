@@ -6,6 +6,7 @@ from .routes import (
     curiosities_bp,
     notebooks_bp,
     summaries_bp,
+    export_bp,
 )
 
 
@@ -16,3 +17,4 @@ api_bp.register_blueprint(actions_bp, url_prefix="/actions")
 api_bp.register_blueprint(curiosities_bp, url_prefix="/curiosities")
 api_bp.register_blueprint(notebooks_bp, url_prefix="/notebooks")
 api_bp.register_blueprint(summaries_bp, url_prefix="/summaries")
+api_bp.register_blueprint(export_bp, url_prefix="/export")
@@ -4,3 +4,4 @@ from .curiosities import curiosities_bp
 from .notes import notes_bp
 from .notebooks import notebooks_bp
 from .summaries import summaries_bp
+from .export import export_bp
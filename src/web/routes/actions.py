@@ -1,38 +1,56 @@
+from functools import partial
+
 from flask import request, jsonify, Blueprint
 
+from ...errors import InvalidCursorError
 from ...logging import get_logger
 from ...db import Action
 from ...rendering import json_action
+from ..streaming import stream_page
 
 
 actions_bp = Blueprint("actions", __name__)
 logger = get_logger(__name__)
 
 
+def serialize_action(action: Action) -> dict:
+    action_json = action.model_dump()
+    if action.snippet is not None:
+        action_json["snippet"] = action.snippet
+    # add the affected todo, where applicable
+    todo = action.todo
+    if todo:
+        action_json["todo"] = todo.model_dump()
+    return action_json
+
+
 @actions_bp.get("/")
 def handle_actions():
     before = request.args.get("endTime")
     after = request.args.get("startTime")
     search = request.args.get("search")
     limit = request.args.get("limit", default=25, type=int)
+    cursor = request.args.get("cursor")
     applied_to_todo = request.args.get("appliedToTodo")
     if applied_to_todo is not None:
         applied_to_todo = applied_to_todo.lower() == "true"
     try:
-        actions = Action.get_all(
-            before=before,
-            after=after,
-            search=search,
-            limit=limit,
-            applied_to_todo=applied_to_todo,
+        return stream_page(
+            "actions",
+            partial(
+                Action.get_all,
+                before=before,
+                after=after,
+                search=search,
+                applied_to_todo=applied_to_todo,
+                include_todo=True,
+            ),
+            serialize_action,
+            limit,
+            cursor,
         )
-        actions.reverse()
-        actions_json = [action.model_dump() for action in actions]
-        # add the affected todos, where applicable
-        for action, action_dict in zip(actions, actions_json):
-            if action.todo:
-                action_dict["todo"] = action.todo.model_dump()
-        return jsonify({"actions": actions_json})
+    except InvalidCursorError as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
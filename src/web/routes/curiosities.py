@@ -1,32 +1,48 @@
+from functools import partial
+
 from flask import request, jsonify, Blueprint
 
+from ...errors import InvalidCursorError
 from ...logging import get_logger
 from ...db import Curiosity
 from ...rendering import json_curiosity
+from ..streaming import stream_page
 
 
 curiosities_bp = Blueprint("curiosities", __name__)
 logger = get_logger(__name__)
 
 
+def serialize_curiosity(curiosity: Curiosity) -> dict:
+    curiosity_json = curiosity.model_dump()
+    curiosity_json["note"] = curiosity.source_note.model_dump()
+    if curiosity.snippet is not None:
+        curiosity_json["snippet"] = curiosity.snippet
+    return curiosity_json
+
+
 @curiosities_bp.get("/")
 def handle_curiosities():
     before = request.args.get("endTime")
     after = request.args.get("startTime")
     search = request.args.get("search")
     limit = request.args.get("limit", default=25, type=int)
+    cursor = request.args.get("cursor")
     try:
-        curiosities = Curiosity.get_all(
-            before=before, after=after, search=search, limit=limit
+        return stream_page(
+            "curiosities",
+            partial(
+                Curiosity.get_all,
+                before=before,
+                after=after,
+                search=search,
+            ),
+            serialize_curiosity,
+            limit,
+            cursor,
         )
-        curiosity_jsons = [
-            curiosity.model_dump() for curiosity in curiosities
-        ]
-        for curiosity_json, curiosity in zip(curiosity_jsons, curiosities):
-            curiosity_json["note"] = curiosity.source_note.model_dump()
-        logger.info(f"Fetched {len(curiosity_jsons)} curiosities")
-        curiosity_jsons.reverse()  # Match CLI behavior
-        return jsonify({"curiosities": curiosity_jsons})
+    except InvalidCursorError as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
         logger.error(f"Error fetching curiosities: {e}")
         return jsonify({"error": str(e)}), 500
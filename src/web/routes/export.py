@@ -0,0 +1,40 @@
+from flask import (
+    Response,
+    request,
+    jsonify,
+    Blueprint,
+    stream_with_context,
+)
+
+from ...db import EXPORT_FORMATS, iter_export
+from ...errors import ExportError, ExportUnavailableError
+from ...logging import get_logger
+
+export_bp = Blueprint("export", __name__)
+logger = get_logger(__name__)
+
+
+@export_bp.get("/<table>")
+def handle_export(table):
+    """
+    Streams a whole table as a download, a chunk of rows at a time.
+    """
+    format = request.args.get("format", "csv")
+    compress = request.args.get("gzip", "false").lower() == "true"
+    try:
+        chunks = iter_export(table, format, compress=compress)
+    except ExportUnavailableError as e:
+        # a valid request this server can't serve
+        return jsonify({"error": str(e)}), 501
+    except ExportError as e:
+        return jsonify({"error": str(e)}), 400
+    filename = f"{table}.{format}" + (".gz" if compress else "")
+    return Response(
+        stream_with_context(chunks),
+        mimetype=(
+            "application/gzip" if compress else EXPORT_FORMATS[format]
+        ),
+        headers={
+            "Content-Disposition": f"attachment; filename={filename}"
+        },
+    )
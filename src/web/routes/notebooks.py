@@ -2,6 +2,7 @@ import os
 from flask import request, jsonify, Blueprint
 
 from ...db import init_db
+from ...db.connection import connection_manager
 
 from ...settings import get_setting, write_setting
 
@@ -39,6 +40,7 @@ def create_notebook():
     if os.path.exists(notebook_path):
         return jsonify({"error": "Notebook already exists"}), 400
     write_setting("notebook", new_notebook)
+    connection_manager.invalidate()
     init_db()
     return jsonify({"notebook": new_notebook}), 201
 
@@ -64,6 +66,7 @@ def set_notebook():
     if not new_notebook:
         return jsonify({"error": "Notebook name is required"}), 400
     write_setting("notebook", new_notebook)
+    connection_manager.invalidate()
     # see if the notebook is new
     if not os.path.exists(
         os.path.join("data", "notebooks", f"{new_notebook}.db")
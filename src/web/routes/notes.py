@@ -1,9 +1,14 @@
+from functools import partial
+
 from flask import request, jsonify, Blueprint
 
+from ...errors import InvalidCursorError
 from ...logging import get_logger
+from ...notify import notify_note_created
 from ...db import Note
 from ...util import parse_time
 from ...rendering import json_note, json_note_light
+from ..streaming import stream_page
 
 
 notes_bp = Blueprint("notes", __name__)
@@ -28,6 +33,7 @@ def create_note():
         return jsonify({"error": "No note provided"}), 400
 
     note = Note.create(note_text)
+    notify_note_created([note.id])
     return jsonify(note.model_dump()), 201
 
 
@@ -40,13 +46,23 @@ def handle_notes():
     after = parse_time(after_str) if after_str else None
     search = request.args.get("search")
     limit = request.args.get("limit", default=25, type=int)
+    cursor = request.args.get("cursor")
     try:
-        notes = Note.get_all(
-            before=before, after=after, search=search, limit=limit
+        return stream_page(
+            "notes",
+            partial(
+                Note.get_all,
+                before=before,
+                after=after,
+                search=search,
+                with_counts=True,
+            ),
+            json_note_light,
+            limit,
+            cursor,
         )
-        notes.reverse()  # Match CLI behavior
-        notes_json = [json_note_light(note) for note in notes]
-        return jsonify({"notes": notes_json})
+    except InvalidCursorError as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
         logger.error(f"Error fetching notes: {e}")
         return jsonify({"error": str(e)}), 500
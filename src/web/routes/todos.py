@@ -1,14 +1,25 @@
+from functools import partial
+
 from flask import request, jsonify, Blueprint
 
+from ...errors import InvalidCursorError
 from ...logging import get_logger
 from ...db import Todo
 from ...rendering import json_todo
+from ..streaming import stream_page
 
 
 todos_bp = Blueprint("todos", __name__)
 logger = get_logger(__name__)
 
 
+def serialize_todo(todo: Todo) -> dict:
+    todo_json = todo.model_dump()
+    if todo.snippet is not None:
+        todo_json["snippet"] = todo.snippet
+    return todo_json
+
+
 @todos_bp.get("/")
 def handle_todos():
     before = request.args.get("endTime", type=str)
@@ -18,18 +29,26 @@ def handle_todos():
     show_complete = request.args.get("completed") == "true"
     show_cancelled = request.args.get("cancelled") == "true"
     show_active = request.args.get("active") == "true"
+    cursor = request.args.get("cursor")
 
     try:
-        todos = Todo.get_all(
-            before=before,
-            after=after,
-            limit=limit,
-            complete=show_complete,
-            cancelled=show_cancelled,
-            active=show_active,
-            search=search,
+        return stream_page(
+            "todos",
+            partial(
+                Todo.get_all,
+                before=before,
+                after=after,
+                complete=show_complete,
+                cancelled=show_cancelled,
+                active=show_active,
+                search=search,
+            ),
+            serialize_todo,
+            limit,
+            cursor,
         )
-        return jsonify({"todos": [todo.model_dump() for todo in todos]})
+    except InvalidCursorError as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
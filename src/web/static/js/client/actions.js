@@ -27,7 +27,10 @@ export async function getActions(filterValues) {
   } else {
     console.log("Fetched actions:", data);
   }
-  return data.actions;
+  const actions = data.actions || [];
+  // the API sends the newest first; shown oldest first, unless searched
+  if (!search) actions.reverse();
+  return actions;
 }
 
 export async function getActionById(todoId) {
@@ -15,7 +15,10 @@ export async function getCuriosities(filterValues) {
   } else {
     console.log("Fetched curiosities:", data);
   }
-  return data.curiosities || [];
+  const curiosities = data.curiosities || [];
+  // the API sends the newest first; shown oldest first, unless searched
+  if (!search) curiosities.reverse();
+  return curiosities;
 }
 
 export async function getCuriosityById(curiosityId) {
@@ -15,7 +15,10 @@ export async function getNotes(filterValues) {
   } else {
     console.log("Fetched notes:", data);
   }
-  return data.notes || [];
+  const notes = data.notes || [];
+  // the API sends the newest first; shown oldest first, unless searched
+  if (!search) notes.reverse();
+  return notes;
 }
 
 export async function getNoteById(noteId) {
@@ -0,0 +1,97 @@
+"""
+Streams the JSON of the list routes, a chunk of rows at a time.
+
+A list response is {"<key>": [...], "next_cursor": ...}, as it always was,
+but rather than building every object of the page and handing the lot to
+jsonify, the page is read with the models' get_all LIST_STREAM_CHUNK rows
+at a time, each chunk continuing from the cursor of the one before, and
+every item is written out as soon as its chunk has been read. A client
+can ask for 100000 actions without the server holding more than a chunk
+of them.
+
+Items are written in the order the cursor walks them: newest first, or
+best first for a search. Nothing is held back to be reordered, so a page
+that should read oldest first, as the CLI shows them, is reversed by the
+client.
+
+By the time a later chunk is read, the 200 status has gone out, so a
+failure can't become an error response. It is logged, and the JSON is
+ended with an "error" key next to next_cursor, which then points at the
+first item that wasn't written, for the client to retry from.
+"""
+
+from functools import partial
+from typing import Callable, Iterator, Optional
+
+from flask import Response, current_app, stream_with_context
+
+from ..config import LIST_STREAM_CHUNK
+from ..db.pagination import Page
+from ..logging import get_logger
+
+logger = get_logger(__name__)
+
+
+def iter_json_page(
+    key: str,
+    get_page: Callable[..., Page],
+    serialize: Callable[[object], dict],
+    page: Page,
+    limit: int,
+    cursor: Optional[str] = None,
+) -> Iterator[str]:
+    """
+    Yields the JSON of a list response, starting from its first chunk,
+    read from cursor, and reading the rest as it goes.
+    """
+    # compact, as jsonify is outside debug mode
+    dumps = partial(current_app.json.dumps, separators=(",", ":"))
+    yield f'{{"{key}":['
+    separator = ""
+    remaining = limit
+    # where the items that haven't been written yet start
+    resume = cursor
+    error = None
+    try:
+        while True:
+            items = [dumps(serialize(item)) for item in page]
+            remaining -= len(page)
+            if items:
+                yield separator + ",".join(items)
+                separator = ","
+            resume = page.next_cursor
+            if page.next_cursor is None or remaining <= 0:
+                break
+            page = get_page(
+                limit=min(remaining, LIST_STREAM_CHUNK),
+                cursor=page.next_cursor,
+            )
+    except Exception as e:
+        logger.exception(f"Failed to stream {key} after {resume!r}")
+        error = str(e)
+    ending = f'],"next_cursor":{dumps(resume)}'
+    if error is not None:
+        ending += f',"error":{dumps(error)}'
+    yield ending + "}"
+
+
+def stream_page(
+    key: str,
+    get_page: Callable[..., Page],
+    serialize: Callable[[object], dict],
+    limit: int,
+    cursor: Optional[str] = None,
+) -> Response:
+    """
+    Returns a streamed list response of up to limit items. get_page takes
+    the limit and cursor of a chunk, like the models' get_all. The first
+    chunk is read straight away, so that a bad cursor or query is
+    reported before the response starts.
+    """
+    page = get_page(limit=min(limit, LIST_STREAM_CHUNK), cursor=cursor)
+    return Response(
+        stream_with_context(
+            iter_json_page(key, get_page, serialize, page, limit, cursor)
+        ),
+        mimetype="application/json",
+    )
@@ -2,7 +2,7 @@ import pytest
 import sqlite3
 from unittest.mock import patch
 
-from src import db
+from src import db, init_settings_db
 
 
 @pytest.fixture(scope="session")
@@ -22,6 +22,7 @@ def mock_sqlite3_connect():
 @pytest.fixture(scope="session")
 def setup_database(mock_sqlite3_connect):
     # SETUP: ensure tables are created
+    init_settings_db()
     db.init_db()
 
 
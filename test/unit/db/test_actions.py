@@ -129,3 +129,22 @@ def test_action_delete(test_action):
     # make sure the todo is marked incomplete
     todo.refresh()
     assert not todo.complete
+
+
+def test_get_all_include_todo(test_action):
+    note, action = test_action
+    todo = db.Todo.create("Test todo", source_note_id=note.id)
+    action.todo_id = todo.id
+    action.save()
+    actions = db.Action.get_all(include_todo=True, search="Test action")
+    joined = next(a for a in actions if a.id == action.id)
+    # the todo was hydrated by the join, not fetched lazily
+    assert joined._todo is not None
+    assert joined.todo.id == todo.id
+    assert joined.todo.todo_text == "Test todo"
+    # actions without a todo come back without one
+    assert all(a.todo is None for a in actions if a.todo_id is None)
+    # reassigning the todo drops the cached one
+    other_todo = db.Todo.create("Other todo", source_note_id=note.id)
+    joined.todo_id = other_todo.id
+    assert joined.todo.todo_text == "Other todo"
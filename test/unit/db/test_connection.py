@@ -0,0 +1,78 @@
+import sqlite3
+import threading
+
+import pytest
+
+from src.db.connection import ConnectionManager, get_pragma_profile
+
+# grabbed at import time, before the session fixtures patch sqlite3.connect
+real_connect = sqlite3.connect
+
+
+@pytest.fixture
+def db_path(tmp_path, monkeypatch):
+    monkeypatch.setattr(sqlite3, "connect", real_connect)
+    return str(tmp_path / "notebook.db")
+
+
+def test_connection_reused_per_thread(db_path):
+    manager = ConnectionManager(get_pragma_profile("wal"))
+    first = manager.connect(db_path)
+    assert manager.connect(db_path) is first
+    assert manager.stats.connections_opened == 1
+    assert manager.stats.connections_reused == 1
+    # other threads get their own connection
+    other = []
+    thread = threading.Thread(
+        target=lambda: other.append(manager.connect(db_path))
+    )
+    thread.start()
+    thread.join()
+    assert other[0] is not first
+    manager.close()
+
+
+def test_invalidate_reopens(db_path):
+    manager = ConnectionManager(get_pragma_profile("wal"))
+    first = manager.connect(db_path)
+    manager.invalidate()
+    second = manager.connect(db_path)
+    assert second is not first
+    with pytest.raises(sqlite3.ProgrammingError):
+        first.execute("SELECT 1")
+    manager.close()
+
+
+def test_query_stats(db_path):
+    manager = ConnectionManager(get_pragma_profile("wal"))
+    conn = manager.connect(db_path)
+    manager.reset_stats()
+    conn.execute("SELECT 1")
+    conn.execute("SELECT 2")
+    assert manager.stats.queries == 2
+    previous = manager.reset_stats()
+    assert previous.queries == 2
+    assert manager.stats.queries == 0
+    manager.close()
+
+
+def test_wal_profile_applied(db_path):
+    manager = ConnectionManager(get_pragma_profile("wal"))
+    conn = manager.connect(db_path)
+    assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+    # 1 is NORMAL
+    assert conn.execute("PRAGMA synchronous").fetchone()[0] == 1
+    assert conn.execute("PRAGMA busy_timeout").fetchone()[0] > 0
+    manager.close()
+
+
+def test_overrides_take_precedence(db_path):
+    manager = ConnectionManager(get_pragma_profile("wal"))
+    conn = manager.connect(db_path, lambda: {"journal_mode": "delete"})
+    assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "delete"
+    manager.close()
+
+
+def test_unknown_profile():
+    with pytest.raises(ValueError):
+        get_pragma_profile("nonsense")
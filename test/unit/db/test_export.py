@@ -0,0 +1,80 @@
+import csv
+import gzip
+import io
+import json
+import sys
+
+import pytest
+
+from src import db
+from src.db.export import iter_export
+from src.errors import ExportError, ExportUnavailableError
+
+
+def create_notes(count):
+    return db.Note.bulk_create(
+        [
+            (f"2025-04-05 10:{i:02d}:00", f'note, with "quotes" {i}')
+            for i in range(count)
+        ]
+    )
+
+
+def test_export_csv_in_chunks(refresh_database):
+    ids = create_notes(7)
+    chunks = list(
+        iter_export("notes", columns=["id", "note_text"], chunk_size=3)
+    )
+    # a chunk for every three notes, the first with the header
+    assert len(chunks) == 3
+    rows = list(csv.reader(io.StringIO(b"".join(chunks).decode())))
+    assert rows[0] == ["id", "note_text"]
+    assert rows[1:] == [
+        [str(id), f'note, with "quotes" {i}'] for i, id in enumerate(ids)
+    ]
+
+
+def test_export_jsonl_gzipped(refresh_database, tmp_path):
+    note = db.Note.create("lots to do", timestamp="2025-04-05 10:00:00")
+    todo = db.Todo.create(todo_text="buy milk", source_note_id=note.id)
+    path = str(tmp_path / "todos.jsonl.gz")
+    db.export_table("todos", path, format="jsonl", compress=True)
+    with gzip.open(path, "rt") as f:
+        rows = [json.loads(line) for line in f]
+    assert [(row["id"], row["todo_text"]) for row in rows] == [
+        (todo.id, "buy milk")
+    ]
+
+
+def test_export_empty_table(refresh_database):
+    assert b"".join(iter_export("curiosities")) == (
+        b"id,curiosity_text,source_note_id\r\n"
+    )
+    assert b"".join(iter_export("curiosities", "jsonl")) == b""
+
+
+def test_export_errors(refresh_database):
+    with pytest.raises(ExportError):
+        iter_export("settings")
+    with pytest.raises(ExportError):
+        iter_export("notes", "xml")
+    with pytest.raises(ExportError):
+        iter_export("notes", columns=["id", "id FROM notes; --"])
+
+
+def test_export_parquet(refresh_database):
+    pq = pytest.importorskip("pyarrow.parquet")
+    ids = create_notes(5)
+    data = b"".join(iter_export("notes", "parquet", chunk_size=2))
+    table = pq.read_table(io.BytesIO(data))
+    assert table.column("id").to_pylist() == ids
+    assert (
+        table.column("timestamp").to_pylist()[0] == "2025-04-05 10:00:00"
+    )
+
+
+def test_export_parquet_without_pyarrow(refresh_database, monkeypatch):
+    # None in sys.modules makes the import fail
+    monkeypatch.setitem(sys.modules, "pyarrow", None)
+    with pytest.raises(ExportUnavailableError, match="pyarrow"):
+        iter_export("notes", "parquet")
@@ -0,0 +1,140 @@
+from src import db
+from src.db import fts
+from src.db.fts import format_snippet, get_match_query
+
+
+def test_get_match_query():
+    assert get_match_query("buy milk") == '"buy" AND "milk"'
+    assert get_match_query('"buy milk" today') == '"buy milk" AND "today"'
+    assert get_match_query("groc*") == '"groc"*'
+    # FTS5 syntax is searched for, not interpreted
+    assert get_match_query("NOT milk)") == '"NOT" AND "milk"'
+    assert get_match_query(' " ') is None
+
+
+def test_format_snippet():
+    assert (
+        format_snippet("a <b> \x02milk\x03")
+        == "a &lt;b&gt; <mark>milk</mark>"
+    )
+    assert format_snippet(None) is None
+
+
+def test_search_notes(refresh_database):
+    db.Note.create(
+        "went running in the park", timestamp="2025-04-05 10:00:00"
+    )
+    best = db.Note.create(
+        "ran to the store for milk, then more milk",
+        timestamp="2025-04-05 11:00:00",
+    )
+    other = db.Note.create(
+        "milk and eggs and bread and butter and jam",
+        timestamp="2025-04-05 12:00:00",
+    )
+    notes = db.Note.get_all(search="milk")
+    assert [note.id for note in notes] == [best.id, other.id]
+    assert "<mark>milk</mark>" in notes[0].snippet
+    # stemmed, so "runs" finds "running"
+    assert len(db.Note.get_all(search="runs")) == 1
+    assert len(db.Note.get_all(search="ru*")) == 1
+    assert db.Note.get_all(search='"then milk"') == []
+    assert db.Note.get_all()[0].snippet is None
+
+
+def test_search_follows_changes(refresh_database):
+    note = db.Note.create("call the bank")
+    note.note_text = "call the plumber"
+    note.save()
+    assert db.Note.get_all(search="bank") == []
+    assert [n.id for n in db.Note.get_all(search="plumber")] == [note.id]
+    todo = db.Todo.create(
+        todo_text="call the bank", source_note_id=note.id
+    )
+    todo.delete()
+    assert db.Todo.get_all(search="bank") == []
+
+
+def test_search_todos(refresh_database):
+    note = db.Note.create("errands for saturday")
+    todo = db.Todo.create(todo_text="buy milk", source_note_id=note.id)
+    other = db.Todo.create(
+        todo_text="wash the car", source_note_id=note.id
+    )
+    todos = db.Todo.get_all(search="milk")
+    assert [t.id for t in todos] == [todo.id]
+    assert todos[0].snippet == "buy <mark>milk</mark>"
+    # todos are found by their note too, after those matching themselves
+    todos = db.Todo.get_all(search="saturday")
+    assert {t.id for t in todos} == {todo.id, other.id}
+    assert "<mark>saturday</mark>" in todos[0].snippet
+    todo.todo_text = "buy milk on saturday"
+    todo.save()
+    todos = db.Todo.get_all(search="saturday")
+    assert [t.id for t in todos] == [todo.id, other.id]
+
+
+def test_search_actions_and_curiosities(refresh_database):
+    note = db.Note.create("walked the dog")
+    action = db.Action.create(
+        action_text="walked the dog",
+        timestamp="2025-04-05 10:00:00",
+        source_note_id=note.id,
+    )
+    db.Action.create(
+        action_text="fed the cat",
+        timestamp="2025-04-05 10:00:00",
+        source_note_id=note.id,
+    )
+    actions = db.Action.get_all(search="walking", include_todo=True)
+    assert [a.id for a in actions] == [action.id]
+    assert actions[0].snippet == "<mark>walked</mark> the dog"
+    curiosity = db.Curiosity.create(
+        curiosity_text="why do dogs like walks?", source_note_id=note.id
+    )
+    curiosities = db.Curiosity.get_all(search="dog")
+    assert [c.id for c in curiosities] == [curiosity.id]
+    assert "<mark>dogs</mark>" in curiosities[0].snippet
+
+
+def test_only_recent_matches_are_ranked(refresh_database, monkeypatch):
+    monkeypatch.setattr(fts, "RANK_WINDOW", 2)
+    old = db.Note.create("milk milk milk", timestamp="2025-04-05 10:00:00")
+    newer = [
+        db.Note.create(
+            f"milk and {i} other things to buy",
+            timestamp="2025-04-05 11:00:00",
+        )
+        for i in range(2)
+    ]
+    notes = db.Note.get_all(search="milk")
+    # the older match comes after the ranked ones, however well it ranks
+    assert {note.id for note in notes[:2]} == {note.id for note in newer}
+    assert [note.id for note in notes[2:]] == [old.id]
+    # the window only counts notes passing the other filters
+    notes = db.Note.get_all(search="milk", before="2025-04-05 10:30:00")
+    assert [note.id for note in notes] == [old.id]
+
+
+def test_paging_past_the_rank_window(refresh_database, monkeypatch):
+    monkeypatch.setattr(fts, "RANK_WINDOW", 3)
+    notes = [
+        db.Note.create(f"milk {i}", timestamp=f"2020-04-05 10:0{i}:00")
+        for i in range(8)
+    ]
+    db.Note.create("bread", timestamp="2020-04-05 11:00:00")
+    seen = []
+    page = db.Note.get_all(search="milk", limit=2)
+    while True:
+        seen.extend(note.id for note in page)
+        if page.next_cursor is None:
+            break
+        page = db.Note.get_all(
+            search="milk", limit=2, cursor=page.next_cursor
+        )
+    # every match once: the ranked window, then the rest newest first
+    assert sorted(seen[:3]) == [note.id for note in notes[5:]]
+    assert seen[3:] == [note.id for note in reversed(notes[:5])]
+    # as does an offset past the window
+    page = db.Note.get_all(search="milk", offset=4, limit=2)
+    assert [note.id for note in page] == [notes[3].id, notes[2].id]
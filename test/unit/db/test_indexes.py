@@ -0,0 +1,96 @@
+import re
+
+from src import db
+from src.db import todo_index
+from src.db.connection import connection_manager, get_connection
+
+TABLES = {
+    "notes",
+    "actions",
+    "todos",
+    "todo_terms",
+    "todo_term_stats",
+    "tool_calls",
+    "curiosities",
+}
+SCAN = re.compile(r"SCAN (\w+)")
+
+
+def full_scans(statement):
+    """
+    Returns the EXPLAIN QUERY PLAN lines that read a whole table. Scans of
+    the FTS5 matches of a search only read the matches.
+    """
+    cursor = get_connection().cursor()
+    cursor.execute(f"EXPLAIN QUERY PLAN {statement}")
+    details = [row[3] for row in cursor.fetchall()]
+    return [
+        detail
+        for detail in details
+        if (scan := SCAN.match(detail))
+        and scan[1] in TABLES
+        and "INDEX" not in detail
+    ]
+
+
+def capture(call):
+    """
+    The reads and updates call sends to SQLite, with their parameters
+    filled in.
+    """
+    with connection_manager.capture_statements() as statements:
+        call()
+    return [
+        statement
+        for statement in statements
+        if statement.lstrip()
+        .upper()
+        .startswith(("SELECT", "WITH", "UPDATE"))
+    ]
+
+
+def test_hot_queries_use_indexes(refresh_database):
+    notes = [
+        db.Note.create(
+            f"walked the dog {i}", timestamp=f"2023-04-12 0{i}:00:00"
+        )
+        for i in range(3)
+    ]
+    todo = db.Todo.create(
+        todo_text="walk the dog", source_note_id=notes[0].id
+    )
+    db.Action.create(
+        action_text="walked the dog",
+        source_note_id=notes[1].id,
+        todo_id=todo.id,
+        timestamp="2023-04-12 01:00:00",
+    )
+    db.Curiosity.create(
+        curiosity_text="why do dogs like walks?",
+        source_note_id=notes[2].id,
+    )
+    first_page = db.Note.get_all(limit=1)
+    # the lookups the engine, the routes and the renderers run for every
+    # note, as the models send them
+    calls = {
+        "claim": lambda: db.Note.claim("test"),
+        "notes": lambda: db.Note.get_all(
+            limit=1, cursor=first_page.next_cursor, with_counts=True
+        ),
+        "note search": lambda: db.Note.get_all(search="dog"),
+        "todos": lambda: db.Todo.get_all(),
+        "todo search": lambda: db.Todo.get_all(search="dog"),
+        "actions": lambda: db.Action.get_all(include_todo=True),
+        "action search": lambda: db.Action.get_all(search="dog"),
+        "curiosity search": lambda: db.Curiosity.get_all(search="dog"),
+        "todo actions": lambda: todo.actions,
+        "todo children": lambda: todo.children,
+        "todo index": lambda: todo_index.search(
+            get_connection().cursor(), "walking the dog again"
+        ),
+    }
+    for name, call in calls.items():
+        statements = capture(call)
+        assert statements, name
+        for statement in statements:
+            assert full_scans(statement) == [], (name, statement)
@@ -1,9 +1,11 @@
 import pytest
 from datetime import datetime
 import logging
+import sqlite3
 from pprint import pformat
 
 from src import db, config, bulk_upload_notes_list, utils
+from src.db.connection import connection_manager, get_connection
 from sample.a_days_notes import notes as sample_note_list
 
 logger = logging.getLogger(__name__)
@@ -100,3 +102,156 @@ def test_unprocessed_note_search(sample_notes):
     assert second_unprocessed_note.processed_note_text == ""
     assert second_unprocessed_note.note_text is not None
     assert second_unprocessed_note.id != first_unprocessed_note.id
+
+
+def test_load_related(setup_database):
+    busy_note = db.Note.create(
+        "Did the dishes and need to take out the trash",
+        timestamp="2023-04-13 08:00:00",
+    )
+    quiet_note = db.Note.create(
+        "Nothing happened", timestamp="2023-04-13 08:05:00"
+    )
+    db.Action.create(
+        "Did the dishes",
+        timestamp=busy_note.timestamp,
+        source_note_id=busy_note.id,
+    )
+    db.Todo.create("Take out the trash", source_note_id=busy_note.id)
+    # counts only
+    notes = db.Note.get_all(
+        after="2023-04-13 07:00:00",
+        before="2023-04-13 09:00:00",
+        with_counts=True,
+    )
+    counts = {
+        note.id: (note.num_actions, note.num_todos) for note in notes
+    }
+    assert counts[busy_note.id] == (1, 1)
+    assert counts[quiet_note.id] == (0, 0)
+    # children
+    db.Note.load_related(notes, children=True)
+    loaded = {note.id: note for note in notes}
+    assert [a.action_text for a in loaded[busy_note.id].actions] == [
+        "Did the dishes"
+    ]
+    assert [t.todo_text for t in loaded[busy_note.id].todos] == [
+        "Take out the trash"
+    ]
+    assert loaded[quiet_note.id].actions == []
+    assert loaded[quiet_note.id].curiosities == []
+
+
+def test_claim(refresh_database):
+    newer = db.Note.create("second", timestamp="2023-04-13 09:00:00")
+    older = db.Note.create("first", timestamp="2023-04-13 08:00:00")
+    # oldest first, and never the same note twice
+    assert [note.id for note in db.Note.claim("a")] == [older.id]
+    assert [note.id for note in db.Note.claim("b", limit=5)] == [newer.id]
+    assert db.Note.claim("c") == []
+    assert older.renew_claim("a")
+    assert not older.renew_claim("b")
+    # an expired lease can be claimed by someone else
+    with get_connection() as conn:
+        conn.execute(
+            "UPDATE notes SET claimed_at = '2000-01-01 00:00:00' WHERE id = ?",
+            (older.id,),
+        )
+        conn.commit()
+    assert [note.id for note in db.Note.claim("c")] == [older.id]
+    assert not older.renew_claim("a")
+    # released notes can be claimed again straight away, until they run
+    # out of attempts
+    db.Note.release_claims("b")
+    assert [note.id for note in db.Note.claim("d", max_attempts=2)] == [
+        newer.id
+    ]
+    db.Note.release_claims("d")
+    assert db.Note.claim("e", max_attempts=2) == []
+
+
+def test_claim_ids(refresh_database):
+    newer = db.Note.create("second", timestamp="2023-04-13 09:00:00")
+    older = db.Note.create("first", timestamp="2023-04-13 08:00:00")
+    done = db.Note.create("done", timestamp="2023-04-13 07:00:00")
+    done.processed = True
+    done.save()
+    assert [note.id for note in db.Note.claim("engine")] == [older.id]
+    ids = [newer.id, older.id, done.id]
+    # neither the processed note nor the one the engine holds
+    assert [note.id for note in db.Note.claim_ids("backfill", ids)] == [
+        newer.id
+    ]
+    # a claim can be taken up again by whoever holds it
+    assert [note.id for note in db.Note.claim_ids("backfill", ids)] == [
+        newer.id
+    ]
+    assert db.Note.claim_ids("backfill", []) == []
+
+
+def test_bulk_create(refresh_database):
+    ids = db.Note.bulk_create(
+        [
+            ("2025-04-05 10:00:00", "first"),
+            db.NoteRow(
+                datetime(2025, 4, 5, 11), "second", processing_error="oops"
+            ),
+            (None, "third"),
+        ],
+        chunk_size=2,
+    )
+    notes = db.Note.get_by_ids(ids)
+    assert [note.note_text for note in notes] == [
+        "first",
+        "second",
+        "third",
+    ]
+    assert notes[1].timestamp == datetime(2025, 4, 5, 11)
+    assert notes[1].processing_error == "oops"
+    assert notes[2].timestamp > notes[1].timestamp
+    assert db.Note.bulk_create([]) == []
+    with pytest.raises(ValueError):
+        db.Note.bulk_create([("yesterday", "bad timestamp")])
+    # indexed for search all at once, and a failed chunk leaves the notes
+    # to be indexed one at a time again
+    assert [note.id for note in db.Note.get_all(search="second")] == [
+        ids[1]
+    ]
+    with pytest.raises(sqlite3.IntegrityError):
+        db.Note.bulk_create([(None, "fourth"), (None, None)])
+    assert db.Note.get_all(search="fourth") == []
+    fifth = db.Note.create("fifth")
+    assert [note.id for note in db.Note.get_all(search="fifth")] == [
+        fifth.id
+    ]
+
+
+def test_import_csv(refresh_database, tmp_path):
+    db.Note.bulk_create(
+        [
+            ("2025-04-05 10:00:00", "first"),
+            ("2025-04-05 11:00:00", "second"),
+        ]
+    )
+    path = str(tmp_path / "notes.csv")
+    db.Note.export_csv(path)
+    ids = db.Note.import_csv(path)
+    notes = db.Note.get_by_ids(ids)
+    assert [(note.timestamp, note.note_text) for note in notes] == [
+        (datetime(2025, 4, 5, 10), "first"),
+        (datetime(2025, 4, 5, 11), "second"),
+    ]
+
+
+def test_bulk_upload_returns_ids(refresh_database):
+    with connection_manager.capture_statements() as statements:
+        ids = bulk_upload_notes_list(
+            [
+                ("2025-04-05 10:00:00", "first"),
+                ("2025-04-05 11:00:00", "second"),
+            ]
+        )
+    # the notes are not read back
+    assert not any("FROM notes WHERE id IN" in s for s in statements)
+    notes = db.Note.get_by_ids(ids)
+    assert [note.note_text for note in notes] == ["first", "second"]
@@ -0,0 +1,72 @@
+import pytest
+
+from src import db
+from src.db.pagination import Cursor
+from src.errors import InvalidCursorError
+
+
+def read_pages(get_all, **kwargs):
+    pages = [get_all(**kwargs)]
+    while pages[-1].next_cursor:
+        pages.append(get_all(cursor=pages[-1].next_cursor, **kwargs))
+    return pages
+
+
+def test_cursor_round_trip():
+    cursor = Cursor(timestamp="2025-04-05 10:00:00", id=3)
+    assert Cursor.decode(cursor.encode()) == cursor
+    assert Cursor.decode(Cursor(offset=25).encode()) == Cursor(offset=25)
+    # not base64, an id without a timestamp, and "[]"
+    for bad in ["nope!", Cursor(id=3).encode(), "W10"]:
+        with pytest.raises(InvalidCursorError):
+            Cursor.decode(bad)
+
+
+def test_notes_pages(refresh_database):
+    # two notes share each timestamp, so the id breaks the ties
+    notes = [
+        db.Note.create(
+            f"note {i}", timestamp=f"2025-04-05 10:0{i // 2}:00"
+        )
+        for i in range(7)
+    ]
+    pages = read_pages(db.Note.get_all, limit=3)
+    assert [len(page) for page in pages] == [3, 3, 1]
+    assert [note.id for page in pages for note in page] == [
+        note.id for note in reversed(notes)
+    ]
+    # a note written meanwhile doesn't shift the later pages
+    db.Note.create("new note", timestamp="2025-04-05 11:00:00")
+    second = db.Note.get_all(limit=3, cursor=pages[0].next_cursor)
+    assert [note.id for note in second] == [note.id for note in pages[1]]
+
+
+def test_search_pages(refresh_database):
+    for i in range(5):
+        db.Note.create(f"milk {i}")
+    pages = read_pages(db.Note.get_all, search="milk", limit=2)
+    assert [len(page) for page in pages] == [2, 2, 1]
+    assert len({note.id for page in pages for note in page}) == 5
+
+
+def test_todo_action_and_curiosity_pages(refresh_database):
+    note = db.Note.create("lots to do", timestamp="2025-04-05 10:00:00")
+    for i in range(5):
+        db.Todo.create(todo_text=f"todo {i}", source_note_id=note.id)
+        db.Action.create(
+            action_text=f"action {i}",
+            timestamp="2025-04-05 10:00:00",
+            source_note_id=note.id,
+        )
+        db.Curiosity.create(
+            curiosity_text=f"curiosity {i}", source_note_id=note.id
+        )
+    for get_all in [
+        db.Todo.get_all,
+        db.Action.get_all,
+        db.Curiosity.get_all,
+    ]:
+        pages = read_pages(get_all, limit=2)
+        assert [len(page) for page in pages] == [2, 2, 1]
+        ids = [item.id for page in pages for item in page]
+        assert ids == sorted(ids, reverse=True)
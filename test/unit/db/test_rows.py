@@ -0,0 +1,34 @@
+from src import db
+
+
+def test_rows_build_valid_models(refresh_database):
+    # from_sqlite_row skips validation, so the rows have to come out as
+    # the types the models declare
+    note = db.Note.create("lots to do", timestamp="2025-04-05 10:00:00")
+    todo = db.Todo.create(todo_text="buy milk", source_note_id=note.id)
+    action = db.Action.create(
+        action_text="bought milk",
+        timestamp="2025-04-05 11:00:00",
+        source_note_id=note.id,
+        todo_id=todo.id,
+        mark_complete=True,
+    )
+    tool_call = db.ToolCall.create(
+        source_note_id=note.id,
+        target_table="todos",
+        target_id=todo.id,
+        tool_call="{}",
+    )
+    curiosity = db.Curiosity.create(
+        curiosity_text="why milk?", source_note_id=note.id
+    )
+    for model, obj in [
+        (db.Note, note),
+        (db.Todo, todo),
+        (db.Action, action),
+        (db.ToolCall, tool_call),
+        (db.Curiosity, curiosity),
+    ]:
+        row = model.get_by_id(obj.id)
+        dumped = row.model_dump(warnings="error")
+        assert model.model_validate(dumped) == row
@@ -0,0 +1,83 @@
+import sqlite3
+
+import pytest
+
+from src import db
+from src.db.connection import get_connection
+
+
+def test_identity_map(setup_database):
+    note = db.Note.create("Walked the dog")
+    with db.Session() as session:
+        first = db.Note.get_by_id(note.id)
+        assert db.Note.get_by_id(note.id) is first
+        # rows from list queries resolve to the same objects
+        assert any(n is first for n in db.Note.get_all(limit=1000))
+        assert session.lookup(db.Note, note.id) is first
+    # outside of a session every fetch is a new object
+    assert db.Note.get_by_id(note.id) is not db.Note.get_by_id(note.id)
+
+
+def test_created_objects_are_mapped(setup_database):
+    with db.Session():
+        note = db.Note.create("Need to buy milk")
+        todo = db.Todo.create("buy milk", note.id)
+        child = db.Todo.create(
+            "find my wallet", note.id, parent_id=todo.id
+        )
+        assert db.Todo.get_by_id(todo.id) is todo
+        assert child.parent is todo
+        assert todo.children == [child]
+
+
+def test_commits_once(setup_database):
+    with db.Session() as session:
+        db.Note.create("first")
+        db.Note.create("second")
+        # the models' own commits are deferred to the session
+        assert session.connection.in_transaction
+    assert not get_connection().in_transaction
+
+
+def test_rollback_on_error(setup_database):
+    with pytest.raises(RuntimeError):
+        with db.Session():
+            db.Note.create("this will be rolled back")
+            raise RuntimeError("processing failed")
+    assert db.Note.get_all(search="rolled back") == []
+
+
+def test_add_saves_on_commit(setup_database):
+    note = db.Note.create("Went for a run")
+    with db.Session() as session:
+        loaded = db.Note.get_by_id(note.id)
+        loaded.processed_note_text = "ran"
+        session.add(loaded)
+    assert db.Note.get_by_id(note.id).processed_note_text == "ran"
+
+
+def test_nested_sessions(setup_database):
+    with db.Session() as outer:
+        with db.session_scope() as inner:
+            assert inner is outer
+        with pytest.raises(RuntimeError):
+            with db.Session():
+                pass
+
+
+def test_rollback_on_failed_flush(setup_database):
+    note = db.Note.create("Went for a run")
+    other = db.Note.create("Walked the dog")
+    with pytest.raises(sqlite3.IntegrityError):
+        with db.Session() as session:
+            db.Note.create("partly flushed")
+            loaded = db.Note.get_by_id(note.id)
+            # notes.note_text is NOT NULL, so the flush fails
+            loaded.note_text = None
+            session.add(loaded)
+    assert not get_connection().in_transaction
+    # a later commit on the same connection doesn't persist the session
+    other.processed_note_text = "walked"
+    other.save()
+    assert db.Note.get_all(search="partly flushed") == []
+    assert db.Note.get_by_id(note.id).note_text == "Went for a run"
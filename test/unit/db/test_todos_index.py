@@ -0,0 +1,85 @@
+from src import db
+from src.db import todo_index
+from src.db.connection import get_connection
+
+
+def search(text, **kwargs):
+    with get_connection() as conn:
+        return todo_index.search(conn.cursor(), text, **kwargs)
+
+
+def make_todos(*texts):
+    note = db.Note.create("Todos for the index")
+    return [
+        db.Todo.create(todo_text=text, source_note_id=note.id)
+        for text in texts
+    ]
+
+
+def test_search_ranks_best_match_first(refresh_database):
+    walk, feed, oil = make_todos(
+        "walk the dog", "feed the dog", "change the oil in the truck"
+    )
+    matches = search("walked the dog around the block")
+    assert [match.todo_id for match in matches] == [walk.id, feed.id]
+    assert matches[0].coverage == 1
+    assert matches[1].coverage < 1
+    assert search("nothing in common") == []
+    assert search("dog", todo_ids=[feed.id])[0].todo_id == feed.id
+
+
+def test_index_follows_saves_and_deletes(refresh_database):
+    (todo,) = make_todos("call the bank")
+    assert search("bank")[0].todo_id == todo.id
+    todo.todo_text = "call the plumber"
+    todo.save()
+    assert search("bank") == []
+    assert search("plumber")[0].todo_id == todo.id
+    todo.delete()
+    assert search("plumber") == []
+
+
+def test_index_rolls_back_with_the_todo(refresh_database):
+    note = db.Note.create("Rolled back")
+    try:
+        with db.Session():
+            db.Todo.create(
+                todo_text="renew passport", source_note_id=note.id
+            )
+            raise RuntimeError("roll back")
+    except RuntimeError:
+        pass
+    assert search("passport") == []
+
+
+def test_ensure_table_indexes_existing_todos(refresh_database):
+    (todo,) = make_todos("renew the gym membership")
+    with get_connection() as conn:
+        conn.execute("DELETE FROM todo_terms")
+        conn.commit()
+    db.Todo.ensure_table()
+    assert search("gym")[0].todo_id == todo.id
+
+
+def test_stats_follow_the_postings(refresh_database):
+    def stats():
+        with get_connection() as conn:
+            stored = conn.execute(
+                "SELECT documents, total_length FROM todo_term_stats"
+            ).fetchone()
+            counted = conn.execute(
+                "SELECT COUNT(DISTINCT todo_id), COALESCE(SUM(count), 0) FROM todo_terms"
+            ).fetchone()
+        assert stored == counted
+        return stored
+
+    walk, feed = make_todos("walk the dog", "feed the dog twice")
+    assert stats() == (2, 5)
+    walk.todo_text = "walk the dog and the cat"
+    walk.save()
+    assert stats() == (2, 6)
+    feed.delete()
+    assert stats() == (1, 3)
+    # a todo without terms isn't counted
+    make_todos("the")
+    assert stats() == (1, 3)
@@ -0,0 +1,134 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from src.llm.client import LLMClient
+
+
+class StubServer(ThreadingHTTPServer):
+    """
+    A local stand in for the API, answering every request after a delay
+    and keeping track of how many it was serving at once.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, latency: float = 0.0, tokens: int = 10):
+        super().__init__(("127.0.0.1", 0), StubHandler)
+        self.latency = latency
+        self.tokens = tokens
+        self.requests = []
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self.lock = threading.Lock()
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}/v1"
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    server: StubServer
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_POST(self):
+        body = json.loads(
+            self.rfile.read(int(self.headers["Content-Length"]))
+        )
+        with self.server.lock:
+            self.server.requests.append((self.path, body))
+            self.server.in_flight += 1
+            self.server.peak_in_flight = max(
+                self.server.peak_in_flight, self.server.in_flight
+            )
+        time.sleep(self.server.latency)
+        with self.server.lock:
+            self.server.in_flight -= 1
+        if self.path == "/v1/responses":
+            payload = {
+                "id": "resp_1",
+                "object": "response",
+                "created_at": time.time(),
+                "model": body["model"],
+                "output": [
+                    {
+                        "type": "function_call",
+                        "id": "fc_1",
+                        "call_id": "call_1",
+                        "name": "create_curiosity",
+                        "arguments": json.dumps(
+                            {"curiosity_text": "why?"}
+                        ),
+                        "status": "completed",
+                    }
+                ],
+                "parallel_tool_calls": True,
+                "tool_choice": "auto",
+                "tools": [],
+                "usage": {
+                    "input_tokens": self.server.tokens,
+                    "input_tokens_details": {
+                        "cached_tokens": self.server.tokens // 2
+                    },
+                    "output_tokens": 0,
+                    "output_tokens_details": {"reasoning_tokens": 0},
+                    "total_tokens": self.server.tokens,
+                },
+            }
+        else:
+            payload = {
+                "id": "chatcmpl_1",
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": body["model"],
+                "choices": [
+                    {
+                        "index": 0,
+                        "finish_reason": "stop",
+                        "message": {"role": "assistant", "content": "{}"},
+                    }
+                ],
+                "usage": {
+                    "prompt_tokens": self.server.tokens,
+                    "completion_tokens": 0,
+                    "total_tokens": self.server.tokens,
+                },
+            }
+        data = json.dumps(payload).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+
+@pytest.fixture
+def server():
+    server = StubServer(latency=0.1)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def make_client(server):
+    """
+    Builds LLMClients that talk to the stub server.
+    """
+
+    def make(**kwargs) -> LLMClient:
+        return LLMClient(
+            api_key="test",
+            base_url=server.base_url,
+            max_retries=0,
+            **kwargs,
+        )
+
+    return make
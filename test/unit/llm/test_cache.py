@@ -0,0 +1,87 @@
+import sqlite3
+import time
+
+import pytest
+
+from src.errors import CacheMissError
+from src.llm.cache import ResponseCache, get_cache_key
+
+REQUEST = {"model": "test", "instructions": "annotate", "input": "hi"}
+
+
+# collected before the database fixtures patch it
+connect = sqlite3.connect
+
+
+@pytest.fixture
+def cache(tmp_path, monkeypatch):
+    # the cache keeps a database of its own, not the test notebook
+    monkeypatch.setattr(sqlite3, "connect", connect)
+    cache = ResponseCache(path=str(tmp_path / "llm_cache.db"), mode="on")
+    yield cache
+    cache.close()
+
+
+def test_key_ignores_order():
+    reordered = dict(reversed(list(REQUEST.items())))
+    assert get_cache_key("responses", REQUEST) == get_cache_key(
+        "responses", reordered
+    )
+    assert get_cache_key("responses", REQUEST) != get_cache_key(
+        "responses", {**REQUEST, "input": "hello"}
+    )
+    assert get_cache_key("responses", REQUEST) != get_cache_key(
+        "chat.completions", REQUEST
+    )
+
+
+def test_serves_repeated_requests(server, make_client, cache):
+    client = make_client(cache=cache)
+    first = client.responses.create(**REQUEST)
+    second = client.responses.create(**REQUEST)
+    assert len(server.requests) == 1
+    assert second.output[0].name == first.output[0].name
+    assert client.stats.cache_hits == 1
+    client.responses.create(**{**REQUEST, "input": "something else"})
+    assert len(server.requests) == 2
+    client.close()
+
+
+def test_replay(server, make_client, cache):
+    recorder = make_client(cache=cache)
+    recorder.responses.create(**REQUEST)
+    recorder.close()
+    cache.mode = "replay"
+    replayer = make_client(cache=cache)
+    response = replayer.responses.create(**REQUEST)
+    assert response.output[0].name == "create_curiosity"
+    with pytest.raises(CacheMissError):
+        replayer.responses.create(**{**REQUEST, "input": "new"})
+    # nothing reached the server while replaying
+    assert len(server.requests) == 1
+    replayer.close()
+
+
+def test_ttl(server, make_client, cache):
+    cache.ttl_seconds = 0
+    client = make_client(cache=cache)
+    client.responses.create(**REQUEST)
+    time.sleep(0.01)
+    client.responses.create(**REQUEST)
+    assert len(server.requests) == 2
+    assert cache.stats.expired == 1
+    client.close()
+
+
+def test_lru(server, make_client, cache):
+    cache.max_entries = 2
+    client = make_client(cache=cache)
+    for text in ["a", "b"]:
+        client.responses.create(**{**REQUEST, "input": text})
+    # using a makes b the least recently used
+    client.responses.create(**{**REQUEST, "input": "a"})
+    client.responses.create(**{**REQUEST, "input": "c"})
+    assert cache.stats.evicted == 1
+    assert cache.get("responses", {**REQUEST, "input": "a"}) is not None
+    assert cache.get("responses", {**REQUEST, "input": "b"}) is None
+    client.close()
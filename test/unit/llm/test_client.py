@@ -0,0 +1,91 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+from src import db
+from src.llm.client import TokenBudget
+from src.processor import NoteProcessor
+
+
+def test_responses(server, make_client):
+    client = make_client()
+    response = client.responses.create(model="test", input="hello")
+    assert response.output[0].name == "create_curiosity"
+    assert server.requests[0][0] == "/v1/responses"
+    assert client.stats.requests == 1
+    assert client.stats.tokens == 10
+    assert client.stats.cached_tokens == 5
+    client.close()
+
+
+def test_chat_completions(server, make_client):
+    client = make_client()
+    response = client.chat.completions.create(
+        model="test", messages=[{"role": "user", "content": "hello"}]
+    )
+    assert response.choices[0].message.content == "{}"
+    assert server.requests[0][0] == "/v1/chat/completions"
+    client.close()
+
+
+def test_max_in_flight(server, make_client):
+    client = make_client(max_in_flight=2)
+    with ThreadPoolExecutor(max_workers=6) as pool:
+        list(
+            pool.map(
+                lambda i: client.responses.create(
+                    model="test", input=str(i)
+                ),
+                range(6),
+            )
+        )
+    assert len(server.requests) == 6
+    assert server.peak_in_flight == 2
+    assert client.stats.peak_in_flight == 2
+    client.close()
+
+
+def test_async_callers_share_the_limit(server, make_client):
+    client = make_client(max_in_flight=3)
+
+    async def send_all():
+        await asyncio.gather(
+            *[
+                client.create_response(model="test", input=str(i))
+                for i in range(6)
+            ]
+        )
+
+    client.run(send_all())
+    assert server.peak_in_flight == 3
+    client.close()
+
+
+def test_token_budget():
+    # 600 tokens a minute comes back at 10 a second
+    budget = TokenBudget(600)
+
+    async def spend():
+        await budget.acquire(600)
+        return await budget.acquire(5)
+
+    waited = asyncio.run(spend())
+    assert 0.4 < waited < 1
+    # using fewer tokens than estimated gives them back
+    budget.settle(estimated=100, used=0)
+    assert budget.tokens >= 100
+
+
+def test_unlimited_token_budget():
+    budget = TokenBudget(0)
+    assert asyncio.run(budget.acquire(10**9)) == 0.0
+
+
+def test_process_note(server, make_client, setup_database):
+    client = make_client()
+    note = db.Note.create("why is the sky blue?")
+    tool_calls = NoteProcessor(note, client).process_note()
+    assert [tool_call.target_table for tool_call in tool_calls] == [
+        "curiosities"
+    ]
+    assert db.Note.get_by_id(note.id).processed
+    client.close()
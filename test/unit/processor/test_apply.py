@@ -0,0 +1,134 @@
+import json
+
+import pytest
+
+from src import db
+from src.db.connection import get_connection
+from src.errors import ClaimLostError, ProcessorError
+from src.llm.stub import StubClient
+from src.processor import NoteProcessor, PendingToolCall
+
+
+def annotate(request):
+    return [
+        (
+            "create_action",
+            {
+                "action_text": "walked the dog",
+                "action_timestamp": "2025-04-05 10:00:00",
+                "todo_id": None,
+                "mark_complete": False,
+            },
+        ),
+        (
+            "create_todo",
+            {
+                "todo_text": "buy dog food",
+                "target_start_time": None,
+                "target_end_time": None,
+                "parent_id": None,
+            },
+        ),
+        ("create_curiosity", {"curiosity_text": "how old do dogs get?"}),
+    ]
+
+
+def test_process_note(setup_database):
+    note = db.Note.create("Walked the dog, need to buy dog food")
+    tool_calls = NoteProcessor(note, StubClient(annotate)).process_note()
+    assert [tool_call.target_table for tool_call in tool_calls] == [
+        "actions",
+        "todos",
+        "curiosities",
+    ]
+    note = db.Note.get_by_id(note.id)
+    assert note.processed
+    assert len(note.actions) == 1
+    assert len(note.todos) == 1
+    assert len(note.curiosities) == 1
+    assert len(note.tool_calls) == 3
+
+
+def test_failed_note_is_rolled_back(setup_database):
+    def annotate_with_bad_update(request):
+        return annotate(request) + [
+            (
+                "update_todo",
+                {
+                    "todo_id": 999999,
+                    "todo_text": "no such todo",
+                    "target_start_time": None,
+                    "target_end_time": None,
+                    "parent_id": None,
+                    "complete": None,
+                    "cancelled": None,
+                },
+            )
+        ]
+
+    note = db.Note.create("Walked the dog, and finished the missing todo")
+    processor = NoteProcessor(note, StubClient(annotate_with_bad_update))
+    with pytest.raises(ProcessorError):
+        processor.process_note()
+    note = db.Note.get_by_id(note.id)
+    assert not note.processed
+    assert "999999" in note.processing_error
+    # nothing from the first three tool calls was kept
+    assert note.actions == []
+    assert note.todos == []
+    assert note.curiosities == []
+    assert note.tool_calls == []
+
+
+def test_claim_lost(refresh_database):
+    note = db.Note.create("Walked the dog, need to buy dog food")
+    assert db.Note.claim("engine-a") == [note]
+    # the lease ran out and another engine took the note over
+    with get_connection() as conn:
+        conn.execute(
+            "UPDATE notes SET claimed_by = 'engine-b' WHERE id = ?",
+            (note.id,),
+        )
+        conn.commit()
+    processor = NoteProcessor(note, StubClient(annotate))
+    response = processor.request_annotation()
+    pending = processor.prepare_tool_calls(response)
+    with pytest.raises(ClaimLostError):
+        processor.apply_tool_calls(pending, claimed_by="engine-a")
+    note = db.Note.get_by_id(note.id)
+    assert not note.processed
+    assert note.processing_error == ""
+    assert note.actions == []
+
+
+def test_stable_prompt_prefix(setup_database):
+    client = StubClient()
+    for text in ["Walked the dog", "Need to buy dog food"]:
+        NoteProcessor(db.Note.create(text), client).process_note()
+    first, second = client.requests
+    # everything but the input is the same for every note
+    assert first["instructions"] == second["instructions"]
+    assert json.dumps(first["tools"]) == json.dumps(second["tools"])
+    # the note being processed comes last
+    note = json.loads(second["input"][-1]["content"])
+    assert note["note_text"] == "Need to buy dog food"
+
+
+def test_todo_outside_context(setup_database):
+    note = db.Note.create("Bought the dog food")
+    processor = NoteProcessor(note, StubClient())
+    processor.context_todos = []
+    pending = PendingToolCall(
+        name="create_action",
+        args={
+            "action_text": "bought dog food",
+            "action_timestamp": "2025-04-05 10:00:00",
+            "todo_id": 12345,
+            "mark_complete": True,
+        },
+        tool_call="{}",
+    )
+    processor._resolve_todo_reference(pending)
+    # looked up with find_todo, which the stub answers with nothing
+    assert pending.args["todo_id"] is None
+    assert pending.args["mark_complete"] is False
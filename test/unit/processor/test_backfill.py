@@ -0,0 +1,139 @@
+import json
+
+from src import db
+from src.llm.stub import StubClient
+from src.processor.backfill import Backfill
+
+
+def annotate(request):
+    note = json.loads(request["input"][-1]["content"])
+    if "broken" in note["note_text"]:
+        raise RuntimeError("the model choked")
+    calls = [
+        (
+            "create_action",
+            {
+                "action_text": note["note_text"],
+                "action_timestamp": note["timestamp"].replace("T", " "),
+                "todo_id": None,
+                "mark_complete": False,
+            },
+        )
+    ]
+    if "missing" in note["note_text"]:
+        calls.append(
+            (
+                "update_todo",
+                {
+                    "todo_id": 999999,
+                    "todo_text": "no such todo",
+                    "target_start_time": None,
+                    "target_end_time": None,
+                    "parent_id": None,
+                    "complete": None,
+                    "cancelled": None,
+                },
+            )
+        )
+    return calls
+
+
+def make_notes(*texts):
+    return [
+        db.Note.create(text, timestamp=f"2025-04-05 10:0{i}:00")
+        for i, text in enumerate(texts)
+    ]
+
+
+def test_backfill(refresh_database, tmp_path):
+    notes = make_notes("note 0", "note 1", "note 2")
+    client = StubClient(annotate)
+    backfill = Backfill(client, directory=str(tmp_path), poll_seconds=0)
+    stats = backfill.run()
+    assert stats.submitted == 3
+    assert stats.processed == 3
+    assert stats.transactions == 1
+    # every note went in the one batch
+    assert len(client.requests) == 3
+    for note in notes:
+        note = db.Note.get_by_id(note.id)
+        assert note.processed
+        assert [action.action_text for action in note.actions] == [
+            note.note_text
+        ]
+    # nothing left to do
+    assert Backfill(client, directory=str(tmp_path)).run().submitted == 0
+
+
+def test_failed_note_does_not_fail_the_chunk(refresh_database, tmp_path):
+    notes = make_notes("note 0", "the missing todo", "note 2")
+    backfill = Backfill(
+        StubClient(annotate), directory=str(tmp_path), poll_seconds=0
+    )
+    stats = backfill.run()
+    assert stats.processed == 2
+    assert stats.failed == 1
+    # the bulk transaction, then one for each note
+    assert stats.transactions == 3
+    failed = db.Note.get_by_id(notes[1].id)
+    assert not failed.processed
+    assert "999999" in failed.processing_error
+    assert failed.actions == []
+    assert db.Note.get_by_id(notes[2].id).processed
+
+
+def test_failed_request(refresh_database, tmp_path):
+    notes = make_notes("note 0", "broken note")
+    backfill = Backfill(
+        StubClient(annotate), directory=str(tmp_path), poll_seconds=0
+    )
+    stats = backfill.run()
+    assert stats.processed == 1
+    assert stats.failed == 1
+    failed = db.Note.get_by_id(notes[1].id)
+    assert not failed.processed
+    assert "the model choked" in failed.processing_error
+
+
+def test_skips_notes_processed_meanwhile(refresh_database, tmp_path):
+    (note,) = make_notes("note 0")
+    client = StubClient(annotate)
+    backfill = Backfill(client, directory=str(tmp_path), poll_seconds=0)
+    batch_id = backfill.start()
+    note.processed = True
+    note.save()
+    stats = backfill.run(batch_id)
+    assert stats.skipped == 1
+    assert db.Note.get_by_id(note.id).actions == []
+
+
+def test_skips_notes_claimed_by_an_engine(refresh_database, tmp_path):
+    claimed, free = make_notes("note 0", "note 1")
+    client = StubClient(annotate)
+    backfill = Backfill(client, directory=str(tmp_path), poll_seconds=0)
+    batch_id = backfill.start()
+    assert [note.id for note in db.Note.claim("engine")] == [claimed.id]
+    stats = backfill.run(batch_id)
+    assert stats.processed == 1
+    assert stats.skipped == 1
+    assert db.Note.get_by_id(claimed.id).actions == []
+    assert db.Note.get_by_id(free.id).processed
+    # the engine still holds its note
+    assert claimed.renew_claim("engine")
+
+
+def test_skips_notes_whose_claim_is_lost(
+    refresh_database, tmp_path, monkeypatch
+):
+    (note,) = make_notes("note 0")
+    backfill = Backfill(
+        StubClient(annotate), directory=str(tmp_path), poll_seconds=0
+    )
+    batch_id = backfill.start()
+    # an engine takes the note over between the claim and the apply
+    monkeypatch.setattr(db.Note, "renew_claim", lambda self, name: False)
+    stats = backfill.run(batch_id)
+    assert stats.processed == 0
+    assert stats.skipped == 1
+    assert not db.Note.get_by_id(note.id).processed
+    assert db.Note.get_by_id(note.id).actions == []
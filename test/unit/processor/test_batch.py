@@ -0,0 +1,91 @@
+import json
+
+from src import db
+from src.engine import Engine
+from src.llm.stub import StubClient
+from src.processor.batch import BATCH_ANNOTATION_TOOLS, BatchNoteProcessor
+
+
+def log_notes_as_actions(request):
+    # one action per note of the batch
+    notes = json.loads(request["input"][-1]["content"])
+    return [
+        (
+            "create_action",
+            {
+                "action_text": note["note_text"],
+                "action_timestamp": note["timestamp"].replace("T", " "),
+                "todo_id": None,
+                "mark_complete": False,
+                "source_note_id": note["id"],
+            },
+        )
+        for note in notes
+    ]
+
+
+def test_tools_take_source_note_id():
+    for tool in BATCH_ANNOTATION_TOOLS:
+        assert "source_note_id" in tool["parameters"]["properties"]
+        assert "source_note_id" in tool["parameters"]["required"]
+
+
+def test_process_notes(refresh_database):
+    notes = [
+        db.Note.create(f"note {i}", timestamp=f"2025-04-05 10:0{i}:00")
+        for i in range(3)
+    ]
+    client = StubClient(log_notes_as_actions)
+    # out of order, to check they are sent oldest first
+    tool_calls = BatchNoteProcessor(
+        list(reversed(notes)), client
+    ).process_notes()
+    assert len(client.requests) == 1
+    sent = json.loads(client.requests[0]["input"][-1]["content"])
+    assert [note["id"] for note in sent] == [note.id for note in notes]
+    assert sorted(tool_calls) == [note.id for note in notes]
+    for note in notes:
+        note = db.Note.get_by_id(note.id)
+        assert note.processed
+        assert [action.action_text for action in note.actions] == [
+            note.note_text
+        ]
+
+
+def test_calls_outside_the_batch_are_dropped(refresh_database):
+    note = db.Note.create("in the batch")
+    other = db.Note.create("not in the batch")
+
+    def annotate(request):
+        return [
+            ("create_curiosity", {"curiosity_text": "why?"}),
+            (
+                "create_curiosity",
+                {"curiosity_text": "why?", "source_note_id": other.id},
+            ),
+        ]
+
+    tool_calls = BatchNoteProcessor(
+        [note], StubClient(annotate)
+    ).process_notes()
+    # the note is still processed, with nothing to apply
+    assert tool_calls == {note.id: []}
+    assert db.Note.get_by_id(note.id).processed
+    assert db.Note.get_by_id(other.id).curiosities == []
+
+
+def test_engine_batches_notes(refresh_database):
+    for i in range(6):
+        db.Note.create(f"note {i}", timestamp=f"2025-04-05 10:0{i}:00")
+    client = StubClient(log_notes_as_actions, usage=True)
+    with Engine(workers=2, client=client, notes_per_request=3) as engine:
+        stats = engine.drain()
+    # the second batch is asked again once the actions of the first are
+    # in its context
+    assert len(client.requests) == 3
+    assert stats.requests == 3
+    assert stats.repeated == 1
+    assert stats.processed == 6
+    assert stats.input_tokens > 0
+    assert db.Note.get_unprocessed() == []
+    assert len(db.Action.get_all(limit=10)) == 6
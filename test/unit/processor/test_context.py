@@ -0,0 +1,128 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from src import db
+from src.processor.context import ContextWindow
+
+START = datetime(2025, 4, 5, 8, 0, 0)
+
+
+def at(minutes: int) -> datetime:
+    return START + timedelta(minutes=minutes)
+
+
+def write_note(minutes: int, text: str) -> db.Note:
+    note = db.Note.create(
+        text, timestamp=at(minutes), processed_note_text=text
+    )
+    db.Action.create(
+        action_text=f"did {text}",
+        timestamp=at(minutes),
+        source_note_id=note.id,
+    )
+    db.Todo.create(
+        todo_text=f"follow up on {text}", source_note_id=note.id
+    )
+    return note
+
+
+def texts(context):
+    return (context.notes_text, context.actions_text, context.todos_text)
+
+
+@pytest.fixture
+def window(refresh_database):
+    window = ContextWindow(size=5)
+    yield window
+    window.close()
+
+
+def test_matches_fresh_load(window):
+    for i in range(8):
+        write_note(i, f"note {i}")
+        context = window.get(at(i) + timedelta(seconds=30))
+        fresh = ContextWindow(size=5)
+        assert texts(context) == texts(
+            fresh.get(at(i) + timedelta(seconds=30))
+        )
+        assert [todo.id for todo in context.todos] == [
+            todo.id
+            for todo in fresh.get(at(i) + timedelta(seconds=30)).todos
+        ]
+        fresh.close()
+    assert window.stats.misses == 1
+    assert window.stats.partial == 7
+
+
+def test_hit(window):
+    write_note(0, "walked the dog")
+    window.get(at(1))
+    queries = window.stats.queries
+    context = window.get(at(1))
+    assert window.stats.hits == 1
+    assert window.stats.queries == queries
+    assert "walked the dog" in context.notes_text
+
+
+def test_update_in_place(window):
+    note = write_note(0, "walked the dog")
+    window.get(at(1))
+    note.processed_note_text = "took the dog for a walk"
+    note.save()
+    context = window.get(at(1))
+    # the note was replaced in the window, no query needed
+    assert window.stats.hits == 1
+    assert "took the dog for a walk" in context.notes_text
+
+
+def test_completed_todo_leaves(window):
+    write_note(0, "walked the dog")
+    context = window.get(at(1))
+    todo = context.todos[0]
+    todo.complete = True
+    todo.save()
+    assert window.get(at(1)).todos == []
+
+
+def test_rollback(window):
+    write_note(0, "walked the dog")
+    window.get(at(1))
+    with pytest.raises(RuntimeError):
+        with db.Session():
+            write_note(0, "fed the cat")
+            raise RuntimeError("undo")
+    context = window.get(at(1))
+    assert "fed the cat" not in context.notes_text
+    assert "fed the cat" not in context.actions_text
+
+
+def test_going_back_starts_over(window):
+    write_note(0, "walked the dog")
+    write_note(10, "fed the cat")
+    window.get(at(20))
+    context = window.get(at(5))
+    assert window.stats.misses == 2
+    assert "fed the cat" not in context.notes_text
+
+
+def test_hit_inside_a_session(window):
+    write_note(0, "walked the dog")
+    window.get(at(1))
+    # a session hands out its own connection, to the same notebook
+    with db.session_scope():
+        window.get(at(1))
+    window.get(at(1))
+    assert window.stats.misses == 1
+    assert window.stats.hits == 2
+
+
+def test_another_notebook_starts_over(window, monkeypatch):
+    write_note(0, "walked the dog")
+    window.get(at(1))
+    monkeypatch.setattr(
+        "src.processor.context.get_notebook", lambda: "another"
+    )
+    window.get(at(1))
+    assert window.stats.misses == 2
+    assert window.stats.hits == 0
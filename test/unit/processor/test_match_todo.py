@@ -0,0 +1,110 @@
+import pytest
+
+from src import db
+from src.llm.stub import StubClient
+from src.processor.find_todo import find_todo, says_complete
+
+
+def make_todos(*texts):
+    note = db.Note.create("Todos to match")
+    return [
+        db.Todo.create(todo_text=text, source_note_id=note.id)
+        for text in texts
+    ]
+
+
+def action(text):
+    return db.Action(
+        id=0,
+        timestamp="2025-04-05 10:00:00",
+        action_text=text,
+        source_note_id=1,
+    )
+
+
+def test_clear_match_skips_the_llm(refresh_database):
+    walk, _, _ = make_todos(
+        "walk the dog", "feed the cat", "change the oil in the truck"
+    )
+    client = StubClient()
+    todo, mark_complete = find_todo(
+        action("finished walking the dog"), client=client
+    )
+    assert todo.id == walk.id
+    assert mark_complete
+    assert client.requests == []
+
+
+def test_restating_a_todo_asks_the_llm(refresh_database):
+    # every term of the todo, but nothing says whether it was done
+    call, _ = make_todos("call mom", "feed the cat")
+    client = StubClient(
+        lambda request: [
+            ("find_todo", {"todo_id": call.id, "mark_complete": False})
+        ]
+    )
+    todo, mark_complete = find_todo(
+        action("need to call mom again tomorrow"), client=client
+    )
+    assert todo.id == call.id
+    assert not mark_complete
+    assert len(client.requests) == 1
+
+
+def test_starting_a_todo_does_not_complete_it(refresh_database):
+    _, oil = make_todos("walk the dog", "change the oil in the truck")
+    client = StubClient()
+    todo, mark_complete = find_todo(
+        action("started changing the oil in the truck"), client=client
+    )
+    assert todo.id == oil.id
+    assert not mark_complete
+    assert client.requests == []
+
+
+def test_unclear_match_asks_the_llm(refresh_database):
+    walk, feed = make_todos("walk the dog", "feed the dog")
+    client = StubClient(
+        lambda request: [
+            ("find_todo", {"todo_id": feed.id, "mark_complete": True})
+        ]
+    )
+    todo, mark_complete = find_todo(action("gave the dog"), client=client)
+    assert todo.id == feed.id
+    assert len(client.requests) == 1
+
+
+@pytest.mark.parametrize(
+    "text",
+    [
+        "didn't finish the report",
+        "not done with the report",
+        "haven't completed the report",
+        "never quite got the report done",
+        "the report isn’t done",
+        "went over the report with Don",
+        "need to finish the report",
+    ],
+)
+def test_negated_or_unfinished_work_asks_the_llm(refresh_database, text):
+    report, _ = make_todos("finish the report", "feed the cat")
+    client = StubClient(
+        lambda request: [
+            ("find_todo", {"todo_id": report.id, "mark_complete": False})
+        ]
+    )
+    todo, mark_complete = find_todo(action(text), client=client)
+    assert todo.id == report.id
+    assert not mark_complete
+    assert len(client.requests) == 1
+
+
+def test_says_complete():
+    assert says_complete("finally done with the taxes")
+    assert says_complete("started the taxes") is False
+    assert says_complete("started and finished the taxes") is False
+    assert says_complete("didn't start the taxes") is None
+    assert says_complete("didn't finish the taxes") is None
+    assert says_complete("not done with taxes") is None
+    assert says_complete("haven't completed the taxes") is None
+    assert says_complete("Don called about the taxes") is None
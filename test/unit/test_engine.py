@@ -0,0 +1,98 @@
+import json
+import time
+
+from src import db
+from src.engine import Engine
+from src.llm.stub import StubClient
+
+
+def log_note_as_curiosity(request):
+    # the note comes last, after the context
+    note = json.loads(request["input"][-1]["content"])
+    # answer the oldest notes last
+    time.sleep(0.2 - note["id"] % 5 * 0.04)
+    # curiosities aren't part of the context, so no note changes the
+    # context of the ones after it
+    return [("create_curiosity", {"curiosity_text": note["note_text"]})]
+
+
+def test_engine_processes_in_parallel(refresh_database):
+    notes = [
+        db.Note.create(f"note {i}", timestamp=f"2025-04-05 10:0{i}:00")
+        for i in range(5)
+    ]
+    start = time.monotonic()
+    with Engine(
+        workers=5, client=StubClient(log_note_as_curiosity)
+    ) as engine:
+        stats = engine.drain()
+    # one round of requests, rather than five
+    assert time.monotonic() - start < 0.6
+    assert stats.processed == 5
+    assert stats.failed == 0
+    assert stats.repeated == 0
+    assert db.Note.get_unprocessed() == []
+    # applied oldest note first, whatever order the responses came in
+    curiosities = sorted(
+        db.Curiosity.get_all(limit=10), key=lambda curiosity: curiosity.id
+    )
+    assert [curiosity.curiosity_text for curiosity in curiosities] == [
+        note.note_text for note in notes
+    ]
+
+
+def test_engine_matches_processing_one_note_at_a_time(refresh_database):
+    def plan_then_do(request):
+        note = json.loads(request["input"][-1]["content"])
+        if note["note_text"] == "need to buy milk":
+            return [("create_todo", {"todo_text": "buy milk"})]
+        # the todo id, if the todo is in the context
+        context = request["input"][0]["content"]
+        todo_id = next(
+            (
+                int(line.split(" - ")[0])
+                for line in context.splitlines()
+                if line.endswith(" - buy milk")
+            ),
+            None,
+        )
+        return [
+            (
+                "create_action",
+                {
+                    "action_text": note["note_text"],
+                    "action_timestamp": note["timestamp"].replace(
+                        "T", " "
+                    ),
+                    "todo_id": todo_id,
+                    "mark_complete": todo_id is not None,
+                },
+            )
+        ]
+
+    db.Note.create("need to buy milk", timestamp="2025-04-06 10:00:00")
+    db.Note.create("bought the milk", timestamp="2025-04-06 10:05:00")
+    with Engine(workers=2, client=StubClient(plan_then_do)) as engine:
+        stats = engine.drain()
+    assert stats.processed == 2
+    # the second note was first annotated without the todo
+    assert stats.repeated == 1
+    assert stats.requests == 3
+    [todo] = db.Todo.get_all(search="milk")
+    assert todo.complete
+    [action] = db.Action.get_all(search="bought")
+    assert action.todo_id == todo.id
+
+
+def test_engine_skips_failed_notes(refresh_database):
+    def fail(request):
+        raise RuntimeError("the LLM is down")
+
+    note = db.Note.create("this one fails")
+    with Engine(workers=2, client=StubClient(fail)) as engine:
+        stats = engine.drain()
+    assert stats.processed == 0
+    assert stats.failed == 1
+    note = db.Note.get_by_id(note.id)
+    assert not note.processed
+    assert note.processing_error == "the LLM is down"
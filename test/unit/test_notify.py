@@ -0,0 +1,52 @@
+import socket
+import threading
+import time
+
+import pytest
+
+from src import notify
+from src.engine import Engine
+from src.llm.stub import StubClient
+from src.notify import NoteListener, notify_note_created
+
+
+@pytest.fixture
+def notify_port(monkeypatch):
+    with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    monkeypatch.setattr(notify, "NOTIFY_PORT", port)
+    return port
+
+
+def test_listener_receives_note_ids(notify_port):
+    listener = NoteListener()
+    assert listener.listening
+    notify_note_created([1, 2])
+    assert listener.wait(1)
+    assert set(listener.created_at) == {1, 2}
+    # nothing more to read
+    assert not listener.wait(0.05)
+    listener.close()
+
+
+def test_listener_without_port(notify_port):
+    first = NoteListener()
+    # the port is taken, so only in-process notifications get through
+    second = NoteListener()
+    assert not second.listening
+    threading.Timer(0.1, notify_note_created).start()
+    start = time.monotonic()
+    assert second.wait(5)
+    assert time.monotonic() - start < 1
+    first.close()
+
+
+def test_engine_wakes_up_when_notified(refresh_database, notify_port):
+    engine = Engine(workers=1, client=StubClient())
+    threading.Timer(0.2, engine.stop).start()
+    start = time.monotonic()
+    # without the wakeup this would sleep for the whole idle interval
+    engine.run(idle_interval=10)
+    assert time.monotonic() - start < 2
+    engine.close()
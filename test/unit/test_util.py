@@ -0,0 +1,34 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from src.config import TIMESTAMP_FORMAT
+from src.util import format_time, parse_time
+
+
+def test_parse_time_matches_strptime():
+    for text in ["2025-04-05 10:00:00", "1999-12-31 23:59:59"]:
+        assert parse_time(text) == datetime.strptime(
+            text, TIMESTAMP_FORMAT
+        )
+    # strptime reads these too, fromisoformat doesn't get them
+    assert parse_time("2025-4-5 1:02:03") == datetime(2025, 4, 5, 1, 2, 3)
+    # ISO 8601 that isn't TIMESTAMP_FORMAT is still rejected
+    for text in [
+        "2025-04-05T10:00:00",
+        "2025-04-05",
+        "2025-04-05 10:00:00+01:00",
+        "2025-04-05 10:00:00.5",
+        "2025-02-30 10:00:00",
+    ]:
+        with pytest.raises(ValueError):
+            parse_time(text)
+
+
+def test_format_time_matches_strftime():
+    for time in [
+        datetime(2025, 4, 5, 10, 0, 0, 123456),
+        datetime(2025, 4, 5, 10, tzinfo=timezone(timedelta(hours=1))),
+        datetime(999, 1, 1),
+    ]:
+        assert format_time(time) == time.strftime(TIMESTAMP_FORMAT)
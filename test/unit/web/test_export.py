@@ -0,0 +1,24 @@
+import sys
+
+from flask import Flask
+
+from src.web.routes import export_bp
+
+
+def get_client():
+    app = Flask(__name__)
+    app.register_blueprint(export_bp, url_prefix="/api/export")
+    return app.test_client()
+
+
+def test_parquet_without_pyarrow(refresh_database, monkeypatch):
+    # None in sys.modules makes the import fail
+    monkeypatch.setitem(sys.modules, "pyarrow", None)
+    response = get_client().get("/api/export/notes?format=parquet")
+    assert response.status_code == 501
+    assert "pyarrow" in response.get_json()["error"]
+
+
+def test_bad_format(refresh_database):
+    response = get_client().get("/api/export/notes?format=xml")
+    assert response.status_code == 400
@@ -0,0 +1,64 @@
+import json
+
+from flask import Flask
+
+from src.db.pagination import Page
+from src.web.streaming import iter_json_page
+
+
+def make_pages(chunks):
+    """
+    get_page for chunks of items, each chunk's cursor being its index,
+    recording the cursors it is called with.
+    """
+    calls = []
+
+    def get_page(limit, cursor):
+        calls.append(cursor)
+        index = int(cursor)
+        next_cursor = str(index + 1) if index + 1 < len(chunks) else None
+        return Page(chunks[index], next_cursor)
+
+    return get_page, calls
+
+
+def test_items_are_sent_before_the_next_chunk_is_read():
+    get_page, calls = make_pages([[3, 2], [1, 0]])
+    with Flask(__name__).app_context():
+        chunks = iter_json_page(
+            "items",
+            get_page,
+            lambda item: {"n": item},
+            get_page(2, "0"),
+            4,
+        )
+        assert next(chunks) == '{"items":['
+        assert next(chunks) == '{"n":3},{"n":2}'
+        assert calls == ["0"]
+        rest = "".join(chunks)
+    assert calls == ["0", "1"]
+    assert json.loads('{"items":[{"n":3},{"n":2}' + rest) == {
+        "items": [{"n": 3}, {"n": 2}, {"n": 1}, {"n": 0}],
+        "next_cursor": None,
+    }
+
+
+def test_a_failed_chunk_ends_the_json_with_an_error():
+    get_page, _ = make_pages([[1], [0]])
+
+    def fail(item):
+        if item == 0:
+            raise ValueError("bad row")
+        return {"n": item}
+
+    with Flask(__name__).app_context():
+        body = "".join(
+            iter_json_page(
+                "items", get_page, fail, get_page(1, "0"), 2, "0"
+            )
+        )
+    assert json.loads(body) == {
+        "items": [{"n": 1}],
+        "next_cursor": "1",
+        "error": "bad row",
+    }